@@ -0,0 +1,53 @@
+"""
+Generación de CVs sintéticos en PDF (PyMuPDF) con un número de páginas dado.
+El contenido es determinista para que las corridas sean comparables.
+"""
+import os
+import random
+
+import fitz
+
+PUESTOS = ["Desarrollador Backend", "Analista de Datos", "Ingeniero DevOps", "Desarrollador Full Stack", "QA Automation"]
+EMPRESAS = ["Tecnologías Andinas SAC", "Banco del Pacífico", "Retail Digital", "Consultora Lima", "Startup Fintech"]
+HABILIDADES = ["Python", "FastAPI", "PostgreSQL", "Docker", "Kubernetes", "React", "AWS", "Pandas", "Git", "Linux"]
+LINEAS_POR_PAGINA = 48
+
+
+def _lineas_cv(generador, indice):
+    yield f"Candidato Sintético {indice}"
+    yield f"candidato{indice}@ejemplo.com | +51 9{generador.randint(10000000, 99999999)}"
+    yield ""
+    yield "EXPERIENCIA LABORAL"
+    while True:
+        yield f"{generador.choice(PUESTOS)} - {generador.choice(EMPRESAS)} ({generador.randint(2010, 2020)}-{generador.randint(2021, 2025)})"
+        for _ in range(generador.randint(2, 5)):
+            habilidades = ", ".join(generador.sample(HABILIDADES, 3))
+            yield f"- Desarrollo y mantenimiento de servicios con {habilidades}; mejora de tiempos de respuesta."
+        yield ""
+
+
+def generar_cv_pdf(ruta, paginas, semilla=0):
+    """
+    Crea un PDF de `paginas` páginas con texto de CV. Retorna la ruta.
+    """
+    generador = random.Random(semilla)
+    lineas = _lineas_cv(generador, semilla)
+    documento = fitz.open()
+    for _ in range(paginas):
+        pagina = documento.new_page()
+        texto = "\n".join(next(lineas) for _ in range(LINEAS_POR_PAGINA))
+        pagina.insert_text((50, 50), texto, fontsize=9)
+    documento.save(ruta)
+    documento.close()
+    return ruta
+
+
+def generar_cvs(carpeta, paginas_por_cv, semilla=0):
+    """
+    Genera un PDF por cada número de páginas indicado. Retorna dict paginas -> ruta.
+    """
+    os.makedirs(carpeta, exist_ok=True)
+    return {
+        paginas: generar_cv_pdf(os.path.join(carpeta, f"cv_sintetico_{paginas}p.pdf"), paginas, semilla + paginas)
+        for paginas in paginas_por_cv
+    }
@@ -0,0 +1,355 @@
+"""
+Micro-benchmarks reproducibles y sin conexión de pdf_utils, similitud coseno y el cliente de Ollama.
+
+Desde la carpeta Backend:
+    python -m benchmarks.ejecutar                              # todo, resultados en benchmarks/resultados/
+    python -m benchmarks.ejecutar --solo pdf,similitud --salida base.json
+    python -m benchmarks.ejecutar --comparar base.json         # compara contra una corrida anterior
+
+El resultado es un JSON con el entorno (commit, Python, CPU) y las métricas de cada grupo, para
+comparar versiones con --comparar.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.cv_sinteticos import generar_cvs
+from benchmarks.servidor_ollama_falso import ServidorOllamaFalso
+
+CARPETA_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CARPETA_FIXTURES = os.path.join(CARPETA_BACKEND, "utils", "CV_ejemplos")
+CARPETA_RESULTADOS = os.path.join(CARPETA_BACKEND, "benchmarks", "resultados")
+GRUPOS = ("pdf", "similitud", "ollama")
+
+
+def resumen_tiempos(segundos):
+    """
+    Mínimo, percentiles y media (en milisegundos) de una lista de duraciones.
+    """
+    ms = np.asarray(segundos) * 1000
+    return {
+        "n": len(ms),
+        "min_ms": round(float(ms.min()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "media_ms": round(float(ms.mean()), 3),
+    }
+
+
+def _cronometrar(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+# --- PDF ---
+def _medir_extraccion(ruta, repeticiones):
+    """
+    Se ejecuta en un proceso nuevo: ru_maxrss es el pico del proceso y no baja, así cada
+    caso mide su propio pico sin arrastrar el de los anteriores.
+    """
+    import resource
+
+    from utils.pdf_utils import extraer_texto_desde_pdf
+
+    rss_base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    texto = ""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        texto = extraer_texto_desde_pdf(ruta)
+        tiempos.append(time.perf_counter() - inicio)
+    rss_pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return tiempos, len(texto or ""), rss_base, rss_pico
+
+
+def bench_pdf(paginas_por_cv, repeticiones, semilla):
+    import fitz
+
+    contexto = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as carpeta:
+        casos = {f"sintetico_{paginas}p": ruta for paginas, ruta in generar_cvs(carpeta, paginas_por_cv, semilla).items()}
+        if os.path.isdir(CARPETA_FIXTURES):
+            for nombre in sorted(os.listdir(CARPETA_FIXTURES)):
+                if nombre.lower().endswith(".pdf"):
+                    casos[f"fixture_{os.path.splitext(nombre)[0]}"] = os.path.join(CARPETA_FIXTURES, nombre)
+
+        resultados = {}
+        for nombre, ruta in casos.items():
+            with fitz.open(ruta) as documento:
+                paginas = documento.page_count
+            with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as pool:
+                tiempos, caracteres, rss_base, rss_pico = pool.submit(_medir_extraccion, ruta, repeticiones).result()
+            p50 = float(np.percentile(tiempos, 50))
+            resultados[nombre] = {
+                "paginas": paginas,
+                "caracteres": caracteres,
+                **resumen_tiempos(tiempos),
+                "paginas_por_segundo": round(paginas / p50, 1) if p50 else None,
+                # ru_maxrss está en KB en Linux
+                "rss_pico_mb": round(rss_pico / 1024, 1),
+                "rss_incremento_mb": round((rss_pico - rss_base) / 1024, 1),
+            }
+            print(f"  pdf {nombre}: {resultados[nombre]['paginas_por_segundo']} páginas/s, pico {resultados[nombre]['rss_pico_mb']} MB")
+
+        # Extracción de varios PDFs en el pool de procesos (carga masiva)
+        from utils.pdf_utils import cerrar_pool_procesos, extraer_textos_en_paralelo
+
+        rutas = list(casos.values()) * 4
+        total_paginas = sum(resultados[nombre]["paginas"] for nombre in casos) * 4
+        extraer_textos_en_paralelo(rutas)  # Calentamiento: arranque de los procesos
+        tiempos = _cronometrar(lambda: extraer_textos_en_paralelo(rutas), max(1, repeticiones // 2))
+        cerrar_pool_procesos()
+        p50 = float(np.percentile(tiempos, 50))
+        resultados["paralelo"] = {
+            "archivos": len(rutas),
+            "paginas": total_paginas,
+            "procesos": os.cpu_count(),
+            **resumen_tiempos(tiempos),
+            "paginas_por_segundo": round(total_paginas / p50, 1) if p50 else None,
+        }
+        print(f"  pdf paralelo: {resultados['paralelo']['paginas_por_segundo']} páginas/s")
+    return resultados
+
+
+# --- SIMILITUD ---
+def bench_similitud(tamanos, dimension, repeticiones, semilla):
+    from utils.embedding_utils import indices_top_k
+    from utils.ollama_utils import calcular_similitud_coseno, calcular_similitudes_coseno
+
+    generador = np.random.default_rng(semilla)
+    referencia = generador.standard_normal(dimension).astype(np.float32)
+    resultados = {}
+    for n in tamanos:
+        matriz = generador.standard_normal((n, dimension)).astype(np.float32)
+        vectores = matriz.tolist()  # Así llegan desde la BD / Ollama
+        caso = {
+            "matricial_ndarray": resumen_tiempos(_cronometrar(lambda: calcular_similitudes_coseno(matriz, referencia), repeticiones)),
+            "matricial_listas": resumen_tiempos(_cronometrar(lambda: calcular_similitudes_coseno(vectores, referencia), repeticiones)),
+        }
+        similitudes = calcular_similitudes_coseno(matriz, referencia)
+        caso["top_50"] = resumen_tiempos(_cronometrar(lambda: indices_top_k(similitudes, 50), repeticiones))
+
+        # Un par a la vez (sklearn): solo para lotes chicos, crece linealmente
+        if n <= 1000:
+            try:
+                tiempos = _cronometrar(lambda: [calcular_similitud_coseno(v, referencia) for v in vectores], max(1, repeticiones // 5))
+                caso["por_pares"] = resumen_tiempos(tiempos)
+            except ImportError as e:
+                caso["por_pares"] = {"omitido": str(e)}
+
+        p50 = caso["matricial_listas"]["p50_ms"] / 1000
+        caso["vectores_por_segundo"] = round(n / p50) if p50 else None
+        resultados[f"n_{n}"] = caso
+        print(f"  similitud n={n}: {caso['matricial_ndarray']['p50_ms']} ms (ndarray), {caso['matricial_listas']['p50_ms']} ms (listas)")
+    return {"dimension": dimension, "casos": resultados}
+
+
+# --- OLLAMA ---
+def bench_ollama(latencia_ms, repeticiones, concurrencia, tokens_por_segundo):
+    """
+    Cliente de Ollama contra el servidor simulado: el costo propio del cliente es la diferencia
+    entre la latencia medida y la latencia configurada en el servidor.
+    """
+    from utils import ollama_utils
+
+    mensajes = [{"role": "user", "content": "Genera 5 preguntas de entrevista"}]
+    resultados = {"latencia_servidor_ms": latencia_ms, "url": ollama_utils.ollama_base_url}
+
+    tiempos = _cronometrar(lambda: ollama_utils.call_ollama_chat_api(mensajes), repeticiones)
+    resultados["chat"] = resumen_tiempos(tiempos)
+    resultados["chat"]["sobrecosto_p50_ms"] = round(resultados["chat"]["p50_ms"] - latencia_ms, 3)
+
+    async def stream():
+        inicio = time.perf_counter()
+        primer_texto = None
+        async for _ in ollama_utils.call_ollama_chat_stream_async(mensajes):
+            if primer_texto is None:
+                primer_texto = time.perf_counter() - inicio
+        return primer_texto, time.perf_counter() - inicio
+
+    async def streams():
+        return [await stream() for _ in range(repeticiones)]
+
+    medidos = asyncio.run(streams())
+    resultados["chat_stream"] = {
+        "tokens_por_segundo_servidor": tokens_por_segundo,
+        "primer_texto": resumen_tiempos([primero for primero, _ in medidos]),
+        "total": resumen_tiempos([total for _, total in medidos]),
+    }
+
+    # Embeddings concurrentes (un texto por petición): mide el micro-batching del despachador
+    antes = ollama_utils.despachador_embeddings.estadisticas()
+    total_peticiones = concurrencia * repeticiones
+    textos = [f"texto de prueba {uuid.uuid4()}" for _ in range(total_peticiones)]
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as executor:
+        list(executor.map(ollama_utils.call_ollama_embeddings_api, textos))
+    segundos = time.perf_counter() - inicio
+    despues = ollama_utils.despachador_embeddings.estadisticas()
+    lotes = despues["lotes_enviados"] - antes["lotes_enviados"]
+    resultados["embeddings_concurrentes"] = {
+        "concurrencia": concurrencia,
+        "peticiones": total_peticiones,
+        "segundos": round(segundos, 3),
+        "peticiones_por_segundo": round(total_peticiones / segundos, 1),
+        "lotes_enviados": lotes,
+        "micro_batching": despues["habilitado"],
+    }
+
+    # Embeddings por lote (/api/embed con entrada múltiple), como en la carga masiva
+    def lote():
+        ollama_utils.call_ollama_embeddings_lote([f"cv {uuid.uuid4()}" for _ in range(100)])
+
+    tiempos = _cronometrar(lote, max(1, repeticiones // 2))
+    resultados["embeddings_lote_100"] = resumen_tiempos(tiempos)
+    resultados["embeddings_lote_100"]["textos_por_segundo"] = round(100 / float(np.percentile(tiempos, 50)), 1)
+    print(f"  ollama chat p50 {resultados['chat']['p50_ms']} ms, embeddings {resultados['embeddings_concurrentes']['peticiones_por_segundo']} pet/s")
+    return resultados
+
+
+# --- ENTORNO Y COMPARACIÓN ---
+def _commit_git():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=CARPETA_BACKEND, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _entorno():
+    import fitz
+
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit_git(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "pymupdf": fitz.VersionBind,
+    }
+
+
+def _aplanar(datos, prefijo=""):
+    for clave, valor in datos.items():
+        ruta = f"{prefijo}.{clave}" if prefijo else clave
+        if isinstance(valor, dict):
+            yield from _aplanar(valor, ruta)
+        elif isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            yield ruta, valor
+
+
+def _mayor_es_mejor(metrica):
+    return "por_segundo" in metrica
+
+
+def comparar(base, actual, tolerancia, umbral_ms=1.0):
+    """
+    Compara las métricas de tiempo, throughput y memoria de dos corridas. Retorna la lista de
+    regresiones mayores que la tolerancia (fracción, p. ej. 0.1 = 10 %). Los tiempos base menores
+    que umbral_ms se ignoran: a esa escala el ruido supera cualquier tolerancia razonable.
+    """
+    metricas_base = dict(_aplanar(base["resultados"]))
+    regresiones = []
+    for metrica, valor in _aplanar(actual["resultados"]):
+        anterior = metricas_base.get(metrica)
+        relevante = metrica.endswith(("p50_ms", "p95_ms", "rss_pico_mb")) or _mayor_es_mejor(metrica)
+        if not relevante or not anterior or (metrica.endswith("_ms") and anterior < umbral_ms):
+            continue
+        cambio = (valor - anterior) / anterior
+        peor = -cambio if _mayor_es_mejor(metrica) else cambio
+        marca = "REGRESIÓN" if peor > tolerancia else ("mejora" if peor < -tolerancia else "")
+        print(f"{metrica:70s} {anterior:>12.3f} -> {valor:>12.3f} ({cambio:+.1%}) {marca}")
+        if peor > tolerancia:
+            regresiones.append(metrica)
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de pdf_utils, similitud y cliente de Ollama")
+    parser.add_argument("--solo", default=",".join(GRUPOS), help="Grupos a ejecutar: pdf,similitud,ollama")
+    parser.add_argument("--salida", help="Archivo JSON de resultados (por defecto benchmarks/resultados/<fecha>_<commit>.json)")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior contra el que comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.10, help="Cambio relativo que se considera regresión")
+    parser.add_argument("--umbral-ms", type=float, default=1.0, help="Tiempos base menores no se comparan")
+    parser.add_argument("--repeticiones", type=int, default=10)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--paginas", default="1,2,5,10,25", help="Páginas de los CVs sintéticos")
+    parser.add_argument("--tamanos", default="1,10,100,1000,10000,50000", help="Vectores por lote en similitud")
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--latencia-ms", type=float, default=20, help="Latencia del Ollama simulado")
+    parser.add_argument("--tokens-por-segundo", type=float, default=0, help="Ritmo del streaming simulado")
+    parser.add_argument("--concurrencia", type=int, default=16)
+    args = parser.parse_args()
+
+    grupos = [grupo.strip() for grupo in args.solo.split(",") if grupo.strip()]
+    desconocidos = set(grupos) - set(GRUPOS)
+    if desconocidos:
+        parser.error(f"Grupos desconocidos: {', '.join(sorted(desconocidos))}")
+
+    # El servidor simulado se levanta antes de importar ollama_utils, que lee OLLAMA_BASE_URL al importarse
+    servidor = None
+    if "ollama" in grupos:
+        servidor = ServidorOllamaFalso(
+            latencia_segundos=args.latencia_ms / 1000, dimension=args.dimension, tokens_por_segundo=args.tokens_por_segundo
+        ).iniciar()
+        os.environ["OLLAMA_BASE_URL"] = servidor.url
+    # Sin cache en disco ni backend local: se mide siempre el mismo camino
+    os.environ["EMBEDDING_CACHE_DIR"] = ""
+    os.environ["EMBEDDING_BACKEND"] = "ollama"
+
+    resultados = {}
+    try:
+        if "pdf" in grupos:
+            print("Extracción de PDFs")
+            paginas = [int(p) for p in args.paginas.split(",")]
+            resultados["pdf"] = bench_pdf(paginas, args.repeticiones, args.semilla)
+        if "similitud" in grupos:
+            print("Similitud coseno")
+            tamanos = [int(n) for n in args.tamanos.split(",")]
+            resultados["similitud"] = bench_similitud(tamanos, args.dimension, args.repeticiones, args.semilla)
+        if "ollama" in grupos:
+            print("Cliente de Ollama (servidor simulado)")
+            resultados["ollama"] = bench_ollama(args.latencia_ms, args.repeticiones, args.concurrencia, args.tokens_por_segundo)
+    finally:
+        if servidor is not None:
+            servidor.detener()
+
+    corrida = {"entorno": _entorno(), "parametros": vars(args), "resultados": resultados}
+    salida = args.salida
+    if not salida:
+        os.makedirs(CARPETA_RESULTADOS, exist_ok=True)
+        nombre = f"{datetime.now():%Y%m%d_%H%M%S}_{corrida['entorno']['commit'] or 'sin-commit'}.json"
+        salida = os.path.join(CARPETA_RESULTADOS, nombre)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(corrida, f, indent=2, ensure_ascii=False)
+    print(f"Resultados guardados en {salida}")
+
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            base = json.load(f)
+        regresiones = comparar(base, corrida, args.tolerancia, args.umbral_ms)
+        if regresiones:
+            print(f"{len(regresiones)} regresiones mayores a {args.tolerancia:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Prueba de carga de punta a punta contra una API en ejecución: /procesamiento/calificar,
+/procesamiento/analisis-completo y los listados, con concurrencia creciente por escalones.
+
+Preparación (desde la carpeta Backend):
+    python -m benchmarks.servidor_ollama_falso --latencia-ms 80 --tokens-por-segundo 40 --tokens-respuesta 300
+    python -m benchmarks.semilla_carga --recrear --salida semilla.json
+    OLLAMA_BASE_URL=http://127.0.0.1:11434 uvicorn main:app --port 8000
+
+Ejecución:
+    python -m benchmarks.prueba_carga --url http://localhost:8000 --semilla semilla.json \\
+        --concurrencias 1,2,4,8,16 --duracion 60 --mezcla calificar=4,analisis=1,listados=5
+
+Por cada escalón reporta throughput y percentiles de latencia por endpoint, y los CVs calificados
+por minuto; el resumen indica la mayor concurrencia cuyo p99 se mantuvo bajo --p99-objetivo.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import httpx
+import numpy as np
+
+from benchmarks.cv_sinteticos import generar_cv_pdf
+
+LISTADOS = ["/candidatos", "/ofertas", "/documentos", "/empresas"]
+OPERACIONES = ("calificar", "analisis", "listados")
+ENDPOINTS = {
+    "calificar": "POST /procesamiento/calificar",
+    "analisis": "POST /procesamiento/analisis-completo",
+    "listados": "GET listados",
+}
+
+
+def preparar_cvs(cantidad, paginas, semilla):
+    """
+    PDFs sintéticos distintos en memoria: cada subida tiene contenido nuevo (sin reutilizar
+    texto ni embedding por hash) hasta agotar la lista.
+    """
+    with tempfile.TemporaryDirectory() as carpeta:
+        cvs = []
+        for i in range(cantidad):
+            ruta = generar_cv_pdf(os.path.join(carpeta, f"cv_{i}.pdf"), paginas, semilla * 100000 + i)
+            with open(ruta, "rb") as f:
+                cvs.append(f.read())
+    return cvs
+
+
+class Escenario:
+    """
+    Genera las peticiones de la mezcla configurada y registra (endpoint, estado, segundos).
+    """
+
+    def __init__(self, cliente, ids, cvs, mezcla, generador):
+        self.cliente = cliente
+        self.oferta_ids = ids["oferta_ids"]
+        self.candidato_ids = ids["candidato_ids"]
+        self.cvs = cvs
+        self.siguiente_cv = 0
+        self.operaciones = list(mezcla.keys())
+        self.pesos = list(mezcla.values())
+        self.generador = generador
+
+    def _cv(self):
+        contenido = self.cvs[self.siguiente_cv % len(self.cvs)]
+        self.siguiente_cv += 1
+        return {"file": (f"cv_{self.siguiente_cv}.pdf", contenido, "application/pdf")}
+
+    async def _peticion(self, operacion):
+        candidato_id = self.generador.choice(self.candidato_ids)
+        oferta_id = self.generador.choice(self.oferta_ids)
+        if operacion == "calificar":
+            return ENDPOINTS[operacion], await self.cliente.post(
+                "/procesamiento/calificar",
+                params={"candidato_id": candidato_id, "oferta_id": oferta_id},
+                files=self._cv()
+            )
+        if operacion == "analisis":
+            return ENDPOINTS[operacion], await self.cliente.post(
+                f"/procesamiento/analisis-completo/{candidato_id}/{oferta_id}", files=self._cv()
+            )
+        ruta = self.generador.choice(LISTADOS)
+        return f"GET {ruta}", await self.cliente.get(ruta, params={"limite": 50})
+
+    async def ejecutar_una(self, mediciones):
+        operacion = self.generador.choices(self.operaciones, self.pesos)[0]
+        inicio = time.perf_counter()
+        try:
+            endpoint, respuesta = await self._peticion(operacion)
+            estado = respuesta.status_code
+        except httpx.HTTPError as e:
+            endpoint, estado = ENDPOINTS[operacion], type(e).__name__
+        mediciones.append((endpoint, estado, time.perf_counter() - inicio))
+
+
+async def ejecutar_escalon(escenario, concurrencia, duracion):
+    mediciones = []
+    fin = time.perf_counter() + duracion
+
+    async def usuario():
+        while time.perf_counter() < fin:
+            await escenario.ejecutar_una(mediciones)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(usuario() for _ in range(concurrencia)))
+    return mediciones, time.perf_counter() - inicio
+
+
+def resumir(mediciones, segundos):
+    """
+    Throughput y percentiles por endpoint. Las peticiones con error cuentan en la latencia
+    pero no en los CVs procesados.
+    """
+    por_endpoint = defaultdict(list)
+    for endpoint, estado, duracion in mediciones:
+        por_endpoint[endpoint].append((estado, duracion))
+
+    resumen = {}
+    for endpoint, datos in sorted(por_endpoint.items()):
+        ms = np.array([duracion for _, duracion in datos]) * 1000
+        errores = sum(1 for estado, _ in datos if not (isinstance(estado, int) and estado < 400))
+        resumen[endpoint] = {
+            "peticiones": len(datos),
+            "errores": errores,
+            "por_segundo": round(len(datos) / segundos, 2),
+            "por_minuto": round(len(datos) / segundos * 60, 1),
+            "p50_ms": round(float(np.percentile(ms, 50)), 1),
+            "p90_ms": round(float(np.percentile(ms, 90)), 1),
+            "p99_ms": round(float(np.percentile(ms, 99)), 1),
+            "max_ms": round(float(ms.max()), 1),
+        }
+
+    cvs_ok = sum(
+        1 for endpoint, estado, _ in mediciones
+        if endpoint.startswith("POST /procesamiento") and isinstance(estado, int) and estado < 400
+    )
+    return {"segundos": round(segundos, 1), "cvs_por_minuto": round(cvs_ok / segundos * 60, 1), "endpoints": resumen}
+
+
+def _imprimir(concurrencia, resultado):
+    print(f"\nConcurrencia {concurrencia}: {resultado['cvs_por_minuto']} CVs/min en {resultado['segundos']} s")
+    print(f"  {'endpoint':40s} {'n':>6s} {'err':>5s} {'req/s':>8s} {'p50':>9s} {'p90':>9s} {'p99':>9s}")
+    for endpoint, datos in resultado["endpoints"].items():
+        print(
+            f"  {endpoint:40s} {datos['peticiones']:6d} {datos['errores']:5d} {datos['por_segundo']:8.2f} "
+            f"{datos['p50_ms']:9.1f} {datos['p90_ms']:9.1f} {datos['p99_ms']:9.1f}"
+        )
+
+
+def _mezcla(texto):
+    mezcla = {}
+    for parte in texto.split(","):
+        operacion, _, peso = parte.partition("=")
+        if operacion.strip() not in OPERACIONES:
+            raise argparse.ArgumentTypeError(f"Operación desconocida: {operacion}")
+        mezcla[operacion.strip()] = float(peso or 1)
+    return mezcla
+
+
+async def ejecutar(args):
+    with open(args.semilla, "r", encoding="utf-8") as f:
+        ids = json.load(f)
+    concurrencias = [int(c) for c in args.concurrencias.split(",")]
+
+    print(f"Generando {args.cvs} CVs sintéticos de {args.paginas} páginas")
+    cvs = preparar_cvs(args.cvs, args.paginas, args.semilla_aleatoria)
+
+    escalones = {}
+    limites = httpx.Limits(max_connections=max(concurrencias), max_keepalive_connections=max(concurrencias))
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limites) as cliente:
+        escenario = Escenario(cliente, ids, cvs, args.mezcla, random.Random(args.semilla_aleatoria))
+        for concurrencia in concurrencias:
+            mediciones, segundos = await ejecutar_escalon(escenario, concurrencia, args.duracion)
+            escalones[concurrencia] = resumir(mediciones, segundos)
+            _imprimir(concurrencia, escalones[concurrencia])
+
+    # Mayor escalón en el que ningún endpoint superó el p99 objetivo
+    sostenible = None
+    for concurrencia, resultado in escalones.items():
+        if all(datos["p99_ms"] <= args.p99_objetivo * 1000 for datos in resultado["endpoints"].values()):
+            sostenible = concurrencia
+        else:
+            break
+    resumen = {
+        "concurrencia_sostenible": sostenible,
+        "cvs_por_minuto_sostenible": escalones[sostenible]["cvs_por_minuto"] if sostenible else None,
+    }
+    print(f"\nResumen (p99 <= {args.p99_objetivo} s): {resumen}")
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "parametros": vars(args),
+        "escalones": escalones,
+        "resumen": resumen,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API de procesamiento")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--semilla", default="semilla.json", help="JSON generado por benchmarks.semilla_carga")
+    parser.add_argument("--concurrencias", default="1,2,4,8,16", help="Escalones de usuarios concurrentes")
+    parser.add_argument("--duracion", type=float, default=60, help="Segundos por escalón")
+    parser.add_argument("--mezcla", type=_mezcla, default=_mezcla("calificar=4,analisis=1,listados=5"))
+    parser.add_argument("--cvs", type=int, default=300, help="PDFs distintos; al agotarse se repiten (reutilización por hash)")
+    parser.add_argument("--paginas", type=int, default=2)
+    parser.add_argument("--p99-objetivo", type=float, default=10, help="Segundos")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--semilla-aleatoria", type=int, default=42)
+    parser.add_argument("--salida", default="resultado_carga.json")
+    args = parser.parse_args()
+
+    resultado = asyncio.run(ejecutar(args))
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    print(f"Resultados guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
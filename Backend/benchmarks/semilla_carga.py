@@ -0,0 +1,128 @@
+"""
+Datos semilla para las pruebas de carga: empresas, ofertas y candidatos con documento, postulación,
+ranking y embedding, en la BD configurada por DB_* (Postgres con pgvector).
+
+Desde la carpeta Backend:
+    python -m benchmarks.semilla_carga --recrear --candidatos 5000 --salida semilla.json
+
+--recrear ejecuta "Modelos BD/scripts/crea-tablas.sql" (borra y crea todas las tablas).
+El JSON de salida (ids de ofertas y candidatos) lo usa benchmarks.prueba_carga.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+from datetime import datetime
+
+import numpy as np
+
+from db.conexion_db import SesionLocal, engine
+from db.models import Empresa, OfertaLaboral, embedding_dim
+from utils.persistencia_utils import _insertar_con_ids, insertar_lote_postulaciones
+
+CARPETA_BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT_TABLAS = os.path.join(os.path.dirname(CARPETA_BACKEND), "Modelos BD", "scripts", "crea-tablas.sql")
+
+TITULOS = ["Desarrollador Backend", "Analista de Datos", "Ingeniero DevOps", "Desarrollador Full Stack", "QA Automation"]
+REQUISITOS = ["Python", "FastAPI", "PostgreSQL", "Docker", "Kubernetes", "React", "AWS", "Pandas", "Git", "Linux"]
+CIUDADES = ["Lima", "Arequipa", "Trujillo", "Cusco", "Remoto"]
+
+
+def recrear_tablas():
+    with open(SCRIPT_TABLAS, "r", encoding="utf-8") as f:
+        script = f.read()
+    with engine.begin() as conexion:
+        conexion.exec_driver_sql(script)
+
+
+def _texto_cv(generador, indice):
+    habilidades = ", ".join(generador.sample(REQUISITOS, 4))
+    return (
+        f"Candidato Semilla {indice}\ncandidato{indice}@ejemplo.com\n"
+        f"EXPERIENCIA\n{generador.choice(TITULOS)} con {generador.randint(1, 12)} años usando {habilidades}.\n"
+    )
+
+
+def sembrar(db, empresas, ofertas, candidatos, semilla, tamano_lote=1000):
+    """
+    Inserta los datos en bloque (una transacción por lote de candidatos). Retorna los ids creados.
+    """
+    generador = random.Random(semilla)
+    vectores = np.random.default_rng(semilla)
+    ahora = datetime.utcnow()
+
+    empresa_ids = _insertar_con_ids(db, Empresa, [
+        {"nombre": f"Empresa Semilla {i}", "ruc": f"20{i:09d}", "creado_en": ahora} for i in range(empresas)
+    ])
+    oferta_ids = _insertar_con_ids(db, OfertaLaboral, [
+        {
+            "empresa_id": generador.choice(empresa_ids),
+            "titulo": generador.choice(TITULOS),
+            "descripcion": f"Oferta semilla {i}: trabajo en equipo con proyectos modernos.",
+            "requisitos": ", ".join(generador.sample(REQUISITOS, 4)),
+            "ubicacion": generador.choice(CIUDADES),
+            "fecha_publicacion": ahora,
+            "estado": "activa",
+        }
+        for i in range(ofertas)
+    ])
+    db.commit()
+
+    candidato_ids = []
+    for inicio in range(0, candidatos, tamano_lote):
+        por_oferta = {}
+        for i in range(inicio, min(inicio + tamano_lote, candidatos)):
+            texto = _texto_cv(generador, i)
+            vector = vectores.standard_normal(embedding_dim)
+            vector /= np.linalg.norm(vector)
+            score = generador.random()
+            por_oferta.setdefault(generador.choice(oferta_ids), []).append({
+                "nombre_completo": f"Candidato Semilla {i}",
+                "nombre_archivo": f"semilla_{i}.pdf",
+                "ruta_archivo": None,
+                "texto": texto,
+                "hash_contenido": hashlib.sha256(texto.encode("utf-8")).hexdigest(),
+                "score": score,
+                "observaciones": "Datos semilla de prueba de carga",
+                "embedding": vector.tolist(),
+                "fragmentos": None,
+            })
+        for oferta_id, filas in por_oferta.items():
+            candidato_ids.extend(candidato_id for candidato_id, _ in insertar_lote_postulaciones(db, oferta_id, filas))
+        db.commit()
+        print(f"  {len(candidato_ids)}/{candidatos} candidatos")
+
+    return {"empresa_ids": empresa_ids, "oferta_ids": oferta_ids, "candidato_ids": candidato_ids}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Datos semilla para pruebas de carga")
+    parser.add_argument("--recrear", action="store_true", help="Borra y crea las tablas con crea-tablas.sql")
+    parser.add_argument("--empresas", type=int, default=10)
+    parser.add_argument("--ofertas", type=int, default=50)
+    parser.add_argument("--candidatos", type=int, default=2000)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--salida", default="semilla.json")
+    args = parser.parse_args()
+
+    if args.recrear:
+        print(f"Recreando tablas con {SCRIPT_TABLAS}")
+        recrear_tablas()
+
+    db = SesionLocal()
+    try:
+        ids = sembrar(db, args.empresas, args.ofertas, args.candidatos, args.semilla)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(ids, f)
+    print(f"{len(ids['oferta_ids'])} ofertas y {len(ids['candidato_ids'])} candidatos; ids en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
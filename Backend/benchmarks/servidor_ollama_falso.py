@@ -0,0 +1,208 @@
+"""
+Servidor HTTP que imita la API de Ollama (/api/chat, /api/embeddings, /api/embed) con latencia
+configurable, para medir el cliente y la API sin un modelo real.
+
+Uso independiente:
+    python -m benchmarks.servidor_ollama_falso --puerto 11434 --latencia-ms 50
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Contenido JSON válido tanto para la extracción de CVs como para la evaluación de respuestas
+RESPUESTA_JSON = {
+    "nombre_completo": "Candidato de Prueba",
+    "email": "candidato@ejemplo.com",
+    "telefono": "+51 999999999",
+    "resumen": "Desarrollador backend con experiencia en Python y FastAPI",
+    "experiencia_laboral": [{"puesto": "Desarrollador", "empresa": "Empresa", "periodo": "2020-2024", "descripcion": "APIs REST"}],
+    "educacion": [{"titulo": "Ingeniería de Sistemas", "institucion": "Universidad", "periodo": "2015-2020"}],
+    "habilidades": ["Python", "FastAPI", "PostgreSQL"],
+    "calificacion_relevancia": 4,
+    "calificacion_profundidad_tecnica": 4,
+    "calificacion_claridad": 5,
+    "calificacion_desafios_soluciones": 3,
+    "comentario": "Respuesta clara",
+    "pregunta_seguimiento": "¿Cómo lo escalarías?"
+}
+RESPUESTA_TEXTO = (
+    "<think>Analizo el perfil del candidato.</think>"
+    "1. ¿Cómo diseñaste tu última API?\n2. ¿Cómo manejas las migraciones?\n"
+    "3. ¿Qué estrategia de pruebas usas?\n4. ¿Cómo optimizas consultas lentas?\n5. ¿Cómo despliegas?"
+)
+
+
+def vector_determinista(texto, dimension):
+    """
+    Vector pseudoaleatorio estable por texto: el mismo texto da el mismo embedding.
+    """
+    generador = random.Random(zlib.crc32(texto.encode("utf-8")))
+    return [generador.uniform(-1, 1) for _ in range(dimension)]
+
+
+class ServidorOllamaFalso:
+    """
+    Ollama simulado en un hilo aparte.
+    - latencia_segundos: espera antes de responder (o antes del primer fragmento en streaming),
+      con una variación uniforme de ±jitter_segundos.
+    - tokens_por_segundo: ritmo de generación del chat (0 = instantáneo). Sin streaming, la respuesta
+      tarda además tokens_respuesta / tokens_por_segundo.
+    - tokens_respuesta: tokens generados que se simulan y reportan en eval_count (0 = según el contenido).
+    - segundos_por_texto_embedding: costo adicional por cada texto embebido (los lotes tardan más).
+    """
+
+    def __init__(self, host="127.0.0.1", puerto=0, latencia_segundos=0.05, dimension=768, tokens_por_segundo=0,
+                 jitter_segundos=0, tokens_respuesta=0, segundos_por_texto_embedding=0):
+        self.latencia_segundos = latencia_segundos
+        self.jitter_segundos = jitter_segundos
+        self.dimension = dimension
+        self.tokens_por_segundo = tokens_por_segundo
+        self.tokens_respuesta = tokens_respuesta
+        self.segundos_por_texto_embedding = segundos_por_texto_embedding
+        self.peticiones = 0
+        self._lock = threading.Lock()
+        self._servidor = ThreadingHTTPServer((host, puerto), self._handler())
+        self._servidor.daemon_threads = True
+        self._hilo = None
+
+    @property
+    def url(self):
+        host, puerto = self._servidor.server_address[:2]
+        return f"http://{host}:{puerto}"
+
+    def _handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Cabeceras y cuerpo van en escrituras separadas: sin esto el ACK retardado suma ~40 ms
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _json(self, datos, estado=200):
+                cuerpo = json.dumps(datos).encode("utf-8")
+                self.send_response(estado)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def do_GET(self):
+                # /api/tags: usado como verificación de salud
+                self._json({"models": []})
+
+            def do_POST(self):
+                largo = int(self.headers.get("Content-Length") or 0)
+                cuerpo = json.loads(self.rfile.read(largo) or b"{}")
+                with servidor._lock:
+                    servidor.peticiones += 1
+                time.sleep(servidor._latencia())
+
+                if self.path == "/api/embeddings":
+                    time.sleep(servidor.segundos_por_texto_embedding)
+                    self._json({"embedding": vector_determinista(cuerpo.get("prompt", ""), servidor.dimension)})
+                elif self.path == "/api/embed":
+                    entradas = cuerpo.get("input", [])
+                    entradas = [entradas] if isinstance(entradas, str) else entradas
+                    time.sleep(servidor.segundos_por_texto_embedding * len(entradas))
+                    self._json({"embeddings": [vector_determinista(t, servidor.dimension) for t in entradas]})
+                elif self.path == "/api/chat":
+                    contenido = json.dumps(RESPUESTA_JSON, ensure_ascii=False) if cuerpo.get("format") else RESPUESTA_TEXTO
+                    if cuerpo.get("stream"):
+                        self._chat_stream(cuerpo.get("model"), contenido)
+                    else:
+                        if servidor.tokens_por_segundo:
+                            time.sleep(servidor._tokens(contenido) / servidor.tokens_por_segundo)
+                        self._json({
+                            "model": cuerpo.get("model"),
+                            "message": {"role": "assistant", "content": contenido},
+                            "done": True,
+                            **servidor._uso(contenido)
+                        })
+                else:
+                    self._json({"error": f"ruta no soportada: {self.path}"}, estado=404)
+
+            def _chat_stream(self, modelo, contenido):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                # Fragmentos de ~4 caracteres, como tokens; el ritmo total respeta tokens_por_segundo
+                fragmentos = [contenido[inicio:inicio + 4] for inicio in range(0, len(contenido), 4)]
+                pausa = servidor._tokens(contenido) / servidor.tokens_por_segundo / len(fragmentos) if servidor.tokens_por_segundo else 0
+                for fragmento in fragmentos:
+                    self._chunk({"model": modelo, "message": {"role": "assistant", "content": fragmento}, "done": False})
+                    if pausa:
+                        time.sleep(pausa)
+                self._chunk({"model": modelo, "message": {"role": "assistant", "content": ""}, "done": True, **servidor._uso(contenido)})
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _chunk(self, datos):
+                linea = (json.dumps(datos, ensure_ascii=False) + "\n").encode("utf-8")
+                self.wfile.write(f"{len(linea):X}\r\n".encode() + linea + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+    def _latencia(self):
+        if not self.jitter_segundos:
+            return self.latencia_segundos
+        return max(0.0, self.latencia_segundos + random.uniform(-self.jitter_segundos, self.jitter_segundos))
+
+    def _tokens(self, contenido):
+        return self.tokens_respuesta or max(1, len(contenido) // 4)
+
+    def _uso(self, contenido):
+        tokens = self._tokens(contenido)
+        velocidad = self.tokens_por_segundo or 50
+        return {"prompt_eval_count": 100, "eval_count": tokens, "eval_duration": int(tokens / velocidad * 1e9)}
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True, name="ollama-falso")
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *args):
+        self.detener()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor Ollama simulado")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=11434)
+    parser.add_argument("--latencia-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Variación uniforme de la latencia")
+    parser.add_argument("--tokens-por-segundo", type=float, default=0, help="Ritmo de generación del chat (0 = instantáneo)")
+    parser.add_argument("--tokens-respuesta", type=int, default=0, help="Tokens generados por respuesta (0 = según el contenido)")
+    parser.add_argument("--ms-por-texto-embedding", type=float, default=0)
+    parser.add_argument("--dimension", type=int, default=768)
+    args = parser.parse_args()
+
+    servidor = ServidorOllamaFalso(
+        args.host, args.puerto, args.latencia_ms / 1000, args.dimension, args.tokens_por_segundo,
+        jitter_segundos=args.jitter_ms / 1000,
+        tokens_respuesta=args.tokens_respuesta,
+        segundos_por_texto_embedding=args.ms_por_texto_embedding / 1000
+    )
+    print(f"Ollama simulado escuchando en {servidor.url} (latencia {args.latencia_ms} ms, {args.tokens_por_segundo or '∞'} tokens/s)")
+    try:
+        servidor._servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
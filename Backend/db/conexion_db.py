@@ -1,20 +1,138 @@
-from sqlalchemy import create_engine
+import threading
+import time
+
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from os import getenv
 
-user = "postgres"
+user = getenv("DB_USER", "postgres")
 password = getenv("DB_PASSWORD", "1234")
-host = "localhost:5432"
-database = "CV-Preselector"
+host = f"{getenv('DB_HOST', 'localhost')}:{getenv('DB_PORT', '5432')}"
+database = getenv("DB_NAME", "CV-Preselector")
 
 URL_DATABASE = f"postgresql://{user}:{password}@{host}/{database}"
+URL_DATABASE_ASYNC = f"postgresql+asyncpg://{user}:{password}@{host}/{database}"
+
+# Pool de conexiones (cada motor, síncrono y asíncrono, tiene el suyo)
+DB_POOL_SIZE = int(getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(getenv("DB_POOL_TIMEOUT", "30"))  # Espera máxima por una conexión libre
+DB_POOL_RECYCLE = int(getenv("DB_POOL_RECYCLE", "1800"))  # Renovar conexiones más antiguas (segundos)
+DB_POOL_PRE_PING = getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "si")
+
+
+class EstadisticasPool:
+    """
+    Contadores de espera por conexión de un pool: cuánto tardan los checkouts y cuántos
+    agotan DB_POOL_TIMEOUT.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+        self.timeouts = 0
+
+    def registrar(self, segundos, agotado=False):
+        with self._lock:
+            if agotado:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.espera_total += segundos
+            self.espera_max = max(self.espera_max, segundos)
+
+    def como_dict(self, pool):
+        capacidad = pool.size() + DB_MAX_OVERFLOW
+        en_uso = pool.checkedout()
+        with self._lock:
+            return {
+                "tamano": pool.size(),
+                "max_overflow": DB_MAX_OVERFLOW,
+                "en_uso": en_uso,
+                "libres": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "saturacion": en_uso / capacidad if capacidad else 0.0,
+                "checkouts": self.checkouts,
+                "espera_promedio_ms": self.espera_total / self.checkouts * 1000 if self.checkouts else 0.0,
+                "espera_max_ms": self.espera_max * 1000,
+                "timeouts": self.timeouts,
+            }
+
+
+class _EsperaMedida:
+    """
+    Mezcla para los pools de SQLAlchemy: mide el tiempo de espera de cada checkout.
+    """
+    estadisticas = None
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexion = super()._do_get()
+        except exc.TimeoutError:
+            self.estadisticas.registrar(time.perf_counter() - inicio, agotado=True)
+            raise
+        self.estadisticas.registrar(time.perf_counter() - inicio)
+        return conexion
+
+
+class PoolMedido(_EsperaMedida, QueuePool):
+    estadisticas = EstadisticasPool()
+
+
+class PoolAsyncMedido(_EsperaMedida, AsyncAdaptedQueuePool):
+    estadisticas = EstadisticasPool()
 
-engine = create_engine(URL_DATABASE)
+
+_opciones_pool = dict(
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+)
+
+engine = create_engine(URL_DATABASE, poolclass=PoolMedido, **_opciones_pool)
 SesionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Motor asíncrono (asyncpg) para endpoints async: esperan la BD sin ocupar el threadpool
+async_engine = create_async_engine(URL_DATABASE_ASYNC, poolclass=PoolAsyncMedido, **_opciones_pool)
+SesionAsync = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+async def _codec_vector_texto(conexion):
+    # El tipo Vector de pgvector.sqlalchemy ya convierte a/desde texto ("[0.1,0.2,...]")
+    await conexion.set_type_codec("vector", schema="public", encoder=str, decoder=str, format="text")
+
+
+@event.listens_for(async_engine.sync_engine, "connect")
+def _registrar_vector_asyncpg(dbapi_connection, connection_record):
+    # asyncpg no conoce el tipo vector: se registra su codec en cada conexión nueva
+    dbapi_connection.run_async(_codec_vector_texto)
+
+
 def get_db():
     db = SesionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    async with SesionAsync() as db:
+        yield db
+
+
+def estadisticas_pools():
+    """
+    Estado y tiempos de espera de los pools síncrono y asíncrono.
+    """
+    return {
+        "sync": PoolMedido.estadisticas.como_dict(engine.pool),
+        "async": PoolAsyncMedido.estadisticas.como_dict(async_engine.pool),
+    }
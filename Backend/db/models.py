@@ -1,10 +1,14 @@
 from datetime import datetime, date
+from os import getenv
 from typing import List, Optional
 
+from pgvector.sqlalchemy import Vector
 from sqlalchemy import (
     ForeignKey,
+    Index,
     String,
     Text,
+    UniqueConstraint,
     Integer,
     DateTime,
     Date,
@@ -12,6 +16,9 @@ from sqlalchemy import (
 )
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
+# Dimensión de los embeddings (nomic-embed-text = 768)
+embedding_dim = int(getenv("EMBEDDING_DIM", "768"))
+
 class Base(DeclarativeBase):
     pass
 
@@ -39,6 +46,10 @@ class OfertaLaboral(Base):
     ubicacion: Mapped[Optional[str]] = mapped_column(String(255))
     fecha_publicacion: Mapped[datetime] = mapped_column(default=datetime.utcnow)
     estado: Mapped[str] = mapped_column(String(50), default="activa")
+    embedding: Mapped[Optional[list]] = mapped_column(Vector(embedding_dim)) # Embedding de descripción + requisitos
+    embedding_modelo: Mapped[Optional[str]] = mapped_column(String(100))
+    embedding_hash: Mapped[Optional[str]] = mapped_column(String(64)) # Versión: SHA-256 del texto embebido
+    embedding_fecha: Mapped[Optional[datetime]]
 
     empresa: Mapped["Empresa"] = relationship(back_populates="ofertas")
     postulaciones: Mapped[List["Postulacion"]] = relationship("Postulacion", back_populates="oferta")
@@ -67,6 +78,7 @@ class CVDocumento(Base):
     nombre_archivo: Mapped[Optional[str]] = mapped_column(String(255))
     ruta_archivo: Mapped[Optional[str]] = mapped_column(Text)
     texto_extraido: Mapped[Optional[str]] = mapped_column(Text)
+    hash_contenido: Mapped[Optional[str]] = mapped_column(String(64), index=True) # SHA-256 del archivo subido
     creado_en: Mapped[datetime] = mapped_column(default=datetime.utcnow)
 
     candidato: Mapped["Candidato"] = relationship(back_populates="cv_documentos")
@@ -87,14 +99,43 @@ class Postulacion(Base):
 
 class CVEmbedding(Base):
     __tablename__ = "cv_embedding"
+    __table_args__ = (
+        # Índice ANN (HNSW) para búsqueda de vecinos más cercanos por distancia coseno
+        Index(
+            "ix_cv_embedding_embedding_hnsw",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     candidato_id: Mapped[int] = mapped_column(ForeignKey("candidato.id"), unique=True)
-    embedding: Mapped[Optional[str]] = mapped_column(Text) # Almacenar como JSON serializado
+    embedding: Mapped[Optional[list]] = mapped_column(Vector(embedding_dim))
     modelo: Mapped[Optional[str]] = mapped_column(String(100))
+    hash_contenido: Mapped[Optional[str]] = mapped_column(String(64), index=True) # SHA-256 del PDF de origen
     fecha_generacion: Mapped[datetime] = mapped_column(default=datetime.utcnow)
 
     candidato: Mapped["Candidato"] = relationship(back_populates="embedding")
+    # Vectores por fragmento del CV; `embedding` es su promedio
+    fragmentos: Mapped[List["CVEmbeddingFragmento"]] = relationship(
+        "CVEmbeddingFragmento", back_populates="cv_embedding",
+        cascade="all, delete-orphan", order_by="CVEmbeddingFragmento.indice"
+    )
+
+
+class CVEmbeddingFragmento(Base):
+    __tablename__ = "cv_embedding_fragmento"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    cv_embedding_id: Mapped[int] = mapped_column(ForeignKey("cv_embedding.id", ondelete="CASCADE"), index=True)
+    indice: Mapped[int] = mapped_column(Integer)
+    inicio: Mapped[int] = mapped_column(Integer)  # Posición en cv_documento.texto_extraido
+    fin: Mapped[int] = mapped_column(Integer)
+    embedding: Mapped[Optional[list]] = mapped_column(Vector(embedding_dim))
+
+    cv_embedding: Mapped["CVEmbedding"] = relationship(back_populates="fragmentos")
 
 
 class RankingPostulacion(Base):
@@ -132,3 +173,37 @@ class PreEntrevistaPregunta(Base):
     feedback: Mapped[Optional[str]] = mapped_column(Text)
 
     preentrevista: Mapped["PreEntrevista"] = relationship(back_populates="preguntas")
+
+
+class TrabajoProcesamiento(Base):
+    __tablename__ = "trabajo_procesamiento"
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True)  # UUID
+    tipo: Mapped[str] = mapped_column(String(50))  # Ej: "calificar", "analisis_completo"
+    estado: Mapped[str] = mapped_column(String(20), default="pendiente", index=True)  # pendiente | en_proceso | completado | error
+    parametros: Mapped[Optional[str]] = mapped_column(Text)  # JSON serializado
+    resultado: Mapped[Optional[str]] = mapped_column(Text)  # JSON serializado
+    error: Mapped[Optional[str]] = mapped_column(Text)
+    intentos: Mapped[int] = mapped_column(default=0)
+    creado_en: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+    iniciado_en: Mapped[Optional[datetime]]
+    finalizado_en: Mapped[Optional[datetime]]
+    worker: Mapped[Optional[str]] = mapped_column(String(100))  # Proceso que lo ejecuta (host:pid)
+    latido_en: Mapped[Optional[datetime]]  # Último latido del worker mientras está en_proceso
+
+
+class ExtraccionCV(Base):
+    """
+    Cache persistente de la extracción estructurada de CVs (resultado del LLM ya parseado).
+    """
+    __tablename__ = "cv_extraccion"
+    __table_args__ = (
+        UniqueConstraint("modelo", "version_prompt", "hash_texto", name="uq_cv_extraccion_clave"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    modelo: Mapped[str] = mapped_column(String(100))
+    version_prompt: Mapped[str] = mapped_column(String(64))  # Hash de la plantilla del prompt
+    hash_texto: Mapped[str] = mapped_column(String(64))  # SHA-256 del texto normalizado del CV
+    datos: Mapped[str] = mapped_column(Text)  # JSON serializado (CVExtractionResponse)
+    creado_en: Mapped[datetime] = mapped_column(default=datetime.utcnow)
@@ -1,10 +1,34 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from routers import (
-    auth, candidatos, documentos, empresa, ofertas, procesamiento, seleccion              
+    auth, candidatos, documentos, empresa, metricas, ofertas, procesamiento, seleccion
 )
 from fastapi.middleware.cors import CORSMiddleware
+from db.conexion_db import async_engine
+from utils.embedding_backends_utils import precargar_backend
+from utils.ollama_utils import cliente_ollama, embedding_model_name
+from utils.pdf_utils import cerrar_pool_procesos
+from utils.trabajos_utils import cola_trabajos
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Workers de la cola de trabajos asíncronos de /procesamiento
+    cola_trabajos.iniciar()
+    # Verificación de salud periódica de los hosts de Ollama (con más de uno)
+    cliente_ollama.hosts.iniciar()
+    # Con un backend local, el modelo de embeddings se carga una vez por worker al arrancar
+    precargar_backend(embedding_model_name)
+    yield
+    cola_trabajos.detener()
+    cerrar_pool_procesos()
+    # Cerrar las conexiones keep-alive con Ollama
+    await cliente_ollama.cerrar()
+    await async_engine.dispose()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "http://localhost:5173",
@@ -17,7 +41,8 @@ app.add_middleware(
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["*"]
+    allow_headers=["*"],
+    expose_headers=["X-Siguiente-Cursor"]  # Cursor de paginación de los listados
 )
 
 app.include_router(auth.router)
@@ -27,4 +52,5 @@ app.include_router(candidatos.router)
 app.include_router(documentos.router)
 app.include_router(procesamiento.router)
 app.include_router(seleccion.router)
+app.include_router(metricas.router)
 
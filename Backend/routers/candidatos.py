@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from typing import List
 
 from db.models import Candidato
 from schemas.candidato import CandidatoCreate, CandidatoResponse
 from db.conexion_db import get_db
+from utils.paginacion_utils import Paginacion, paginar
 
 router = APIRouter(prefix="/candidatos", tags=["Candidatos"])
 
@@ -19,8 +20,8 @@ def crear_candidato(candidato: CandidatoCreate, db: Session = Depends(get_db)):
 
 
 @router.get("", response_model=List[CandidatoResponse])
-def listar_candidatos(db: Session = Depends(get_db)):
-    return db.query(Candidato).all()
+def listar_candidatos(response: Response, paginacion: Paginacion = Depends(), db: Session = Depends(get_db)):
+    return paginar(db.query(Candidato), Candidato, paginacion, response, CandidatoResponse)
 
 
 @router.get("/{candidato_id}", response_model=CandidatoResponse)
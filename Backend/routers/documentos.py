@@ -1,12 +1,13 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Response
+from sqlalchemy.orm import Session, defer
 from typing import List
 import os
-import shutil
 
 from db.models import CVDocumento
-from schemas.documento import DocumentoResponse
+from schemas.documento import DocumentoResponse, DocumentoResumen
 from db.conexion_db import get_db
+from utils.documento_utils import buscar_documento_por_hash, guardar_por_contenido
+from utils.paginacion_utils import Paginacion, paginar
 from utils.pdf_utils import extraer_texto_desde_pdf
 
 router = APIRouter(prefix="/documentos", tags=["Documentos (CV)"])
@@ -22,16 +23,18 @@ def subir_documento_cv(
     archivo: UploadFile = File(...),
     db: Session = Depends(get_db)
 ):
-    # Guardar el archivo en disco
-    file_path = os.path.join(UPLOAD_FOLDER, archivo.filename)
+    # Guardar el archivo en disco con nombre según su contenido (el hash se calcula mientras se escribe)
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(archivo.file, buffer)
+        file_path, hash_contenido = guardar_por_contenido(archivo.file, UPLOAD_FOLDER)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al guardar el archivo: {e}")
 
-    # Extraer texto del PDF
-    texto_extraido = extraer_texto_desde_pdf(file_path)
+    # Si el mismo PDF ya fue procesado, reutilizar su texto en lugar de volver a extraerlo
+    documento_previo = buscar_documento_por_hash(db, hash_contenido)
+    if documento_previo:
+        texto_extraido = documento_previo.texto_extraido
+    else:
+        texto_extraido = extraer_texto_desde_pdf(file_path)
     if not texto_extraido:
         raise HTTPException(status_code=400, detail="No se pudo extraer texto del PDF")
 
@@ -40,7 +43,8 @@ def subir_documento_cv(
         candidato_id=candidato_id,
         nombre_archivo=archivo.filename,
         ruta_archivo=file_path,
-        texto_extraido=texto_extraido
+        texto_extraido=texto_extraido,
+        hash_contenido=hash_contenido
     )
 
     db.add(nuevo_doc)
@@ -50,9 +54,14 @@ def subir_documento_cv(
     return nuevo_doc
 
 
-@router.get("", response_model=List[DocumentoResponse])
-def listar_documentos(db: Session = Depends(get_db)):
-    return db.query(CVDocumento).all()
+@router.get("", response_model=List[DocumentoResumen])
+def listar_documentos(response: Response, paginacion: Paginacion = Depends(), db: Session = Depends(get_db)):
+    """
+    Lista paginada sin el texto extraído (no se lee de la BD); el texto completo se obtiene
+    con GET /documentos/{documento_id}.
+    """
+    consulta = db.query(CVDocumento).options(defer(CVDocumento.texto_extraido))
+    return paginar(consulta, CVDocumento, paginacion, response, DocumentoResumen)
 
 
 @router.get("/{documento_id}", response_model=DocumentoResponse)
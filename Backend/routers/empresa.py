@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from typing import List
 
 from db.models import Empresa
 from schemas.empresa import EmpresaCreate, EmpresaResponse
 from db.conexion_db import get_db
+from utils.paginacion_utils import Paginacion, paginar
 
 router = APIRouter(prefix="/empresas", tags=["Empresas"])
 
@@ -19,8 +20,8 @@ def crear_empresa(empresa: EmpresaCreate, db: Session = Depends(get_db)):
 
 
 @router.get("", response_model=List[EmpresaResponse])
-def listar_empresas(db: Session = Depends(get_db)):
-    return db.query(Empresa).all()
+def listar_empresas(response: Response, paginacion: Paginacion = Depends(), db: Session = Depends(get_db)):
+    return paginar(db.query(Empresa), Empresa, paginacion, response, EmpresaResponse)
 
 
 @router.get("/{empresa_id}", response_model=EmpresaResponse)
@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Response
+
+from db.conexion_db import estadisticas_pools
+from utils.metricas_utils import exportar_metricas
+from utils.ollama_utils import cliente_ollama
+
+router = APIRouter(tags=["Métricas"])
+
+
+@router.get("/metrics")
+def metricas_prometheus():
+    """
+    Métricas en formato Prometheus: duración por etapa (pdf, embedding, chat por modelo, db_commit
+    y etapas del análisis completo), tokens y tokens/s de Ollama, aciertos de los caches y
+    respuestas simuladas.
+    """
+    contenido, tipo = exportar_metricas()
+    return Response(content=contenido, media_type=tipo)
+
+
+@router.get("/metricas/db")
+def metricas_db():
+    """
+    Estado de los pools de conexiones (en uso, libres, overflow) y tiempos de espera por conexión.
+    Una espera promedio alta o timeouts > 0 indican que DB_POOL_SIZE/DB_MAX_OVERFLOW se quedan cortos.
+    """
+    return estadisticas_pools()
+
+
+@router.get("/metricas/ollama")
+def metricas_ollama():
+    """
+    Estado de cada host de Ollama: tipos de tráfico (chat/embedding), última verificación de salud,
+    peticiones en curso, modelos instalados y circuit breaker (cerrado, abierto o semiabierto).
+    """
+    return cliente_ollama.estadisticas_hosts()
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.orm import Session, defer
 from typing import List
 
 from db.models import OfertaLaboral
-from schemas.oferta import OfertaCreate, OfertaResponse
+from schemas.oferta import OfertaCreate, OfertaUpdate, OfertaResponse
 from db.conexion_db import get_db
+from utils.embedding_utils import actualizar_embedding_oferta
+from utils.paginacion_utils import Paginacion, paginar
 
 router = APIRouter(prefix="/ofertas", tags=["Ofertas Laborales"])
 
@@ -12,6 +14,8 @@ router = APIRouter(prefix="/ofertas", tags=["Ofertas Laborales"])
 @router.post("", response_model=OfertaResponse)
 def crear_oferta(oferta: OfertaCreate, db: Session = Depends(get_db)):
     nueva_oferta = OfertaLaboral(**oferta.model_dump())
+    # Si Ollama no está disponible, el embedding se calcula al primer uso
+    actualizar_embedding_oferta(nueva_oferta)
     db.add(nueva_oferta)
     db.commit()
     db.refresh(nueva_oferta)
@@ -19,8 +23,10 @@ def crear_oferta(oferta: OfertaCreate, db: Session = Depends(get_db)):
 
 
 @router.get("", response_model=List[OfertaResponse])
-def listar_ofertas(db: Session = Depends(get_db)):
-    return db.query(OfertaLaboral).all()
+def listar_ofertas(response: Response, paginacion: Paginacion = Depends(), db: Session = Depends(get_db)):
+    # El embedding (768 floats por oferta) no forma parte de la respuesta: no se carga
+    consulta = db.query(OfertaLaboral).options(defer(OfertaLaboral.embedding))
+    return paginar(consulta, OfertaLaboral, paginacion, response, OfertaResponse)
 
 
 @router.get("/{oferta_id}", response_model=OfertaResponse)
@@ -29,3 +35,19 @@ def obtener_oferta(oferta_id: int, db: Session = Depends(get_db)):
     if not oferta:
         raise HTTPException(status_code=404, detail="Oferta no encontrada")
     return oferta
+
+
+@router.put("/{oferta_id}", response_model=OfertaResponse)
+def actualizar_oferta(oferta_id: int, cambios: OfertaUpdate, db: Session = Depends(get_db)):
+    oferta = db.query(OfertaLaboral).get(oferta_id)
+    if not oferta:
+        raise HTTPException(status_code=404, detail="Oferta no encontrada")
+
+    for campo, valor in cambios.model_dump(exclude_unset=True).items():
+        setattr(oferta, campo, valor)
+
+    # Solo recalcula si cambió la descripción o los requisitos
+    actualizar_embedding_oferta(oferta)
+    db.commit()
+    db.refresh(oferta)
+    return oferta
@@ -1,23 +1,54 @@
+from contextlib import aclosing
 from datetime import datetime
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from typing import List, Optional
-import shutil
+from typing import Dict, List, Optional
+import asyncio
 import os
-import uuid
 import json
 import logging
+import time
+import zipfile
 
-from db.conexion_db import get_db
-from db.models import CVDocumento, CVEmbedding, OfertaLaboral, Postulacion, RankingPostulacion, Candidato
-from utils import ollama_utils, pdf_utils
+import httpx
+
+from db.conexion_db import get_async_db, get_db
+from db.models import OfertaLaboral, Candidato, TrabajoProcesamiento
+from utils import ollama_utils, pdf_utils, trabajos_utils
+from utils.cache_utils import embedding_cache
+from utils.compactacion_utils import (
+    PRESUPUESTOS_TOKENS, VERSION_COMPACTACION, caracteres_por_token, compactar_para_prompt, compactar_texto, contar_tokens
+)
+from utils.documento_utils import (
+    buscar_documento_por_hash, buscar_documentos_por_hashes, buscar_embedding_por_hash, buscar_embeddings_por_hashes,
+    ArchivoDemasiadoGrandeError, guardar_por_contenido, hash_archivo
+)
+from utils.embedding_utils import (
+    embedding_cv_por_fragmentos, embeddings_cv_por_fragmentos, obtener_embedding_oferta, obtener_embedding_oferta_async
+)
+from utils.extraccion_utils import buscar_extraccion, guardar_extraccion, version_prompt
+from utils.metricas_utils import medir_etapa, observar_etapa, registrar_campos_extraidos, registrar_fallback
+from utils.persistencia_utils import insertar_lote_postulaciones, registrar_postulacion
+from utils.pipeline_utils import ejecutar_etapas
+from utils.preextraccion_utils import VERSION_PREEXTRACCION, preextraer_cv, texto_para_campos
+from utils.resiliencia_utils import DeadlineExcedidoError, OllamaNoDisponibleError, con_deadline, tiempo_restante
 
 router = APIRouter(prefix="/procesamiento", tags=["Procesamiento"])
 UPLOAD_FOLDER = "uploads"
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# Deadline por defecto (segundos) para las etapas de /analisis-completo
+ANALISIS_DEADLINE_SEGUNDOS = float(os.getenv("ANALISIS_DEADLINE_SEGUNDOS", "120"))
+# Presupuesto (segundos) de las llamadas a Ollama del resto de endpoints; al agotarse se usa el resultado simulado
+PRESUPUESTO_IA_SEGUNDOS = float(os.getenv("PRESUPUESTO_IA_SEGUNDOS", "60"))
+
+# Límites de la carga masiva (/lote)
+LOTE_MAX_ARCHIVOS = int(os.getenv("LOTE_MAX_ARCHIVOS", "500"))
+LOTE_MAX_BYTES_POR_ARCHIVO = int(os.getenv("LOTE_MAX_MB_POR_ARCHIVO", "20")) * 1024 * 1024
+
 # Configurar logging
 logger = logging.getLogger(__name__)
 
@@ -27,7 +58,8 @@ class CVExtractionRequest(BaseModel):
 
 class SimilarityRequest(BaseModel):
     cv_resumen: str
-    job_description: str
+    job_description: str = ""
+    oferta_id: Optional[int] = None  # Si se indica, usa el embedding almacenado de la oferta
 
 class QuestionGenerationRequest(BaseModel):
     cv_resumen: str
@@ -45,102 +77,155 @@ class CVExtractionResponse(BaseModel):
     experiencia_laboral: List[dict]
     educacion: List[dict]
     habilidades: List[str]
+    # Origen de cada campo: "heuristica" (patrones, sin IA), "ia" o "simulado"
+    origen_campos: Dict[str, str] = {}
 
 class SimilarityResponse(BaseModel):
     similitud: float
     porcentaje: float
     nivel: str
 
-@router.post("/calificar")
-def upload_file(candidato_id: int, oferta_id: int, file: UploadFile = File(...), db: Session = Depends(get_db)):
+class TrabajoResponse(BaseModel):
+    id: str
+    tipo: str
+    estado: str
+    intentos: int
+    creado_en: datetime
+    iniciado_en: Optional[datetime]
+    finalizado_en: Optional[datetime]
+    resultado: Optional[dict]
+    error: Optional[str]
+
+def _guardar_upload(file):
     """
-    Endpoint original mejorado - mantiene compatibilidad.
+    Valida que el archivo sea PDF y lo guarda en UPLOAD_FOLDER con nombre según su contenido
+    ({hash}.pdf): si el mismo contenido ya existe, se comparte ese archivo.
+    Retorna (ruta, hash_contenido).
+    """
+    # Asegura que el archivo sea un PDF
+    if not file.filename.endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="Solo se permiten archivos PDF")
+
+    return guardar_por_contenido(file.file, UPLOAD_FOLDER)
+
+
+def _obtener_texto_cv(db, filepath, hash_contenido):
+    """
+    Texto del CV: reutiliza el ya extraído de un documento con el mismo contenido o lo extrae con PyMuPDF.
+    """
+    documento_previo = buscar_documento_por_hash(db, hash_contenido)
+    if documento_previo:
+        logger.info(f"CV duplicado (documento {documento_previo.id}), se reutiliza el texto extraído")
+        return documento_previo.texto_extraido
+    with medir_etapa("pdf_extraccion"):
+        return pdf_utils.extraer_texto_desde_pdf(filepath)
+
+
+def _respuesta_trabajo(trabajo):
     """
+    Respuesta 202 Accepted con el id del trabajo encolado.
+    """
+    return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content={
+        "status": "accepted",
+        "trabajo_id": trabajo.id,
+        "estado": trabajo.estado,
+        "url_estado": f"{router.prefix}/jobs/{trabajo.id}"
+    })
+
+
+def _encolar(db, tipo, parametros):
     try:
-        logger.info(f"Procesando archivo para candidato {candidato_id} y oferta {oferta_id}")
+        return trabajos_utils.encolar(db, tipo, parametros)
+    except trabajos_utils.ColaLlenaError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
 
-        # Asegura que el archivo sea un PDF
-        if not file.filename.endswith(".pdf"):
-            raise HTTPException(status_code=400, detail="Solo se permiten archivos PDF")
 
-        # Crear nombre único
-        filename = f"{uuid.uuid4()}.pdf"
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
+@trabajos_utils.registrar_handler("calificar")
+def _calificar_cv(db, candidato_id, oferta_id, filepath, nombre_archivo, hash_contenido=None):
+    """
+    Extrae el texto del PDF ya guardado, calcula el score y agrega a la sesión documento,
+    postulación, ranking y embedding. Usado por /calificar y por la cola de trabajos.
+    Si el mismo PDF ya fue procesado, reutiliza su texto y su embedding.
+    No hace commit: lo hace el endpoint, o la cola junto con el estado del trabajo.
+    """
+    hash_contenido = hash_contenido or hash_archivo(filepath)
+    resultado = _obtener_texto_cv(db, filepath, hash_contenido)
 
-        # Guardar el archivo físicamente
-        with open(filepath, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+    oferta = db.query(OfertaLaboral).filter(OfertaLaboral.id == oferta_id).first()
+    if not oferta:
+        raise HTTPException(status_code=404, detail="Oferta no encontrada")
+    
+    with con_deadline(PRESUPUESTO_IA_SEGUNDOS):
+        # Embedding de la oferta almacenado (se calcula una sola vez por versión)
+        job_vector = obtener_embedding_oferta(oferta, db)
 
-        # Llamar a tu función utilitaria con la ruta del archivo
-        resultado = pdf_utils.extraer_texto_desde_pdf(filepath)
+        # Embedding del CV completo (promedio de fragmentos): reutiliza el almacenado para el mismo contenido
+        embedding_previo = buscar_embedding_por_hash(db, hash_contenido, ollama_utils.embedding_model_name)
+        embedding_vector, fragmentos = embedding_previo or embedding_cv_por_fragmentos(resultado)
 
-        oferta = db.query(OfertaLaboral).filter(OfertaLaboral.id == oferta_id).first()
-        if not oferta:
-            raise HTTPException(status_code=404, detail="Oferta no encontrada")
-        
-        job_description = oferta.descripcion or ""
+    score_ia = None
+    if embedding_vector and job_vector is not None:
+        score_ia = ollama_utils.calcular_similitud_coseno(embedding_vector, job_vector)
+    
+    # Si no hay conexión con IA, usar score simulado
+    if score_ia is None:
+        registrar_fallback("similitud")
+        score_ia = 0.75  # Score simulado
 
-        score_ia = ollama_utils.call_ollama_comparation(resultado, job_description)
-        
-        # Si no hay conexión con IA, usar score simulado
-        if score_ia is None:
-            score_ia = 0.75  # Score simulado
-
-        # Insertar CV documento
-        nuevo_documento = CVDocumento(
-            candidato_id=candidato_id,
-            nombre_archivo=file.filename,
-            ruta_archivo=filepath,
-            texto_extraido=resultado,
-            creado_en=datetime.utcnow()
-        )
-        db.add(nuevo_documento)
-        db.commit()
-
-        # Crear postulación
-        nueva_postulacion = Postulacion(
-            candidato_id=candidato_id,
-            oferta_id=oferta_id,
-            fecha_postulacion=datetime.utcnow()
-        )
-        db.add(nueva_postulacion)
-        db.commit()
-        db.refresh(nueva_postulacion)
-
-        # Guardar ranking
-        nuevo_ranking = RankingPostulacion(
-            postulacion_id=nueva_postulacion.id,
-            score=score_ia * 100,  # Escalar si deseas representarlo sobre 100
-            score_semantico=score_ia,
-            observaciones="Generado por IA (Ollama)"
-        )
-        db.add(nuevo_ranking)
-        db.commit()
-
-        # Obtener embedding de texto
-        embedding_res = ollama_utils.call_ollama_embeddings_api(resultado)
-        embedding_vector = embedding_res.get("embedding") if embedding_res else None
-
-        # Guardar embedding como JSON serializado
-        if embedding_vector:
-            nuevo_embedding = CVEmbedding(
-                candidato_id=candidato_id,
-                embedding=json.dumps(embedding_vector),
-                modelo="nomic-embed-text",
-                fecha_generacion=datetime.utcnow()
-            )
-            db.add(nuevo_embedding)
-            db.commit()
+    # Documento, postulación, ranking y embedding en una sola transacción
+    _, nueva_postulacion = registrar_postulacion(
+        db, candidato_id, oferta_id, nombre_archivo, filepath, resultado, hash_contenido,
+        score=score_ia * 100,  # Escalar si deseas representarlo sobre 100
+        score_semantico=score_ia,
+        observaciones="Generado por IA (Ollama)",
+        embedding_vector=embedding_vector,
+        fragmentos=fragmentos
+    )
 
-        logger.info(f"Procesamiento completado exitosamente")
+    logger.info(f"Procesamiento completado exitosamente")
 
-        return JSONResponse(content={
-            "message": "Archivo guardado y procesado correctamente",
-            "path": filepath,
-            "resultado": resultado,
-            "score_ia": score_ia,
-            "postulacion_id": nueva_postulacion.id
-        })
+    return {
+        "message": "Archivo guardado y procesado correctamente",
+        "path": filepath,
+        "resultado": resultado,
+        "score_ia": float(score_ia),
+        "postulacion_id": nueva_postulacion.id
+    }
+
+
+@router.post("/calificar")
+def upload_file(
+    candidato_id: int,
+    oferta_id: int,
+    file: UploadFile = File(...),
+    asincrono: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Endpoint original mejorado - mantiene compatibilidad.
+    Con asincrono=true guarda el PDF, encola el trabajo y responde 202 con el id del trabajo.
+    """
+    try:
+        logger.info(f"Procesando archivo para candidato {candidato_id} y oferta {oferta_id}")
+
+        filepath, hash_contenido = _guardar_upload(file)
+
+        if asincrono:
+            if not db.query(OfertaLaboral).filter(OfertaLaboral.id == oferta_id).first():
+                raise HTTPException(status_code=404, detail="Oferta no encontrada")
+            trabajo = _encolar(db, "calificar", {
+                "candidato_id": candidato_id,
+                "oferta_id": oferta_id,
+                "filepath": filepath,
+                "nombre_archivo": file.filename,
+                "hash_contenido": hash_contenido
+            })
+            return _respuesta_trabajo(trabajo)
+
+        resultado = _calificar_cv(db, candidato_id, oferta_id, filepath, file.filename, hash_contenido)
+        with medir_etapa("db_commit", operacion="calificar"):
+            db.commit()
+        return JSONResponse(content=resultado)
 
     except HTTPException:
         raise
@@ -149,72 +234,346 @@ def upload_file(candidato_id: int, oferta_id: int, file: UploadFile = File(...),
         logger.error(f"Error en procesamiento: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-# --- ENDPOINT 1: EXTRACCIÓN DE DATOS DE CV ---
-@router.post("/extraer-cv", response_model=CVExtractionResponse)
-def extraer_datos_cv(request: CVExtractionRequest, db: Session = Depends(get_db)):
+
+def _buscar_extraccion(db, texto_cv):
     """
-    Extrae datos estructurados de un CV en texto plano usando IA.
+    Datos ya extraídos para el mismo texto, modelo y versión del prompt (CVExtractionResponse) o None.
     """
-    try:
-        logger.info("Iniciando extracción de datos de CV")
-        
-        # Crear mensajes para la IA
-        extract_cv_messages = [
-            {"role": "system", "content": "Eres un asistente útil especializado en extraer información estructurada de CVs en formato JSON. Responde solo con el objeto JSON."},
-            {
-                "role": "user",
-                "content": f"""
+    datos = buscar_extraccion(db, texto_cv, ollama_utils.deepseek_model_name, VERSION_PROMPT_EXTRACCION)
+    return CVExtractionResponse(**datos) if datos is not None else None
+
+
+def _guardar_extraccion(db, texto_cv, datos):
+    """
+    Guarda en cache una extracción real (no simulada). No hace commit.
+    """
+    guardar_extraccion(db, texto_cv, datos.model_dump(), ollama_utils.deepseek_model_name, VERSION_PROMPT_EXTRACCION)
+
+
+# --- LÓGICA COMPARTIDA POR LOS ENDPOINTS (sin acceso a BD, segura entre hilos) ---
+PROMPT_EXTRACCION_SISTEMA = "Eres un asistente útil especializado en extraer información estructurada de CVs en formato JSON. Responde solo con el objeto JSON."
+PROMPT_EXTRACCION_USUARIO = """
 Extrae la siguiente información del CV proporcionado y devuélvela en formato JSON.
-Asegúrate de que el JSON sea válido y contenga los siguientes campos:
-- "nombre_completo": Nombre y apellidos del candidato.
-- "email": Dirección de correo electrónico.
-- "telefono": Número de teléfono.
-- "resumen": Breve descripción del perfil del candidato.
-- "experiencia_laboral": Una lista de objetos, cada uno con "puesto", "empresa", "periodo", "descripcion".
-- "educacion": Una lista de objetos, cada uno con "titulo", "institucion", "periodo".
-- "habilidades": Una lista de strings.
+Asegúrate de que el JSON sea válido y contenga solo los siguientes campos:
+{campos}
 
 Si algún campo no se encuentra, omítelo o déjalo como un array vacío o string vacío según corresponda.
 
 CV:
-{request.texto_cv}
+{texto_cv}
 """
-            }
-        ]
-        
-        # Llamar a la IA
-        response_data = ollama_utils.call_ollama_chat_api(extract_cv_messages, format="json")
-        
-        if response_data:
-            try:
-                extracted_json_str = response_data['message']['content']
-                extracted_data = json.loads(extracted_json_str)
-                logger.info("Extracción de CV exitosa")
-                return CVExtractionResponse(**extracted_data)
-            except json.JSONDecodeError as e:
-                logger.error(f"Error al parsear JSON de CV: {e}")
-                # Devolver resultado simulado en caso de error
-                return ollama_utils.extract_cv_data_example({
-                    "nombre_completo": "Datos extraídos (simulado)",
-                    "email": "usuario@ejemplo.com",
-                    "telefono": "+51 999999999",
-                    "resumen": "Profesional con experiencia",
-                    "experiencia_laboral": [],
-                    "educacion": [],
-                    "habilidades": ["Python", "FastAPI"]
-                })
-        else:
-            logger.warning("No se pudo conectar con IA, usando datos simulados")
-            return ollama_utils.extract_cv_data_example({
-                "nombre_completo": "Usuario Simulado",
-                "email": "sim@ejemplo.com",
+# Descripción de cada campo en el prompt: solo se piden los que la preextracción no encontró
+CAMPOS_EXTRACCION = {
+    "nombre_completo": '- "nombre_completo": Nombre y apellidos del candidato.',
+    "email": '- "email": Dirección de correo electrónico.',
+    "telefono": '- "telefono": Número de teléfono.',
+    "resumen": '- "resumen": Breve descripción del perfil del candidato.',
+    "experiencia_laboral": '- "experiencia_laboral": Una lista de objetos, cada uno con "puesto", "empresa", "periodo", "descripcion".',
+    "educacion": '- "educacion": Una lista de objetos, cada uno con "titulo", "institucion", "periodo".',
+    "habilidades": '- "habilidades": Una lista de strings.',
+}
+CAMPOS_LISTA = {"experiencia_laboral", "educacion", "habilidades"}
+# Cualquier cambio en la plantilla, en las reglas de preextracción o de compactación, o en el presupuesto
+# de tokens (el LLM ve el texto compactado y recortado) invalida el cache de extracciones (cv_extraccion)
+VERSION_PROMPT_EXTRACCION = version_prompt(
+    PROMPT_EXTRACCION_SISTEMA, PROMPT_EXTRACCION_USUARIO, *CAMPOS_EXTRACCION.values(), VERSION_PREEXTRACCION,
+    VERSION_COMPACTACION, str(PRESUPUESTOS_TOKENS["extraccion"]), str(caracteres_por_token)
+)
+
+
+def _respuesta_extraccion(datos, origen):
+    """
+    CVExtractionResponse con todos los campos (listas vacías o None para los ausentes) y su origen.
+    """
+    completos = {
+        campo: (datos.get(campo) or []) if campo in CAMPOS_LISTA else (datos.get(campo) or None)
+        for campo in CAMPOS_EXTRACCION
+    }
+    return CVExtractionResponse(**completos, origen_campos=origen)
+
+
+def _extraccion_simulada(preextraccion, simulados):
+    """
+    Campos de la preextracción más valores simulados para el resto (cuando la IA no responde).
+    """
+    datos = {**simulados, **preextraccion["campos"]}
+    origen = {campo: "heuristica" if campo in preextraccion["campos"] else "simulado" for campo in CAMPOS_EXTRACCION}
+    return _respuesta_extraccion(ollama_utils.extract_cv_data_example(datos), origen)
+
+
+def _extraer_datos(texto_cv):
+    """
+    Extrae datos estructurados del CV: nombre, contacto, resumen y habilidades por patrones cuando se
+    encuentran, y con la IA solo los campos que faltan (enviando solo sus secciones del CV, compactadas
+    y dentro del presupuesto de tokens). Usa datos simulados para lo que falte si no hay conexión.
+    Retorna (datos, desde_ia): desde_ia es False si hay datos simulados (no se guardan en cache).
+    """
+    compactado = compactar_texto(texto_cv)
+    preextraccion = preextraer_cv(compactado)
+    pendientes = [campo for campo in CAMPOS_EXTRACCION if campo not in preextraccion["campos"]]
+    logger.info(f"Preextracción: {len(preextraccion['campos'])} campos sin IA, {len(pendientes)} pendientes")
+
+    # Crear mensajes para la IA
+    extract_cv_messages = [
+        {"role": "system", "content": PROMPT_EXTRACCION_SISTEMA},
+        {"role": "user", "content": PROMPT_EXTRACCION_USUARIO.format(
+            campos="\n".join(CAMPOS_EXTRACCION[campo] for campo in pendientes),
+            texto_cv=compactar_para_prompt(
+                texto_para_campos(compactado, preextraccion["secciones"], pendientes), "extraccion",
+                tokens_originales=contar_tokens(texto_cv)
+            )
+        )}
+    ]
+    
+    # Llamar a la IA
+    response_data = ollama_utils.call_ollama_chat_api(extract_cv_messages, format="json")
+    
+    if response_data:
+        try:
+            extracted_json_str = response_data['message']['content']
+            extracted_data = json.loads(extracted_json_str)
+            # Lo encontrado por patrones prevalece sobre lo que devuelva la IA
+            datos = {**{campo: extracted_data.get(campo) for campo in pendientes}, **preextraccion["campos"]}
+            origen = {campo: "heuristica" if campo in preextraccion["campos"] else "ia" for campo in CAMPOS_EXTRACCION}
+            registrar_campos_extraidos(origen)
+            logger.info("Extracción de CV exitosa")
+            return _respuesta_extraccion(datos, origen), True
+        except json.JSONDecodeError as e:
+            logger.error(f"Error al parsear JSON de CV: {e}")
+            registrar_fallback("extraccion")
+            # Devolver resultado simulado en caso de error
+            return _extraccion_simulada(preextraccion, {
+                "nombre_completo": "Datos extraídos (simulado)",
+                "email": "usuario@ejemplo.com",
                 "telefono": "+51 999999999",
-                "resumen": "Datos simulados por falta de conexión IA",
+                "resumen": "Profesional con experiencia",
                 "experiencia_laboral": [],
                 "educacion": [],
-                "habilidades": ["Simulación"]
-            })
-            
+                "habilidades": ["Python", "FastAPI"]
+            }), False
+    else:
+        logger.warning("No se pudo conectar con IA, usando datos simulados")
+        registrar_fallback("extraccion")
+        return _extraccion_simulada(preextraccion, {
+            "nombre_completo": "Usuario Simulado",
+            "email": "sim@ejemplo.com",
+            "telefono": "+51 999999999",
+            "resumen": "Datos simulados por falta de conexión IA",
+            "experiencia_laboral": [],
+            "educacion": [],
+            "habilidades": ["Simulación"]
+        }), False
+
+
+def _respuesta_similitud(similarity):
+    """
+    Construye la respuesta de similitud con su porcentaje y nivel.
+    """
+    porcentaje = similarity * 100
+
+    if porcentaje >= 80:
+        nivel = "Excelente"
+    elif porcentaje >= 60:
+        nivel = "Bueno"
+    elif porcentaje >= 40:
+        nivel = "Regular"
+    else:
+        nivel = "Bajo"
+
+    return SimilarityResponse(
+        similitud=similarity,
+        porcentaje=porcentaje,
+        nivel=nivel
+    )
+
+
+def _mensajes_preguntas(cv_resumen, job_description):
+    return [
+        {"role": "system", "content": "Eres un asistente de selección de personal experto en formular preguntas de entrevista desafiantes y personalizadas."},
+        {"role": "user", "content": f"""
+Genera 5 preguntas de entrevista para un candidato, basándote en su resumen de CV y la descripción del puesto.
+Las preguntas deben ser desafiantes y explorar su experiencia en las tecnologías mencionadas.
+Asegúrate de que sean preguntas abiertas para fomentar respuestas detalladas.
+Devuelve las preguntas en una lista numerada.
+
+Resumen del CV del Candidato:
+{cv_resumen}
+
+Descripción del Puesto:
+{job_description}
+"""}
+    ]
+
+
+def _resultado_preguntas(questions_text, cv_resumen, job_description):
+    return {
+        "status": "success",
+        "preguntas": questions_text,
+        "cv_resumen": cv_resumen,
+        "job_description": job_description
+    }
+
+
+def _preguntas_simuladas(cv_resumen, job_description):
+    registrar_fallback("preguntas")
+    questions = ollama_utils.generate_interview_questions_example()
+    return {
+        "status": "success_simulated",
+        "preguntas": "\n".join(questions),
+        "cv_resumen": cv_resumen,
+        "job_description": job_description,
+        "nota": "Preguntas simuladas por falta de conexión IA"
+    }
+
+
+def _generar_preguntas(cv_resumen, job_description):
+    """
+    Genera preguntas de entrevista con la IA; usa preguntas simuladas si no hay conexión.
+    """
+    response_data = ollama_utils.call_ollama_chat_api(_mensajes_preguntas(cv_resumen, job_description))
+    
+    if response_data:
+        logger.info("Preguntas generadas exitosamente")
+        return _resultado_preguntas(response_data['message']['content'], cv_resumen, job_description)
+    else:
+        logger.warning("No se pudieron generar preguntas reales, usando simuladas")
+        return _preguntas_simuladas(cv_resumen, job_description)
+
+
+def _mensajes_evaluacion(pregunta, respuesta_candidato):
+    return [
+        {"role": "system", "content": "Eres un evaluador de entrevistas que analiza respuestas y proporciona feedback estructurado en JSON."},
+        {
+            "role": "user",
+            "content": f"""
+Evalúa la siguiente respuesta de un candidato a una pregunta de entrevista.
+Califica la respuesta en una escala del 1 al 5 (1=Mala, 5=Excelente) en términos de:
+- Relevancia
+- Profundidad técnica
+- Claridad de la explicación
+- Identificación de desafíos y soluciones
+
+Luego, proporciona un breve comentario sobre la respuesta y sugiere una posible pregunta de seguimiento.
+
+Pregunta: {pregunta}
+Respuesta del Candidato: {respuesta_candidato}
+
+Formato de salida (JSON):
+{{
+  "calificacion_relevancia": int,
+  "calificacion_profundidad_tecnica": int,
+  "calificacion_claridad": int,
+  "calificacion_desafios_soluciones": int,
+  "comentario": string,
+  "pregunta_seguimiento": string
+}}
+"""
+        }
+    ]
+
+
+def _evaluacion_simulada(request, nota):
+    registrar_fallback("evaluacion")
+    return {
+        "status": "success_simulated",
+        "evaluacion": ollama_utils.evaluate_candidate_answer_example(),
+        "pregunta_original": request.pregunta,
+        "respuesta_evaluada": request.respuesta_candidato,
+        "nota": nota
+    }
+
+
+def _resultado_evaluacion(request, evaluation_json_str):
+    """
+    Parsea el JSON de la evaluación; usa una evaluación simulada si no es válido.
+    """
+    try:
+        evaluation_data = json.loads(evaluation_json_str)
+    except json.JSONDecodeError as e:
+        logger.error(f"Error al parsear JSON de evaluación: {e}")
+        return _evaluacion_simulada(request, "Evaluación simulada por error en parseo")
+
+    logger.info("Evaluación completada exitosamente")
+    return {
+        "status": "success",
+        "evaluacion": evaluation_data,
+        "pregunta_original": request.pregunta,
+        "respuesta_evaluada": request.respuesta_candidato
+    }
+
+
+def _evento_sse(evento, datos):
+    return f"event: {evento}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+
+def _respuesta_sse(messages, construir_resultado, resultado_simulado, format=None):
+    """
+    Reenvía como Server-Sent Events el contenido que genera Ollama (sin los bloques <think>):
+    un evento "token" por cada parte y un evento final "resultado" con la respuesta parseada,
+    igual a la del endpoint sin streaming. La generación completa cuenta contra
+    PRESUPUESTO_IA_SEGUNDOS; si se agota, el stream termina con un evento "error".
+    """
+    async def eventos():
+        partes = []
+        with con_deadline(PRESUPUESTO_IA_SEGUNDOS):
+            try:
+                # Si el cliente se desconecta, cerrar este generador cierra también el stream de Ollama:
+                # el host deja de contarse como ocupado (balanceo) sin esperar al recolector
+                stream = ollama_utils.call_ollama_chat_stream_async(messages, format=format)
+                async with aclosing(stream):
+                    while True:
+                        # El timeout cubre solo la espera de la siguiente parte, no el envío al cliente
+                        try:
+                            async with asyncio.timeout(tiempo_restante()):
+                                texto = await anext(stream)
+                        except StopAsyncIteration:
+                            break
+                        except TimeoutError:
+                            raise DeadlineExcedidoError("Presupuesto de tiempo agotado durante el streaming")
+                        if not partes:
+                            texto = texto.lstrip()
+                            if not texto:
+                                continue
+                        partes.append(texto)
+                        yield _evento_sse("token", {"texto": texto})
+                resultado = construir_resultado("".join(partes).strip())
+            except DeadlineExcedidoError as e:
+                logger.warning(f"Streaming con Ollama cortado por el presupuesto de tiempo: {e}")
+                yield _evento_sse("error", {"detalle": "Se agotó el tiempo para generar la respuesta"})
+                return
+            except (httpx.HTTPError, ValueError, OllamaNoDisponibleError) as e:
+                logger.warning(f"Streaming con Ollama interrumpido, usando resultado simulado: {e}")
+                resultado = resultado_simulado()
+        yield _evento_sse("resultado", resultado)
+
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# --- ENDPOINT 1: EXTRACCIÓN DE DATOS DE CV ---
+@router.post("/extraer-cv", response_model=CVExtractionResponse)
+def extraer_datos_cv(request: CVExtractionRequest, db: Session = Depends(get_db)):
+    """
+    Extrae datos estructurados de un CV en texto plano usando IA.
+    """
+    try:
+        logger.info("Iniciando extracción de datos de CV")
+        datos = _buscar_extraccion(db, request.texto_cv)
+        if datos is not None:
+            logger.info("Extracción de CV obtenida del cache")
+            return datos
+
+        with con_deadline(PRESUPUESTO_IA_SEGUNDOS):
+            datos, desde_ia = _extraer_datos(request.texto_cv)
+        if desde_ia:
+            _guardar_extraccion(db, request.texto_cv, datos)
+            with medir_etapa("db_commit", operacion="extraer_cv"):
+                db.commit()
+        return datos
+
     except Exception as e:
         logger.error(f"Error en extracción de CV: {e}")
         raise HTTPException(
@@ -225,40 +584,40 @@ CV:
 
 # --- ENDPOINT 2: CÁLCULO DE SIMILITUD SEMÁNTICA ---
 @router.post("/similitud", response_model=SimilarityResponse)
-def calcular_similitud(request: SimilarityRequest, db: Session = Depends(get_db)):
+async def calcular_similitud(request: SimilarityRequest, db: AsyncSession = Depends(get_async_db)):
     """
     Calcula la similitud semántica entre un CV y una descripción de puesto.
+    Endpoint async: espera a la BD y a Ollama sin ocupar un hilo del threadpool.
     """
     try:
         logger.info("Calculando similitud semántica")
         
-        # Llamar a la función de comparación
-        similarity = ollama_utils.call_ollama_comparation(request.cv_resumen, request.job_description)
+        with con_deadline(PRESUPUESTO_IA_SEGUNDOS):
+            job_vector = None
+            if request.oferta_id is not None:
+                oferta = await db.get(OfertaLaboral, request.oferta_id)
+                if not oferta:
+                    raise HTTPException(status_code=404, detail="Oferta no encontrada")
+                job_vector = await obtener_embedding_oferta_async(oferta, db)
+
+            # Llamar a la función de comparación
+            if job_vector is not None:
+                similarity = await ollama_utils.call_ollama_comparation_async(request.cv_resumen, job_vector=job_vector)
+            else:
+                similarity = await ollama_utils.call_ollama_comparation_async(request.cv_resumen, request.job_description)
         
         if similarity is None:
             logger.warning("No se pudo calcular similitud real, usando simulada")
+            registrar_fallback("similitud")
             similarity = ollama_utils.calculate_similarity_example()
         
-        # Calcular porcentaje y nivel
-        porcentaje = similarity * 100
-        
-        if porcentaje >= 80:
-            nivel = "Excelente"
-        elif porcentaje >= 60:
-            nivel = "Bueno"
-        elif porcentaje >= 40:
-            nivel = "Regular"
-        else:
-            nivel = "Bajo"
-        
         logger.info(f"Similitud calculada: {similarity:.4f}")
         
-        return SimilarityResponse(
-            similitud=similarity,
-            porcentaje=porcentaje,
-            nivel=nivel
-        )
+        # Calcular porcentaje y nivel
+        return _respuesta_similitud(similarity)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error en cálculo de similitud: {e}")
         raise HTTPException(
@@ -276,46 +635,10 @@ def generar_preguntas_entrevista(request: QuestionGenerationRequest, db: Session
     try:
         logger.info("Generando preguntas de entrevista")
         
-        generate_questions_messages = [
-            {"role": "system", "content": "Eres un asistente de selección de personal experto en formular preguntas de entrevista desafiantes y personalizadas."},
-            {"role": "user", "content": f"""
-Genera 5 preguntas de entrevista para un candidato, basándote en su resumen de CV y la descripción del puesto.
-Las preguntas deben ser desafiantes y explorar su experiencia en las tecnologías mencionadas.
-Asegúrate de que sean preguntas abiertas para fomentar respuestas detalladas.
-Devuelve las preguntas en una lista numerada.
+        # cv_resumen lo escribe el llamador: se envía tal cual (solo se compacta el texto extraído de un PDF)
+        with con_deadline(PRESUPUESTO_IA_SEGUNDOS):
+            return JSONResponse(content=_generar_preguntas(request.cv_resumen, request.job_description))
 
-Resumen del CV del Candidato:
-{request.cv_resumen}
-
-Descripción del Puesto:
-{request.job_description}
-"""}
-        ]
-        
-        response_data = ollama_utils.call_ollama_chat_api(generate_questions_messages)
-        
-        if response_data:
-            questions_text = response_data['message']['content']
-            logger.info("Preguntas generadas exitosamente")
-            
-            return JSONResponse(content={
-                "status": "success",
-                "preguntas": questions_text,
-                "cv_resumen": request.cv_resumen,
-                "job_description": request.job_description
-            })
-        else:
-            logger.warning("No se pudieron generar preguntas reales, usando simuladas")
-            questions = ollama_utils.generate_interview_questions_example()
-            
-            return JSONResponse(content={
-                "status": "success_simulated",
-                "preguntas": "\n".join(questions),
-                "cv_resumen": request.cv_resumen,
-                "job_description": request.job_description,
-                "nota": "Preguntas simuladas por falta de conexión IA"
-            })
-            
     except Exception as e:
         logger.error(f"Error en generación de preguntas: {e}")
         raise HTTPException(
@@ -324,6 +647,20 @@ Descripción del Puesto:
         )
 
 
+@router.post("/generar-preguntas/stream")
+async def generar_preguntas_entrevista_stream(request: QuestionGenerationRequest):
+    """
+    Variante en streaming (SSE) de /generar-preguntas: las preguntas se envían a medida que
+    se generan (sin el razonamiento <think>) y al final un evento "resultado".
+    """
+    logger.info("Generando preguntas de entrevista (streaming)")
+    return _respuesta_sse(
+        _mensajes_preguntas(request.cv_resumen, request.job_description),
+        lambda texto: _resultado_preguntas(texto, request.cv_resumen, request.job_description),
+        lambda: _preguntas_simuladas(request.cv_resumen, request.job_description)
+    )
+
+
 # --- ENDPOINT 4: EVALUACIÓN DE RESPUESTAS ---
 @router.post("/evaluar-respuesta")
 def evaluar_respuesta_candidato(request: AnswerEvaluationRequest, db: Session = Depends(get_db)):
@@ -333,72 +670,15 @@ def evaluar_respuesta_candidato(request: AnswerEvaluationRequest, db: Session =
     try:
         logger.info("Evaluando respuesta de candidato")
         
-        evaluate_answer_messages = [
-            {"role": "system", "content": "Eres un evaluador de entrevistas que analiza respuestas y proporciona feedback estructurado en JSON."},
-            {
-                "role": "user",
-                "content": f"""
-Evalúa la siguiente respuesta de un candidato a una pregunta de entrevista.
-Califica la respuesta en una escala del 1 al 5 (1=Mala, 5=Excelente) en términos de:
-- Relevancia
-- Profundidad técnica
-- Claridad de la explicación
-- Identificación de desafíos y soluciones
-
-Luego, proporciona un breve comentario sobre la respuesta y sugiere una posible pregunta de seguimiento.
-
-Pregunta: {request.pregunta}
-Respuesta del Candidato: {request.respuesta_candidato}
-
-Formato de salida (JSON):
-{{
-  "calificacion_relevancia": int,
-  "calificacion_profundidad_tecnica": int,
-  "calificacion_claridad": int,
-  "calificacion_desafios_soluciones": int,
-  "comentario": string,
-  "pregunta_seguimiento": string
-}}
-"""
-            }
-        ]
-        
-        response_data = ollama_utils.call_ollama_chat_api(evaluate_answer_messages, format="json")
+        evaluate_answer_messages = _mensajes_evaluacion(request.pregunta, request.respuesta_candidato)
+        with con_deadline(PRESUPUESTO_IA_SEGUNDOS):
+            response_data = ollama_utils.call_ollama_chat_api(evaluate_answer_messages, format="json")
         
         if response_data:
-            try:
-                evaluation_json_str = response_data['message']['content']
-                evaluation_data = json.loads(evaluation_json_str)
-                logger.info("Evaluación completada exitosamente")
-                
-                return JSONResponse(content={
-                    "status": "success",
-                    "evaluacion": evaluation_data,
-                    "pregunta_original": request.pregunta,
-                    "respuesta_evaluada": request.respuesta_candidato
-                })
-            except json.JSONDecodeError as e:
-                logger.error(f"Error al parsear JSON de evaluación: {e}")
-                evaluation_data = ollama_utils.evaluate_candidate_answer_example()
-                
-                return JSONResponse(content={
-                    "status": "success_simulated",
-                    "evaluacion": evaluation_data,
-                    "pregunta_original": request.pregunta,
-                    "respuesta_evaluada": request.respuesta_candidato,
-                    "nota": "Evaluación simulada por error en parseo"
-                })
+            return JSONResponse(content=_resultado_evaluacion(request, response_data['message']['content']))
         else:
             logger.warning("No se pudo evaluar con IA, usando evaluación simulada")
-            evaluation_data = ollama_utils.evaluate_candidate_answer_example()
-            
-            return JSONResponse(content={
-                "status": "success_simulated",
-                "evaluacion": evaluation_data,
-                "pregunta_original": request.pregunta,
-                "respuesta_evaluada": request.respuesta_candidato,
-                "nota": "Evaluación simulada por falta de conexión IA"
-            })
+            return JSONResponse(content=_evaluacion_simulada(request, "Evaluación simulada por falta de conexión IA"))
             
     except Exception as e:
         logger.error(f"Error en evaluación de respuesta: {e}")
@@ -408,16 +688,163 @@ Formato de salida (JSON):
         )
 
 
+@router.post("/evaluar-respuesta/stream")
+async def evaluar_respuesta_candidato_stream(request: AnswerEvaluationRequest):
+    """
+    Variante en streaming (SSE) de /evaluar-respuesta: eventos "token" a medida que se genera
+    la evaluación y un evento final "resultado" con el JSON parseado.
+    """
+    logger.info("Evaluando respuesta de candidato (streaming)")
+    return _respuesta_sse(
+        _mensajes_evaluacion(request.pregunta, request.respuesta_candidato),
+        lambda texto: _resultado_evaluacion(request, texto),
+        lambda: _evaluacion_simulada(request, "Evaluación simulada por falta de conexión IA"),
+        format="json"
+    )
+
+
+@trabajos_utils.registrar_handler("analisis_completo")
+def _analisis_completo(db, candidato_id, oferta_id, filepath, nombre_archivo,
+                       deadline_segundos=ANALISIS_DEADLINE_SEGUNDOS, hash_contenido=None):
+    """
+    Análisis completo sobre un PDF ya guardado. Usado por /analisis-completo y por la cola de trabajos.
+    Si el mismo PDF ya fue procesado, reutiliza su texto y su embedding.
+    No hace commit: lo hace el endpoint, o la cola junto con el estado del trabajo.
+    """
+    inicio = time.perf_counter()
+    hash_contenido = hash_contenido or hash_archivo(filepath)
+
+    oferta = db.query(OfertaLaboral).filter(OfertaLaboral.id == oferta_id).first()
+    if not oferta:
+        raise HTTPException(status_code=404, detail="Oferta no encontrada")
+
+    # Extraer texto del PDF (o reutilizarlo si el contenido ya fue procesado)
+    texto_cv = _obtener_texto_cv(db, filepath, hash_contenido)
+    embedding_previo = buscar_embedding_por_hash(db, hash_contenido, ollama_utils.embedding_model_name)
+    # Un CV ya extraído (p. ej. al analizarlo contra otra oferta) no vuelve a pasar por el LLM
+    extraccion_previa = _buscar_extraccion(db, texto_cv)
+    
+    # Deadline de todas las llamadas a Ollama del análisis: las etapas lo heredan (copian el contexto),
+    # así una etapa vencida no deja su llamada colgada ocupando el hilo
+    with con_deadline(deadline_segundos):
+        # El embedding de la oferta se lee en este hilo (la sesión de BD no se comparte entre hilos)
+        job_vector = obtener_embedding_oferta(oferta, db)
+        job_description = oferta.descripcion or ""
+        # CV compactado y recortado al presupuesto de tokens de las preguntas
+        cv_resumen = compactar_para_prompt(texto_cv, "preguntas")
+
+        def etapa_similitud():
+            # Similitud sobre el CV completo: promedio de los embeddings de sus fragmentos
+            embedding_vector, fragmentos = embedding_previo or embedding_cv_por_fragmentos(texto_cv)
+            vector_oferta = job_vector
+            if vector_oferta is None and embedding_vector is not None:
+                job_embedding = ollama_utils.call_ollama_embeddings_api(job_description)
+                vector_oferta = job_embedding.get("embedding") if job_embedding else None
+
+            similitud = None
+            if embedding_vector is not None and vector_oferta is not None:
+                similitud = ollama_utils.calcular_similitud_coseno(embedding_vector, vector_oferta)
+            return {"similitud": similitud, "embedding": embedding_vector, "fragmentos": fragmentos}
+
+        # 1. Extracción, 2. similitud (embedding del CV) y 3. preguntas son independientes
+        # una vez extraído el texto: se ejecutan en paralelo
+        etapas = ejecutar_etapas({
+            "extraccion": (lambda: (extraccion_previa, False)) if extraccion_previa else (lambda: _extraer_datos(texto_cv)),
+            "similitud": etapa_similitud,
+            "preguntas": lambda: _generar_preguntas(cv_resumen, job_description),
+        }, deadline_segundos)
+
+    for nombre, etapa in etapas.items():
+        observar_etapa(f"analisis_{nombre}", etapa["segundos"], etapa["estado"], oferta_id=oferta_id)
+        if etapa["estado"] != "ok":
+            logger.warning(f"Etapa '{nombre}' terminó con estado {etapa['estado']}: {etapa['error']}")
+
+    # Fallbacks simulados para las etapas que fallaron o vencieron el deadline
+    datos_extraidos, extraccion_desde_ia = etapas["extraccion"]["resultado"] or (None, False)
+    if datos_extraidos is None:
+        registrar_fallback("extraccion")
+    # La preextracción no usa la IA: sus campos se conservan aunque la etapa haya vencido
+    datos_extraidos = datos_extraidos or _extraccion_simulada(preextraer_cv(texto_cv), {
+        "nombre_completo": None,
+        "email": None,
+        "telefono": None,
+        "resumen": "Datos simulados: la extracción no terminó a tiempo",
+        "experiencia_laboral": [],
+        "educacion": [],
+        "habilidades": []
+    })
+
+    resultado_similitud = etapas["similitud"]["resultado"] or {}
+    similarity = resultado_similitud.get("similitud")
+    embedding_vector = resultado_similitud.get("embedding")
+    fragmentos = resultado_similitud.get("fragmentos")
+    if similarity is None:
+        registrar_fallback("similitud")
+        similarity = ollama_utils.calculate_similarity_example()
+    similitud_resultado = _respuesta_similitud(similarity)
+
+    if etapas["preguntas"]["resultado"] is None:
+        registrar_fallback("preguntas")
+    preguntas_resultado = etapas["preguntas"]["resultado"] or {
+        "status": "success_simulated",
+        "preguntas": "\n".join(ollama_utils.generate_interview_questions_example()),
+        "cv_resumen": cv_resumen,
+        "job_description": job_description,
+        "nota": "Preguntas simuladas: la generación no terminó a tiempo"
+    }
+    preguntas_data = json.dumps(preguntas_resultado, ensure_ascii=False)
+    
+    # Documento, postulación, ranking, embedding y cache de extracción en una sola transacción
+    if extraccion_desde_ia:
+        _guardar_extraccion(db, texto_cv, datos_extraidos)
+    _, nueva_postulacion = registrar_postulacion(
+        db, candidato_id, oferta_id, nombre_archivo, filepath, texto_cv, hash_contenido,
+        score=similitud_resultado.porcentaje,
+        score_semantico=similitud_resultado.similitud,
+        observaciones=f"Análisis completo automático - Nivel: {similitud_resultado.nivel}",
+        embedding_vector=embedding_vector,
+        fragmentos=fragmentos
+    )
+
+    logger.info(f"Análisis completo finalizado para candidato {candidato_id}")
+    
+    return {
+        "status": "success",
+        "message": "Análisis completo realizado exitosamente",
+        "candidato_id": candidato_id,
+        "oferta_id": oferta_id,
+        "archivo_guardado": filepath,
+        "datos_extraidos": datos_extraidos.model_dump(),
+        "similitud": {
+            "score": similitud_resultado.similitud,
+            "porcentaje": similitud_resultado.porcentaje,
+            "nivel": similitud_resultado.nivel
+        },
+        "preguntas_generadas": preguntas_data,
+        "postulacion_id": nueva_postulacion.id,
+        "etapas": {
+            nombre: {"estado": etapa["estado"], "segundos": round(etapa["segundos"], 3)}
+            for nombre, etapa in etapas.items()
+        },
+        "tiempo_total_segundos": round(time.perf_counter() - inicio, 3)
+    }
+
+
 # --- ENDPOINT 5: PROCESO COMPLETO DE ANÁLISIS DE CV ---
 @router.post("/analisis-completo/{candidato_id}/{oferta_id}")
 def analisis_completo_cv(
     candidato_id: int, 
     oferta_id: int, 
     file: UploadFile = File(...), 
+    deadline_segundos: float = Query(ANALISIS_DEADLINE_SEGUNDOS, gt=0, le=600),
+    asincrono: bool = False,
     db: Session = Depends(get_db)
 ):
     """
     Proceso completo: extrae texto, analiza CV, calcula similitud y genera preguntas.
+    Extracción, similitud, preguntas y embedding se ejecutan en paralelo con un deadline común;
+    las etapas que no terminan a tiempo usan resultados simulados.
+    Con asincrono=true guarda el PDF, encola el trabajo y responde 202 con el id del trabajo.
     """
     try:
         logger.info(f"Iniciando análisis completo para candidato {candidato_id} y oferta {oferta_id}")
@@ -431,108 +858,247 @@ def analisis_completo_cv(
         if not oferta:
             raise HTTPException(status_code=404, detail="Oferta no encontrada")
         
-        # Validar archivo PDF
-        if not file.filename.endswith(".pdf"):
-            raise HTTPException(status_code=400, detail="Solo se permiten archivos PDF")
+        # Validar y guardar archivo
+        filepath, hash_contenido = _guardar_upload(file)
 
-        # Guardar archivo
-        filename = f"{uuid.uuid4()}.pdf"
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        
-        with open(filepath, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        if asincrono:
+            trabajo = _encolar(db, "analisis_completo", {
+                "candidato_id": candidato_id,
+                "oferta_id": oferta_id,
+                "filepath": filepath,
+                "nombre_archivo": file.filename,
+                "deadline_segundos": deadline_segundos,
+                "hash_contenido": hash_contenido
+            })
+            return _respuesta_trabajo(trabajo)
 
-        # Extraer texto del PDF
-        texto_cv = pdf_utils.extraer_texto_desde_pdf(filepath)
-        
-        # 1. Extraer datos estructurados del CV
-        extract_request = CVExtractionRequest(texto_cv=texto_cv)
-        datos_extraidos = extraer_datos_cv(extract_request, db)
-        
-        # 2. Calcular similitud
-        similarity_request = SimilarityRequest(
-            cv_resumen=texto_cv[:500],  # Primeros 500 caracteres como resumen
-            job_description=oferta.descripcion or ""
-        )
-        similitud_resultado = calcular_similitud(similarity_request, db)
-        
-        # 3. Generar preguntas de entrevista
-        questions_request = QuestionGenerationRequest(
-            cv_resumen=texto_cv[:500],
-            job_description=oferta.descripcion or ""
+        resultado = _analisis_completo(
+            db, candidato_id, oferta_id, filepath, file.filename, deadline_segundos, hash_contenido
         )
-        preguntas_response = generar_preguntas_entrevista(questions_request, db)
-        preguntas_data = preguntas_response.body.decode() if hasattr(preguntas_response, 'body') else {}
+        with medir_etapa("db_commit", operacion="analisis_completo"):
+            db.commit()
+        return JSONResponse(content=resultado)
         
-        # Guardar en base de datos
-        # CV Documento
-        nuevo_documento = CVDocumento(
-            candidato_id=candidato_id,
-            nombre_archivo=file.filename,
-            ruta_archivo=filepath,
-            texto_extraido=texto_cv,
-            creado_en=datetime.utcnow()
-        )
-        db.add(nuevo_documento)
-        db.commit()
-
-        # Postulación
-        nueva_postulacion = Postulacion(
-            candidato_id=candidato_id,
-            oferta_id=oferta_id,
-            fecha_postulacion=datetime.utcnow()
-        )
-        db.add(nueva_postulacion)
-        db.commit()
-        db.refresh(nueva_postulacion)
-
-        # Ranking
-        nuevo_ranking = RankingPostulacion(
-            postulacion_id=nueva_postulacion.id,
-            score=similitud_resultado.porcentaje,
-            score_semantico=similitud_resultado.similitud,
-            observaciones=f"Análisis completo automático - Nivel: {similitud_resultado.nivel}"
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error en análisis completo: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error en análisis completo: {str(e)}"
         )
-        db.add(nuevo_ranking)
-        db.commit()
-
-        # Embedding
-        embedding_res = ollama_utils.call_ollama_embeddings_api(texto_cv)
-        if embedding_res and embedding_res.get("embedding"):
-            nuevo_embedding = CVEmbedding(
-                candidato_id=candidato_id,
-                embedding=json.dumps(embedding_res["embedding"]),
-                modelo="nomic-embed-text",
-                fecha_generacion=datetime.utcnow()
-            )
-            db.add(nuevo_embedding)
-            db.commit()
 
-        logger.info(f"Análisis completo finalizado para candidato {candidato_id}")
-        
+
+# --- ENDPOINT 6: ESTADÍSTICAS DEL CACHE DE EMBEDDINGS ---
+@router.get("/cache/embeddings")
+def estadisticas_cache_embeddings():
+    """
+    Retorna los contadores de hits/misses del cache de embeddings.
+    """
+    return embedding_cache.estadisticas()
+
+
+@router.get("/embeddings/despachador")
+def estadisticas_despachador_embeddings():
+    """
+    Retorna los contadores del micro-batching de embeddings (lotes enviados y tasa de llenado).
+    """
+    return ollama_utils.despachador_embeddings.estadisticas()
+
+
+# --- ENDPOINT 7: ESTADO Y RESULTADO DE TRABAJOS ASÍNCRONOS ---
+@router.get("/jobs/{trabajo_id}", response_model=TrabajoResponse)
+def obtener_trabajo(trabajo_id: str, db: Session = Depends(get_db)):
+    """
+    Retorna el estado de un trabajo encolado (pendiente, en_proceso, completado, error) y su resultado.
+    """
+    trabajo = db.query(TrabajoProcesamiento).get(trabajo_id)
+    if not trabajo:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+
+    return TrabajoResponse(
+        id=trabajo.id,
+        tipo=trabajo.tipo,
+        estado=trabajo.estado,
+        intentos=trabajo.intentos,
+        creado_en=trabajo.creado_en,
+        iniciado_en=trabajo.iniciado_en,
+        finalizado_en=trabajo.finalizado_en,
+        resultado=json.loads(trabajo.resultado) if trabajo.resultado else None,
+        error=trabajo.error
+    )
+
+
+def _guardar_archivos_lote(files):
+    """
+    Guarda los PDFs recibidos, sueltos o dentro de archivos ZIP.
+    Retorna (guardados, errores): guardados es una lista de (nombre_archivo, ruta, hash_contenido).
+    Lanza 413 antes de escribir nada si hay más de LOTE_MAX_ARCHIVOS PDFs; los PDFs de más de
+    LOTE_MAX_BYTES_POR_ARCHIVO se rechazan uno a uno mientras se copian.
+    """
+    guardados = []
+    errores = []
+
+    def guardar_pdf(nombre, origen):
+        try:
+            filepath, hash_contenido = guardar_por_contenido(origen, UPLOAD_FOLDER, LOTE_MAX_BYTES_POR_ARCHIVO)
+        except ArchivoDemasiadoGrandeError:
+            errores.append({"archivo": nombre, "estado": "error", "detalle": "Archivo demasiado grande"})
+            return
+        guardados.append((nombre, filepath, hash_contenido))
+
+    # 1. Clasificación y conteo (el índice de cada ZIP se lee sin descomprimir nada)
+    sueltos, zips = [], []
+    for file in files:
+        nombre = file.filename or ""
+        if nombre.lower().endswith(".pdf"):
+            sueltos.append(file)
+        elif nombre.lower().endswith(".zip"):
+            try:
+                zip_file = zipfile.ZipFile(file.file)
+            except zipfile.BadZipFile:
+                errores.append({"archivo": nombre, "estado": "error", "detalle": "ZIP inválido"})
+                continue
+            entradas = [
+                info for info in zip_file.infolist()
+                if not info.is_dir() and os.path.basename(info.filename).lower().endswith(".pdf")
+            ]
+            zips.append((zip_file, entradas))
+        else:
+            errores.append({"archivo": nombre, "estado": "error", "detalle": "Solo se permiten archivos PDF o ZIP"})
+
+    try:
+        total = len(sueltos) + sum(len(entradas) for _, entradas in zips)
+        if total > LOTE_MAX_ARCHIVOS:
+            raise HTTPException(status_code=413, detail=f"Máximo {LOTE_MAX_ARCHIVOS} archivos por lote")
+
+        # 2. Copia a disco
+        for file in sueltos:
+            guardar_pdf(file.filename, file.file)
+        for zip_file, entradas in zips:
+            for info in entradas:
+                nombre_pdf = os.path.basename(info.filename)
+                if info.file_size > LOTE_MAX_BYTES_POR_ARCHIVO:
+                    errores.append({"archivo": nombre_pdf, "estado": "error", "detalle": "Archivo demasiado grande"})
+                    continue
+                # file_size viene del propio ZIP: el límite se vuelve a aplicar al descomprimir
+                with zip_file.open(info) as origen:
+                    guardar_pdf(nombre_pdf, origen)
+    finally:
+        for zip_file, _ in zips:
+            zip_file.close()
+
+    return guardados, errores
+
+
+# --- ENDPOINT 8: CARGA MASIVA DE CVs PARA UNA OFERTA ---
+@router.post("/lote/{oferta_id}")
+def procesar_lote(oferta_id: int, files: List[UploadFile] = File(...), db: Session = Depends(get_db)):
+    """
+    Carga masiva de CVs (PDFs sueltos o ZIP) para una oferta. Por cada archivo crea candidato,
+    documento, postulación, ranking y embedding. La extracción de texto corre en un pool de
+    procesos; los embeddings se piden en lote y los registros se guardan en un único commit.
+    Retorna el resultado por archivo; los archivos con error no detienen el resto.
+    """
+    try:
+        oferta = db.query(OfertaLaboral).filter(OfertaLaboral.id == oferta_id).first()
+        if not oferta:
+            raise HTTPException(status_code=404, detail="Oferta no encontrada")
+
+        guardados, resultados = _guardar_archivos_lote(files)
+
+        logger.info(f"Procesando lote de {len(guardados)} CVs para oferta {oferta_id}")
+
+        # 1. Texto: se reutiliza el de CVs ya procesados (mismo hash); el resto se extrae
+        #    una vez por contenido distinto, en paralelo (pool de procesos)
+        hashes = [hash_contenido for _, _, hash_contenido in guardados]
+        documentos_previos = buscar_documentos_por_hashes(db, hashes)
+        textos_por_hash = {h: documento.texto_extraido for h, documento in documentos_previos.items()}
+        # Los archivos se guardan por contenido: los duplicados ya comparten ruta
+        por_extraer = {}
+        for _, filepath, hash_contenido in guardados:
+            if hash_contenido not in textos_por_hash:
+                por_extraer[hash_contenido] = filepath
+
+        with medir_etapa("pdf_extraccion_lote", archivos=len(por_extraer)):
+            extraidos = pdf_utils.extraer_textos_en_paralelo(list(por_extraer.values()))
+        textos_por_hash.update(zip(por_extraer.keys(), extraidos))
+
+        validos = []
+        for nombre, filepath, hash_contenido in guardados:
+            texto = textos_por_hash.get(hash_contenido)
+            if texto and texto.strip():
+                validos.append((nombre, filepath, hash_contenido, texto))
+            else:
+                resultados.append({"archivo": nombre, "estado": "error", "detalle": "No se pudo extraer texto del PDF"})
+
+        # 2. Embeddings: se reutilizan los almacenados por hash; los fragmentos del resto se piden en un lote;
+        #    score contra el embedding almacenado de la oferta
+        modelo = ollama_utils.embedding_model_name
+        embeddings_por_hash = buscar_embeddings_por_hashes(db, [h for _, _, h, _ in validos], modelo)
+        faltantes = {h: texto for _, _, h, texto in validos if h not in embeddings_por_hash}
+        nuevos = embeddings_cv_por_fragmentos(list(faltantes.values()), modelo)
+        embeddings_por_hash.update(zip(faltantes.keys(), nuevos))
+        vectores = [embeddings_por_hash.get(h, (None, []))[0] for _, _, h, _ in validos]
+
+        scores = [None] * len(validos)
+        con_vector = [i for i, vector in enumerate(vectores) if vector]
+        job_vector = obtener_embedding_oferta(oferta, db) if con_vector else None
+        if job_vector is not None:
+            similitudes = ollama_utils.calcular_similitudes_coseno([vectores[i] for i in con_vector], job_vector)
+            for i, similitud in zip(con_vector, similitudes):
+                scores[i] = float(similitud)
+
+        # 3. Persistencia de todo el lote: INSERT multi-fila por tabla y un único commit
+        filas = [
+            {
+                "nombre_completo": os.path.splitext(nombre)[0],
+                "nombre_archivo": nombre,
+                "ruta_archivo": filepath,
+                "texto": texto,
+                "hash_contenido": hash_contenido,
+                "score": score,
+                "observaciones": "Carga masiva - Generado por IA (Ollama)" if score is not None
+                else "Carga masiva - Embedding no disponible",
+                "embedding": vector,
+                "fragmentos": embeddings_por_hash[hash_contenido][1] if vector else None
+            }
+            for (nombre, filepath, hash_contenido, texto), vector, score in zip(validos, vectores, scores)
+        ]
+        ids = []
+        if validos:  # Sin archivos válidos no hay nada que insertar (ni commit)
+            with medir_etapa("db_commit", operacion="lote", filas=len(filas)):
+                ids = insertar_lote_postulaciones(db, oferta_id, filas, modelo)
+                db.commit()
+
+        for fila, (candidato_id, postulacion_id) in zip(filas, ids):
+            resultados.append({
+                "archivo": fila["nombre_archivo"],
+                "estado": "ok",
+                "candidato_id": candidato_id,
+                "postulacion_id": postulacion_id,
+                "score_ia": fila["score"]
+            })
+
+        procesados = sum(1 for r in resultados if r["estado"] == "ok")
+        logger.info(f"Lote procesado: {procesados} correctos, {len(resultados) - procesados} con error")
+
         return JSONResponse(content={
-            "status": "success",
-            "message": "Análisis completo realizado exitosamente",
-            "candidato_id": candidato_id,
+            "status": "success" if procesados == len(resultados) else "partial",
             "oferta_id": oferta_id,
-            "archivo_guardado": filepath,
-            "datos_extraidos": datos_extraidos.dict() if hasattr(datos_extraidos, 'dict') else str(datos_extraidos),
-            "similitud": {
-                "score": similitud_resultado.similitud,
-                "porcentaje": similitud_resultado.porcentaje,
-                "nivel": similitud_resultado.nivel
-            },
-            "preguntas_generadas": preguntas_data,
-            "postulacion_id": nueva_postulacion.id
+            "total": len(resultados),
+            "procesados": procesados,
+            "errores": len(resultados) - procesados,
+            "resultados": resultados
         })
-        
+
     except HTTPException:
         raise
     except Exception as e:
         db.rollback()
-        logger.error(f"Error en análisis completo: {e}")
+        logger.error(f"Error en carga masiva: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error en análisis completo: {str(e)}"
+            detail=f"Error en carga masiva: {str(e)}"
         )
-
@@ -1,9 +1,25 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy import func, insert, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from typing import List
 
-from db.models import RankingPostulacion
-from db.conexion_db import get_db
-from schemas.seleccion import SeleccionResponse
+from db.models import Candidato, CVDocumento, CVEmbedding, OfertaLaboral, Postulacion, RankingPostulacion
+from db.conexion_db import get_async_db, get_db
+from schemas.seleccion import (
+    PreseleccionCandidatoResponse, PreseleccionResponse, RankingCandidatoResponse, RankingOfertaResponse,
+    SeleccionResponse, TopCandidatoResponse
+)
+from utils import ollama_utils
+from utils.embedding_utils import indices_top_k, obtener_embedding_oferta, obtener_embedding_oferta_async
+from utils.lexico_utils import puntajes_bm25
+from utils.metricas_utils import medir_etapa
+from utils.pipeline_utils import ejecutar_etapas
+from utils.preseleccion_utils import (
+    consulta_oferta, evaluar_con_ia, preseleccion_deadline_segundos, preseleccion_max_embedding,
+    preseleccion_max_lexico, preseleccion_min_lexico, preseleccion_top_k_ia
+)
+from utils.resiliencia_utils import con_deadline
 
 router = APIRouter(prefix="/seleccion", tags=["Selección"])
 
@@ -14,3 +30,319 @@ def obtener_ranking(postulacion_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Ranking no encontrado para esta postulación")
     
     return ranking
+
+
+@router.get("/ofertas/{oferta_id}/top-candidatos", response_model=List[TopCandidatoResponse])
+async def top_candidatos(
+    oferta_id: int,
+    k: int = Query(10, ge=1, le=500),
+    solo_postulantes: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Búsqueda de vecinos más cercanos en Postgres (pgvector + índice HNSW):
+    retorna los k CVs más similares a la oferta en una sola consulta.
+    Con solo_postulantes=true el recorrido es exacto sobre los postulantes de la oferta: filtrar
+    después del índice dejaría fuera a los postulantes que no están entre los ef_search vecinos.
+    """
+    oferta = await db.get(OfertaLaboral, oferta_id)
+    if not oferta:
+        raise HTTPException(status_code=404, detail="Oferta no encontrada")
+
+    job_vector = await obtener_embedding_oferta_async(oferta, db)
+    if job_vector is None:
+        raise HTTPException(status_code=503, detail="No se pudo obtener el embedding de la oferta")
+
+    distancia = CVEmbedding.embedding.cosine_distance(job_vector).label("distancia")
+    if solo_postulantes:
+        # Las distancias se calculan en un CTE materializado: el ORDER BY de afuera no puede usar
+        # el índice HNSW, así que Postgres ordena todas las distancias de los postulantes
+        postulantes = select(Postulacion.candidato_id).where(Postulacion.oferta_id == oferta_id)
+        distancias = (
+            select(CVEmbedding.candidato_id, distancia)
+            .where(
+                CVEmbedding.modelo == oferta.embedding_modelo,
+                CVEmbedding.candidato_id.in_(postulantes)
+            )
+            .cte("distancias_postulantes")
+            .prefix_with("MATERIALIZED")
+        )
+        consulta = (
+            select(distancias.c.candidato_id, Candidato.nombre_completo, distancias.c.distancia)
+            .join(Candidato, Candidato.id == distancias.c.candidato_id)
+            .order_by(distancias.c.distancia)
+        )
+    else:
+        # El índice HNSW retorna como máximo ef_search vecinos; se amplía si k es mayor
+        await db.execute(text(f"SET LOCAL hnsw.ef_search = {max(40, k)}"))
+        consulta = (
+            select(CVEmbedding.candidato_id, Candidato.nombre_completo, distancia)
+            .join(Candidato, Candidato.id == CVEmbedding.candidato_id)
+            .where(CVEmbedding.modelo == oferta.embedding_modelo)
+            .order_by(distancia)
+        )
+
+    resultados = (await db.execute(consulta.limit(k))).all()
+
+    return [
+        TopCandidatoResponse(
+            candidato_id=candidato_id,
+            nombre_completo=nombre_completo,
+            similitud=1 - distancia
+        )
+        for candidato_id, nombre_completo, distancia in resultados
+    ]
+
+
+@router.get("/ofertas/{oferta_id}/ranking", response_model=RankingOfertaResponse)
+def ranking_oferta(
+    oferta_id: int,
+    k: int = Query(50, ge=1, le=1000),
+    guardar: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Rankea todas las postulaciones de la oferta en memoria: los embeddings se cargan como una
+    matriz float32 y se puntúan con un solo producto matriz-vector; el top-k sale de argpartition.
+    Con guardar=true los scores de todas las postulaciones se escriben en ranking_postulacion en bloque.
+    """
+    import numpy as np
+
+    oferta = db.query(OfertaLaboral).get(oferta_id)
+    if not oferta:
+        raise HTTPException(status_code=404, detail="Oferta no encontrada")
+
+    job_vector = obtener_embedding_oferta(oferta, db)
+    if job_vector is None:
+        raise HTTPException(status_code=503, detail="No se pudo obtener el embedding de la oferta")
+
+    total_postulaciones = db.query(Postulacion.id).filter(Postulacion.oferta_id == oferta_id).count()
+    filas = (
+        db.query(Postulacion.id, Postulacion.candidato_id, CVEmbedding.embedding)
+        .join(CVEmbedding, CVEmbedding.candidato_id == Postulacion.candidato_id)
+        .filter(
+            Postulacion.oferta_id == oferta_id,
+            CVEmbedding.modelo == oferta.embedding_modelo,
+            CVEmbedding.embedding.isnot(None)
+        )
+        .all()
+    )
+
+    if not filas:
+        return RankingOfertaResponse(
+            oferta_id=oferta_id, total_postulaciones=total_postulaciones,
+            sin_embedding=total_postulaciones, guardados=0, candidatos=[]
+        )
+
+    postulacion_ids = np.fromiter((fila[0] for fila in filas), dtype=np.int64, count=len(filas))
+    candidato_ids = np.fromiter((fila[1] for fila in filas), dtype=np.int64, count=len(filas))
+    matriz = np.stack([fila[2] for fila in filas]).astype(np.float32, copy=False)
+    similitudes = ollama_utils.calcular_similitudes_coseno(matriz, job_vector)
+    top = indices_top_k(similitudes, k)
+
+    guardados = 0
+    if guardar:
+        guardados = _guardar_scores(db, oferta_id, postulacion_ids, similitudes)
+
+    ids_top = [int(candidato_ids[i]) for i in top]
+    nombres = dict(
+        db.query(Candidato.id, Candidato.nombre_completo).filter(Candidato.id.in_(set(ids_top))).all()
+    )
+
+    return RankingOfertaResponse(
+        oferta_id=oferta_id,
+        total_postulaciones=total_postulaciones,
+        sin_embedding=total_postulaciones - len(filas),
+        guardados=guardados,
+        candidatos=[
+            RankingCandidatoResponse(
+                postulacion_id=int(postulacion_ids[i]),
+                candidato_id=int(candidato_ids[i]),
+                nombre_completo=nombres.get(int(candidato_ids[i])),
+                similitud=float(similitudes[i]),
+                score=float(similitudes[i]) * 100
+            )
+            for i in top
+        ]
+    )
+
+
+@router.post("/ofertas/{oferta_id}/preseleccion", response_model=PreseleccionResponse)
+def preseleccion_oferta(
+    oferta_id: int,
+    max_lexico: int = Query(preseleccion_max_lexico, ge=1, le=10000),
+    min_lexico: float = Query(preseleccion_min_lexico, ge=0),
+    max_embedding: int = Query(preseleccion_max_embedding, ge=1, le=2000),
+    top_k_ia: int = Query(preseleccion_top_k_ia, ge=0, le=100),
+    db: Session = Depends(get_db)
+):
+    """
+    Preselección por etapas de las postulaciones de la oferta, de la más barata a la más cara:
+    1. Filtro léxico: BM25 del último CV (texto extraído) de cada postulante contra los requisitos;
+       pasan los max_lexico mejores con puntaje >= min_lexico.
+    2. Rerank por similitud coseno de los embeddings almacenados; pasan los max_embedding mejores.
+    3. Evaluación con el LLM solo de los top_k_ia primeros (en paralelo, con un deadline común).
+    El costo de IA queda acotado por top_k_ia, no por el número de postulantes. Los que llegan a la
+    etapa 2 se escriben en ranking_postulacion: score es el puntaje de la IA si se evaluó, o la
+    similitud * 100; observaciones indica la etapa alcanzada.
+    """
+    import numpy as np
+
+    oferta = db.query(OfertaLaboral).get(oferta_id)
+    if not oferta:
+        raise HTTPException(status_code=404, detail="Oferta no encontrada")
+
+    total_postulaciones = db.query(Postulacion.id).filter(Postulacion.oferta_id == oferta_id).count()
+    ultimo_documento = (
+        db.query(CVDocumento.candidato_id, func.max(CVDocumento.id).label("documento_id"))
+        .group_by(CVDocumento.candidato_id)
+        .subquery()
+    )
+    filas = (
+        db.query(Postulacion.id, Postulacion.candidato_id, CVDocumento.texto_extraido)
+        .join(ultimo_documento, ultimo_documento.c.candidato_id == Postulacion.candidato_id)
+        .join(CVDocumento, CVDocumento.id == ultimo_documento.c.documento_id)
+        .filter(Postulacion.oferta_id == oferta_id, CVDocumento.texto_extraido.isnot(None))
+        .all()
+    )
+    textos = {postulacion_id: texto for postulacion_id, _, texto in filas}
+
+    # Etapa 1: filtro léxico
+    with medir_etapa("preseleccion_lexico", oferta_id=oferta_id, documentos=len(filas)):
+        puntajes, _ = puntajes_bm25([texto for _, _, texto in filas], consulta_oferta(oferta))
+        puntajes = np.asarray(puntajes, dtype=np.float32)
+        lexicos = [int(i) for i in indices_top_k(puntajes, max_lexico) if puntajes[i] >= min_lexico] if filas else []
+
+    # Etapa 2: rerank por embeddings de los que pasaron el filtro léxico
+    job_vector = obtener_embedding_oferta(oferta, db)
+    if job_vector is None:
+        raise HTTPException(status_code=503, detail="No se pudo obtener el embedding de la oferta")
+
+    with medir_etapa("preseleccion_embedding", oferta_id=oferta_id, candidatos=len(lexicos)):
+        embeddings = dict(
+            db.query(CVEmbedding.candidato_id, CVEmbedding.embedding)
+            .filter(
+                CVEmbedding.candidato_id.in_({filas[i][1] for i in lexicos}),
+                CVEmbedding.modelo == oferta.embedding_modelo,
+                CVEmbedding.embedding.isnot(None)
+            )
+            .all()
+        ) if lexicos else {}
+        con_embedding = [i for i in lexicos if filas[i][1] in embeddings]
+        similitudes = np.zeros(0, dtype=np.float32)
+        if con_embedding:
+            matriz = np.stack([embeddings[filas[i][1]] for i in con_embedding]).astype(np.float32, copy=False)
+            similitudes = ollama_utils.calcular_similitudes_coseno(matriz, job_vector)
+        # (índice en filas, similitud), de mayor a menor similitud
+        rerank = [(con_embedding[j], float(similitudes[j])) for j in indices_top_k(similitudes, max_embedding)]
+
+    # Etapa 3: evaluación con el LLM solo del top-k
+    evaluaciones = {}
+    if top_k_ia and rerank:
+        with medir_etapa("preseleccion_ia", oferta_id=oferta_id, candidatos=min(top_k_ia, len(rerank))):
+            with con_deadline(preseleccion_deadline_segundos):
+                etapas = ejecutar_etapas({
+                    i: (lambda postulacion_id=filas[i][0]: evaluar_con_ia(oferta, textos[postulacion_id]))
+                    for i, _ in rerank[:top_k_ia]
+                }, preseleccion_deadline_segundos)
+        evaluaciones = {i: etapa["resultado"] or (None, None) for i, etapa in etapas.items()}
+
+    # Orden final: evaluados por la IA (por su puntaje), luego el resto por similitud
+    candidatos = []
+    for i, similitud in rerank:
+        postulacion_id, candidato_id, _ = filas[i]
+        puntaje_ia, justificacion = evaluaciones.get(i, (None, None))
+        candidatos.append({
+            "postulacion_id": postulacion_id,
+            "candidato_id": candidato_id,
+            "etapa": "ia" if i in evaluaciones else "embedding",
+            "score_lexico": round(float(puntajes[i]), 4),
+            "similitud": round(similitud, 4),
+            "puntaje_ia": puntaje_ia,
+            "justificacion": justificacion,
+            "score": round(puntaje_ia if puntaje_ia is not None else similitud * 100, 2),
+        })
+    candidatos.sort(key=lambda c: (c["puntaje_ia"] is None, -(c["puntaje_ia"] or 0), -c["similitud"]))
+
+    guardados = _guardar_ranking(db, oferta_id, [
+        {
+            "postulacion_id": c["postulacion_id"],
+            "score": c["score"],
+            "score_semantico": c["similitud"],
+            "observaciones": (
+                f"Preselección (IA): {c['puntaje_ia']:.0f}/100. {c['justificacion'] or ''}".strip()
+                if c["puntaje_ia"] is not None else
+                f"Preselección ({'IA no disponible, ' if c['etapa'] == 'ia' else ''}rerank por embeddings): "
+                f"BM25 {c['score_lexico']}, similitud {c['similitud']}"
+            ),
+        }
+        for c in candidatos
+    ]) if candidatos else 0
+
+    nombres = dict(
+        db.query(Candidato.id, Candidato.nombre_completo)
+        .filter(Candidato.id.in_({c["candidato_id"] for c in candidatos}))
+        .all()
+    ) if candidatos else {}
+
+    return PreseleccionResponse(
+        oferta_id=oferta_id,
+        total_postulaciones=total_postulaciones,
+        sin_texto=total_postulaciones - len(filas),
+        sin_embedding=len(lexicos) - len(con_embedding),
+        pasan_lexico=len(lexicos),
+        pasan_embedding=len(rerank),
+        evaluados_ia=sum(1 for puntaje, _ in evaluaciones.values() if puntaje is not None),
+        guardados=guardados,
+        candidatos=[
+            PreseleccionCandidatoResponse(nombre_completo=nombres.get(c["candidato_id"]), **c) for c in candidatos
+        ]
+    )
+
+
+def _guardar_scores(db, oferta_id, postulacion_ids, similitudes):
+    """
+    Scores del ranking vectorizado (similitud * 100) para todas las postulaciones rankeadas.
+    """
+    filas = []
+    for postulacion_id, similitud in zip(postulacion_ids.tolist(), similitudes.tolist()):
+        similitud = round(similitud, 4)
+        filas.append({
+            "postulacion_id": postulacion_id,
+            "score": round(similitud * 100, 2),
+            "score_semantico": similitud,
+            "observaciones": "Ranking vectorizado de la oferta",
+        })
+    return _guardar_ranking(db, oferta_id, filas, actualizar_observaciones=False)
+
+
+def _guardar_ranking(db, oferta_id, filas, actualizar_observaciones=True):
+    """
+    Escribe filas {postulacion_id, score, score_semantico, observaciones} en ranking_postulacion:
+    UPDATE en bloque (executemany por clave primaria) para las postulaciones que ya tienen ranking e
+    INSERT en bloque para el resto. Un solo commit.
+    """
+    existentes = dict(
+        db.query(RankingPostulacion.postulacion_id, RankingPostulacion.id)
+        .join(Postulacion, Postulacion.id == RankingPostulacion.postulacion_id)
+        .filter(Postulacion.oferta_id == oferta_id)
+        .all()
+    )
+
+    actualizaciones = []
+    nuevos = []
+    for fila in filas:
+        if fila["postulacion_id"] in existentes:
+            valores = {"score": fila["score"], "score_semantico": fila["score_semantico"]}
+            if actualizar_observaciones:
+                valores["observaciones"] = fila["observaciones"]
+            actualizaciones.append({"id": existentes[fila["postulacion_id"]], **valores})
+        else:
+            nuevos.append(fila)
+
+    if actualizaciones:
+        db.execute(update(RankingPostulacion), actualizaciones)
+    if nuevos:
+        db.execute(insert(RankingPostulacion), nuevos)
+    db.commit()
+    return len(actualizaciones) + len(nuevos)
@@ -3,6 +3,21 @@ from typing import Optional
 from datetime import datetime
 
 
+class DocumentoResumen(BaseModel):
+    """
+    Documento sin texto_extraido, para listados.
+    """
+    id: int
+    candidato_id: int
+    nombre_archivo: Optional[str]
+    ruta_archivo: Optional[str]
+    hash_contenido: Optional[str] = None
+    creado_en: datetime
+
+    class Config:
+        orm_mode = True
+
+
 class DocumentoResponse(BaseModel):
     id: int
     candidato_id: int
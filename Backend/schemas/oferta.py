@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional
 from datetime import datetime
 
@@ -16,6 +16,22 @@ class OfertaCreate(OfertaBase):
     pass
 
 
+class OfertaUpdate(BaseModel):
+    titulo: Optional[str] = None
+    descripcion: Optional[str] = None
+    requisitos: Optional[str] = None
+    ubicacion: Optional[str] = None
+    estado: Optional[str] = None
+
+    @field_validator("titulo", "estado")
+    @classmethod
+    def no_nulo(cls, valor):
+        # Se pueden omitir, pero sus columnas son NOT NULL: un null explícito es un 422, no un 500
+        if valor is None:
+            raise ValueError("no puede ser null")
+        return valor
+
+
 class OfertaResponse(OfertaBase):
     id: int
     fecha_publicacion: datetime
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 class SeleccionResponse(BaseModel):
     score: Optional[float]
@@ -8,3 +8,49 @@ class SeleccionResponse(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+class TopCandidatoResponse(BaseModel):
+    candidato_id: int
+    nombre_completo: Optional[str]
+    similitud: float
+
+
+class RankingCandidatoResponse(BaseModel):
+    postulacion_id: int
+    candidato_id: int
+    nombre_completo: Optional[str]
+    similitud: float
+    score: float
+
+
+class RankingOfertaResponse(BaseModel):
+    oferta_id: int
+    total_postulaciones: int
+    sin_embedding: int  # Postulaciones cuyo candidato aún no tiene embedding (no se rankean)
+    guardados: int
+    candidatos: List[RankingCandidatoResponse]
+
+
+class PreseleccionCandidatoResponse(BaseModel):
+    postulacion_id: int
+    candidato_id: int
+    nombre_completo: Optional[str]
+    etapa: str  # Última etapa alcanzada: "embedding" o "ia"
+    score_lexico: float
+    similitud: float
+    puntaje_ia: Optional[float]
+    justificacion: Optional[str]
+    score: float
+
+
+class PreseleccionResponse(BaseModel):
+    oferta_id: int
+    total_postulaciones: int
+    sin_texto: int  # Postulaciones sin CV con texto extraído (no participan)
+    sin_embedding: int  # Pasaron el filtro léxico pero su candidato no tiene embedding
+    pasan_lexico: int
+    pasan_embedding: int
+    evaluados_ia: int
+    guardados: int
+    candidatos: List[PreseleccionCandidatoResponse]
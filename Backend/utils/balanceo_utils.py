@@ -0,0 +1,211 @@
+import logging
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from os import getenv
+from urllib.parse import urlsplit
+
+import requests
+
+from utils.metricas_utils import host_en_vuelo, host_peticiones, host_sano
+
+logger = logging.getLogger(__name__)
+
+CHAT = "chat"
+EMBEDDING = "embedding"
+
+# Hosts de Ollama separados por comas. OLLAMA_HOSTS_CHAT / OLLAMA_HOSTS_EMBEDDING permiten
+# separar el tráfico de chat y de embeddings; si no se definen se usa OLLAMA_HOSTS
+ollama_hosts = getenv("OLLAMA_HOSTS") or getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+ollama_hosts_chat = getenv("OLLAMA_HOSTS_CHAT") or ollama_hosts
+ollama_hosts_embedding = getenv("OLLAMA_HOSTS_EMBEDDING") or ollama_hosts
+# Hosts preferidos por modelo (0 = todos): cada modelo queda cargado solo en esos hosts
+ollama_hosts_por_modelo = int(getenv("OLLAMA_HOSTS_POR_MODELO", "0"))
+# Verificación de salud (GET /api/tags) en segundo plano; 0 la desactiva
+ollama_salud_intervalo = float(getenv("OLLAMA_SALUD_INTERVALO", "15"))
+ollama_salud_timeout = float(getenv("OLLAMA_SALUD_TIMEOUT", "3"))
+
+
+def parsear_hosts(texto):
+    """
+    "http://a:11434, http://b:11434/" -> ["http://a:11434", "http://b:11434"] (sin duplicados).
+    """
+    hosts = []
+    for parte in texto.split(","):
+        url = parte.strip().rstrip("/")
+        if url and url not in hosts:
+            hosts.append(url)
+    return hosts
+
+
+def _nombre_modelo(modelo):
+    # Ollama lista "nomic-embed-text:latest" para un modelo pedido como "nomic-embed-text"
+    return modelo if ":" in modelo else f"{modelo}:latest"
+
+
+class EstadoHost:
+    def __init__(self, url):
+        self.url = url
+        self.host = urlsplit(url).netloc
+        self.sano = True  # Hasta la primera verificación se asume disponible
+        self.modelos = None  # Modelos instalados según /api/tags (None = desconocido)
+        self.ultimo_error = None
+        self.verificado_en = None
+        host_sano.labels(self.host).set(1)
+
+
+class PoolHostsOllama:
+    """
+    Hosts de Ollama para chat y embeddings:
+    - Afinidad por modelo (rendezvous hashing): cada modelo prefiere siempre los mismos
+      `hosts_por_modelo` hosts, así no se carga en todos ni se desaloja en cada petición.
+    - Entre los preferidos disponibles se elige el de menos peticiones en curso; a igual carga,
+      el de mayor afinidad.
+    - Se descartan hosts caídos (verificación de salud), con el circuito abierto (`disponible(url)`)
+      o que no tienen instalado el modelo. Si no queda ninguno preferido se usa cualquier otro del
+      mismo tipo de tráfico; si ninguno está disponible se devuelve el de mayor afinidad y el
+      circuit breaker decide.
+    """
+
+    def __init__(self, hosts_por_tipo, hosts_por_modelo=0, intervalo_salud=15, timeout_salud=3, disponible=None):
+        self.hosts_por_tipo = {tipo: list(urls) for tipo, urls in hosts_por_tipo.items()}
+        self.hosts_por_modelo = hosts_por_modelo
+        self.intervalo_salud = intervalo_salud
+        self.timeout_salud = timeout_salud
+        self.disponible = disponible or (lambda url: True)
+
+        self._estados = {}
+        for urls in self.hosts_por_tipo.values():
+            for url in urls:
+                self._estados.setdefault(url, EstadoHost(url))
+        self._en_vuelo = {}  # url -> peticiones en curso
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    @property
+    def principal(self):
+        return self.hosts_por_tipo[CHAT][0]
+
+    @property
+    def urls(self):
+        return list(self._estados)
+
+    def _por_afinidad(self, urls, modelo):
+        return sorted(urls, key=lambda url: zlib.crc32(f"{modelo}|{url}".encode("utf-8")), reverse=True)
+
+    def _tiene_modelo(self, url, modelo):
+        modelos = self._estados[url].modelos
+        return not modelos or _nombre_modelo(modelo) in modelos
+
+    def _usable(self, url):
+        return self._estados[url].sano and self.disponible(url)
+
+    def _elegir(self, tipo, modelo):
+        candidatos = self.hosts_por_tipo[tipo]
+        if len(candidatos) == 1:
+            return candidatos[0]
+        candidatos = [url for url in candidatos if self._tiene_modelo(url, modelo)] or candidatos
+        candidatos = self._por_afinidad(candidatos, modelo)
+        preferidos = candidatos[:self.hosts_por_modelo] if self.hosts_por_modelo > 0 else candidatos
+        usables = (
+            [url for url in preferidos if self._usable(url)]
+            or [url for url in candidatos if self._usable(url)]
+            or candidatos[:1]
+        )
+        # min conserva el orden de afinidad entre hosts con la misma carga
+        return min(usables, key=lambda url: self._en_vuelo.get(url, 0))
+
+    @contextmanager
+    def reservar(self, tipo, modelo):
+        """
+        Elige el host para una petición de `tipo` (chat o embedding) con `modelo` y la cuenta como
+        en curso mientras dura el bloque. Elegir y contar ocurren bajo el mismo lock, así una ráfaga
+        de peticiones simultáneas se reparte en lugar de caer toda en el mismo host.
+        Retorna la URL base del host.
+        """
+        with self._lock:
+            url = self._elegir(tipo, modelo)
+            self._en_vuelo[url] = self._en_vuelo.get(url, 0) + 1
+        host = self._estados[url].host
+        host_peticiones.labels(host, tipo, modelo).inc()
+        host_en_vuelo.labels(host).inc()
+        try:
+            yield url
+        finally:
+            with self._lock:
+                self._en_vuelo[url] -= 1
+            host_en_vuelo.labels(host).dec()
+
+    def verificar(self, url):
+        """
+        GET /api/tags: marca el host como sano o caído y guarda sus modelos instalados.
+        """
+        estado = self._estados[url]
+        try:
+            response = self._session.get(f"{url}/api/tags", timeout=self.timeout_salud)
+            response.raise_for_status()
+            modelos = {modelo.get("name") for modelo in response.json().get("models", [])}
+            estado.modelos, estado.ultimo_error = modelos, None
+            sano = True
+        except (requests.exceptions.RequestException, ValueError) as e:
+            estado.ultimo_error = str(e)
+            sano = False
+        if sano != estado.sano:
+            logger.warning(f"Host de Ollama {estado.host}: {'sano' if sano else 'caído'}")
+        estado.sano = sano
+        estado.verificado_en = time.time()
+        host_sano.labels(estado.host).set(1 if sano else 0)
+        return sano
+
+    def verificar_todos(self):
+        for url in self.urls:
+            self.verificar(url)
+
+    def _bucle_salud(self):
+        while not self._detener.is_set():
+            self.verificar_todos()
+            self._detener.wait(self.intervalo_salud)
+
+    def iniciar(self):
+        """
+        Lanza la verificación de salud periódica (solo tiene sentido con más de un host).
+        """
+        if self._hilo or self.intervalo_salud <= 0 or len(self._estados) < 2:
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle_salud, name="ollama-salud", daemon=True)
+        self._hilo.start()
+        logger.info(f"Verificación de salud de {len(self._estados)} hosts de Ollama cada {self.intervalo_salud}s")
+
+    def detener(self, timeout=5):
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join(timeout)
+            self._hilo = None
+        self._session.close()
+
+    def estadisticas(self):
+        with self._lock:
+            en_vuelo = dict(self._en_vuelo)
+        return {
+            estado.host: {
+                "url": url,
+                "tipos": [tipo for tipo, urls in self.hosts_por_tipo.items() if url in urls],
+                "sano": estado.sano,
+                "en_vuelo": en_vuelo.get(url, 0),
+                "modelos": sorted(estado.modelos) if estado.modelos is not None else None,
+                "ultimo_error": estado.ultimo_error,
+                "verificado_en": estado.verificado_en,
+            }
+            for url, estado in self._estados.items()
+        }
+
+
+def pool_desde_entorno(disponible=None):
+    return PoolHostsOllama(
+        {CHAT: parsear_hosts(ollama_hosts_chat), EMBEDDING: parsear_hosts(ollama_hosts_embedding)},
+        ollama_hosts_por_modelo, ollama_salud_intervalo, ollama_salud_timeout, disponible
+    )
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from os import getenv
+
+from utils.metricas_utils import registrar_cache
+
+
+def clave_contenido(modelo, texto):
+    """
+    Genera una clave direccionada por contenido a partir del modelo y el hash del texto.
+    """
+    texto_hash = hashlib.sha256((texto or "").encode("utf-8")).hexdigest()
+    return f"{modelo}:{texto_hash}"
+
+
+class EmbeddingCache:
+    """
+    Cache de embeddings en dos niveles:
+    - Memoria: LRU con tamaño máximo y expiración por TTL.
+    - Disco (opcional): un archivo JSON por clave, sobrevive a reinicios. Guarda su propia
+      expiración (hora de reloj, no monotónica) para que el TTL también aplique tras un reinicio.
+    """
+
+    def __init__(self, max_items=1024, ttl_segundos=3600, carpeta_disco=None):
+        self.max_items = max_items
+        self.ttl_segundos = ttl_segundos
+        self.carpeta_disco = carpeta_disco
+        self._memoria = OrderedDict()  # clave -> (expira_en, valor)
+        self._lock = threading.Lock()
+        self.hits_memoria = 0
+        self.hits_disco = 0
+        self.misses = 0
+
+        if self.carpeta_disco:
+            os.makedirs(self.carpeta_disco, exist_ok=True)
+
+    # --- Nivel disco ---
+    def _ruta_disco(self, clave):
+        nombre = hashlib.sha256(clave.encode("utf-8")).hexdigest()
+        return os.path.join(self.carpeta_disco, f"{nombre}.json")
+
+    def _leer_disco(self, clave):
+        """
+        Retorna (valor, segundos_restantes) o (None, None) si no existe o expiró.
+        segundos_restantes es None si la entrada no expira.
+        """
+        if not self.carpeta_disco:
+            return None, None
+        ruta = self._ruta_disco(clave)
+        try:
+            with open(ruta, "r", encoding="utf-8") as f:
+                entrada = json.load(f)
+        except FileNotFoundError:
+            return None, None
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Error al leer el cache de embeddings en disco: {e}")
+            return None, None
+        # Archivos sin expiración guardada (formato anterior): su antigüedad es desconocida
+        if not isinstance(entrada, dict) or "expira_en" not in entrada:
+            return None, None
+        expira_en = entrada["expira_en"]
+        if expira_en is None:
+            return entrada.get("valor"), None
+        restantes = expira_en - time.time()
+        if restantes <= 0:
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+            return None, None
+        return entrada.get("valor"), restantes
+
+    def _escribir_disco(self, clave, valor):
+        if not self.carpeta_disco:
+            return
+        ruta = self._ruta_disco(clave)
+        ruta_tmp = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            expira_en = time.time() + self.ttl_segundos if self.ttl_segundos else None
+            with open(ruta_tmp, "w", encoding="utf-8") as f:
+                json.dump({"expira_en": expira_en, "valor": valor}, f)
+            os.replace(ruta_tmp, ruta)  # Escritura atómica
+        except OSError as e:
+            print(f"Error al escribir el cache de embeddings en disco: {e}")
+
+    # --- Nivel memoria ---
+    def _guardar_memoria(self, clave, valor, ttl_segundos=None):
+        ttl_segundos = ttl_segundos if ttl_segundos is not None else self.ttl_segundos
+        expira_en = time.monotonic() + ttl_segundos if ttl_segundos else None
+        self._memoria[clave] = (expira_en, valor)
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_items:
+            self._memoria.popitem(last=False)
+
+    def obtener(self, modelo, texto):
+        """
+        Busca un embedding en memoria y luego en disco. Retorna None si no existe.
+        """
+        clave = clave_contenido(modelo, texto)
+        with self._lock:
+            entrada = self._memoria.get(clave)
+            if entrada is not None:
+                expira_en, valor = entrada
+                if expira_en is None or expira_en > time.monotonic():
+                    self._memoria.move_to_end(clave)
+                    self.hits_memoria += 1
+                    registrar_cache("embeddings", True)
+                    return valor
+                del self._memoria[clave]
+
+        valor, restantes = self._leer_disco(clave)
+        with self._lock:
+            if valor is not None:
+                self.hits_disco += 1
+                # En memoria vive solo lo que le queda en disco, no un TTL completo nuevo
+                self._guardar_memoria(clave, valor, restantes)
+            else:
+                self.misses += 1
+        registrar_cache("embeddings", valor is not None)
+        return valor
+
+    def guardar(self, modelo, texto, valor):
+        """
+        Guarda un embedding en memoria y, si está configurado, en disco.
+        """
+        clave = clave_contenido(modelo, texto)
+        with self._lock:
+            self._guardar_memoria(clave, valor)
+        self._escribir_disco(clave, valor)
+
+    def limpiar(self):
+        """
+        Vacía el nivel en memoria y reinicia los contadores.
+        """
+        with self._lock:
+            self._memoria.clear()
+            self.hits_memoria = 0
+            self.hits_disco = 0
+            self.misses = 0
+
+    def estadisticas(self):
+        with self._lock:
+            hits = self.hits_memoria + self.hits_disco
+            total = hits + self.misses
+            return {
+                "items_memoria": len(self._memoria),
+                "max_items": self.max_items,
+                "ttl_segundos": self.ttl_segundos,
+                "disco_habilitado": bool(self.carpeta_disco),
+                "hits_memoria": self.hits_memoria,
+                "hits_disco": self.hits_disco,
+                "misses": self.misses,
+                "hit_rate": hits / total if total else 0.0,
+            }
+
+
+embedding_cache = EmbeddingCache(
+    max_items=int(getenv("EMBEDDING_CACHE_MAX_ITEMS", "2048")),
+    ttl_segundos=int(getenv("EMBEDDING_CACHE_TTL", "86400")),
+    carpeta_disco=getenv("EMBEDDING_CACHE_DIR") or None,
+)
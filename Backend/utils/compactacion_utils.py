@@ -0,0 +1,173 @@
+import logging
+import re
+import unicodedata
+from collections import Counter
+from os import getenv
+
+from utils.metricas_utils import registrar_tokens_prompt
+from utils.preextraccion_utils import dividir_por_titulos
+
+logger = logging.getLogger(__name__)
+
+# Cambia al modificar las reglas de compactación: forma parte de la versión del cache de extracciones
+VERSION_COMPACTACION = "2"
+
+# Estimación de tokens sin tokenizador (la misma que la fragmentación de embeddings: ~4 caracteres por token)
+caracteres_por_token = float(getenv("PROMPT_CARACTERES_POR_TOKEN", "4"))
+
+# Presupuesto de tokens del texto del CV en cada prompt
+PRESUPUESTOS_TOKENS = {
+    "extraccion": int(getenv("PROMPT_TOKENS_EXTRACCION", "3000")),
+    "preguntas": int(getenv("PROMPT_TOKENS_PREGUNTAS", "300")),
+    "preseleccion": int(getenv("PROMPT_TOKENS_PRESELECCION", "1500")),
+}
+
+# Secciones que se quitan primero al exceder el presupuesto (títulos normalizados, de menor a mayor valor)
+SECCIONES_PRESCINDIBLES = (
+    "referencias", "references", "intereses", "interests", "voluntariado", "publicaciones",
+    "datos personales", "informacion personal", "contacto", "logros", "achievements",
+    "cursos", "courses", "certificados", "certificaciones", "certifications", "idiomas", "languages",
+    "proyectos", "projects",
+)
+
+SEPARADOR_PAGINAS = "\f"  # pdf_utils separa las páginas con un salto de página
+_VINETA_SOLA = re.compile(r"^[^\w(\"'¿¡]{1,3}$")  # Línea con solo una viñeta ("●", "", "-")
+_NUMERO_PAGINA = re.compile(r"^(p[aá]g(ina)?\.?|page)?\s*-?\s*\d{1,3}\s*((de|of|/)\s*\d{1,3})?\s*-?$", re.IGNORECASE)
+_LINEAS_BORDE = 3  # Líneas al inicio y al final de cada página donde se buscan encabezados/pies
+
+
+def contar_tokens(texto):
+    return int(len(texto or "") / caracteres_por_token + 0.5)
+
+
+def _normalizar_caracteres(texto):
+    # NFKC separa ligaduras (ﬁ -> fi); los glifos de uso privado del PDF son viñetas
+    texto = unicodedata.normalize("NFKC", texto)
+    return "".join("•" if unicodedata.category(c) == "Co" else c for c in texto)
+
+
+def _clave_borde(linea):
+    """
+    Clave de un encabezado/pie: la línea con los números de página (1 a 3 dígitos) reemplazados,
+    así "Página 2 de 3" y "Página 3 de 3" coinciden. None para líneas sin letras: fechas como
+    "2015 - 2017" o cifras sueltas se repiten entre páginas sin ser encabezados.
+    """
+    clave = re.sub(r"(?<!\d)\d{1,3}(?!\d)", "#", linea.strip().lower())
+    return clave if re.search(r"[^\W\d_]", clave) else None
+
+
+def quitar_bordes_repetidos(paginas):
+    """
+    Quita los encabezados y pies de página: líneas de los bordes de cada página que se repiten en
+    al menos la mitad de las páginas (se conserva su primera aparición) y los números de página.
+    """
+    if len(paginas) < 2:
+        return paginas
+    lineas_por_pagina = [pagina.split("\n") for pagina in paginas]
+    bordes_por_pagina = []
+    apariciones = Counter()
+    for lineas in lineas_por_pagina:
+        no_vacias = [i for i, linea in enumerate(lineas) if linea.strip()]
+        bordes = set(no_vacias[:_LINEAS_BORDE] + no_vacias[-_LINEAS_BORDE:])
+        bordes_por_pagina.append(bordes)
+        apariciones.update({_clave_borde(lineas[i]) for i in bordes} - {None})
+    minimo = max(2, (len(paginas) + 1) // 2)
+    # Claves muy cortas no identifican un encabezado
+    repetidas = {clave for clave, veces in apariciones.items() if veces >= minimo and len(clave) >= 4}
+
+    vistas = set()
+    resultado = []
+    for lineas, bordes in zip(lineas_por_pagina, bordes_por_pagina):
+        conservadas = []
+        for i, linea in enumerate(lineas):
+            if i in bordes:
+                if _NUMERO_PAGINA.match(linea.strip()):
+                    continue
+                clave = _clave_borde(linea)
+                if clave in repetidas:
+                    if clave in vistas:
+                        continue
+                    vistas.add(clave)
+            conservadas.append(linea)
+        resultado.append("\n".join(conservadas))
+    return resultado
+
+
+def compactar_texto(texto):
+    """
+    Normaliza el texto extraído del PDF para un prompt: encabezados y pies de página repetidos,
+    guiones de corte de línea ("desarro-\\nllo"), viñetas sueltas en su propia línea, espacios y
+    líneas en blanco repetidas, y líneas duplicadas consecutivas.
+    """
+    texto = _normalizar_caracteres(texto or "")
+    paginas = quitar_bordes_repetidos(texto.split(SEPARADOR_PAGINAS))
+    texto = "\n\n".join(paginas)
+
+    texto = re.sub(r"(\w)-\n\s*([a-záéíóúñü])", r"\1\2", texto)  # Palabras cortadas al final de línea
+    lineas = []
+    vineta_pendiente = False
+    for linea in texto.split("\n"):
+        linea = re.sub(r"[ \t ]+", " ", linea).strip()
+        if _VINETA_SOLA.match(linea):
+            vineta_pendiente = True
+            continue
+        if vineta_pendiente and linea:
+            linea = f"- {linea}"
+            vineta_pendiente = False
+        if linea and lineas and linea == lineas[-1]:
+            continue
+        if not linea and (not lineas or not lineas[-1]):
+            continue
+        lineas.append(linea)
+    return "\n".join(lineas).strip()
+
+
+def _truncar(texto, max_caracteres):
+    if len(texto) <= max_caracteres:
+        return texto
+    corte = texto.rfind("\n", 0, max_caracteres)
+    if corte < max_caracteres // 2:
+        corte = texto.rfind(" ", 0, max_caracteres)
+    return texto[:max(corte, 0)].rstrip() + "\n[...]"
+
+
+def ajustar_a_presupuesto(texto, max_tokens):
+    """
+    Recorta el texto a max_tokens: primero quita secciones prescindibles (referencias, intereses,
+    idiomas...) en orden de SECCIONES_PRESCINDIBLES y, si aún excede, trunca por el final en un
+    salto de línea. Retorna (texto, secciones_quitadas, truncado).
+    """
+    if contar_tokens(texto) <= max_tokens:
+        return texto, [], False
+
+    bloques = dividir_por_titulos(texto)
+    quitadas = []
+    for prescindible in SECCIONES_PRESCINDIBLES:
+        if sum(contar_tokens(bloque) for _, _, bloque in bloques) <= max_tokens:
+            break
+        if any(titulo == prescindible for _, titulo, _ in bloques):
+            bloques = [b for b in bloques if b[1] != prescindible]
+            quitadas.append(prescindible)
+    texto = "\n\n".join(bloque for _, _, bloque in bloques)
+
+    if contar_tokens(texto) <= max_tokens:
+        return texto, quitadas, False
+    return _truncar(texto, int(max_tokens * caracteres_por_token)), quitadas, True
+
+
+def compactar_para_prompt(texto, tarea, max_tokens=None, tokens_originales=None):
+    """
+    compactar_texto + ajustar_a_presupuesto con el presupuesto de la tarea (PRESUPUESTOS_TOKENS).
+    Registra los tokens estimados antes y después (log y métrica prompt_cv_tokens); si `texto` ya es
+    una parte del CV, tokens_originales indica los del CV completo.
+    """
+    max_tokens = max_tokens or PRESUPUESTOS_TOKENS[tarea]
+    antes = tokens_originales if tokens_originales is not None else contar_tokens(texto)
+    compactado, quitadas, truncado = ajustar_a_presupuesto(compactar_texto(texto), max_tokens)
+    despues = contar_tokens(compactado)
+    registrar_tokens_prompt(tarea, antes, despues)
+    logger.info(
+        f"compactacion tarea={tarea} tokens_antes={antes} tokens_despues={despues} "
+        f"presupuesto={max_tokens} secciones_quitadas={','.join(quitadas) or '-'} truncado={truncado}"
+    )
+    return compactado
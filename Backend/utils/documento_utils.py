@@ -0,0 +1,150 @@
+import hashlib
+import os
+import uuid
+
+from sqlalchemy.orm import selectinload
+
+from db.models import CVDocumento, CVEmbedding
+from utils.embedding_utils import fragmentos_de_registro
+from utils.metricas_utils import registrar_cache
+
+TAMANO_BLOQUE = 1024 * 1024  # 1 MB
+
+
+class ArchivoDemasiadoGrandeError(Exception):
+    pass
+
+
+def guardar_con_hash(origen, ruta_destino, max_bytes=None):
+    """
+    Copia un archivo (stream) a disco calculando su SHA-256 en la misma pasada.
+    Retorna el hash en hexadecimal. Si el archivo supera max_bytes se borra lo escrito y se lanza
+    ArchivoDemasiadoGrandeError sin terminar de leerlo.
+    """
+    sha256 = hashlib.sha256()
+    escritos = 0
+    with open(ruta_destino, "wb") as destino:
+        while True:
+            bloque = origen.read(TAMANO_BLOQUE)
+            if not bloque:
+                break
+            escritos += len(bloque)
+            if max_bytes is not None and escritos > max_bytes:
+                break
+            sha256.update(bloque)
+            destino.write(bloque)
+    if max_bytes is not None and escritos > max_bytes:
+        os.remove(ruta_destino)
+        raise ArchivoDemasiadoGrandeError(f"El archivo supera {max_bytes} bytes")
+    return sha256.hexdigest()
+
+
+def guardar_por_contenido(origen, carpeta, max_bytes=None):
+    """
+    Guarda un PDF con nombre según su contenido ({hash}.pdf) y retorna (ruta, hash_contenido).
+    Los documentos con el mismo contenido comparten el archivo, así que una subida posterior
+    con el mismo nombre original no pisa a otra. Se escribe primero a un temporal porque el
+    hash solo se conoce al terminar de copiar.
+    """
+    temporal = os.path.join(carpeta, f".{uuid.uuid4()}.tmp")
+    try:
+        hash_contenido = guardar_con_hash(origen, temporal, max_bytes)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    ruta = os.path.join(carpeta, f"{hash_contenido}.pdf")
+    # os.replace es atómico: si el archivo ya existe, tiene el mismo contenido
+    os.replace(temporal, ruta)
+    return ruta, hash_contenido
+
+
+def hash_archivo(ruta):
+    """
+    SHA-256 de un archivo ya guardado en disco.
+    """
+    sha256 = hashlib.sha256()
+    with open(ruta, "rb") as archivo:
+        for bloque in iter(lambda: archivo.read(TAMANO_BLOQUE), b""):
+            sha256.update(bloque)
+    return sha256.hexdigest()
+
+
+def buscar_documento_por_hash(db, hash_contenido):
+    """
+    Retorna el documento más reciente con el mismo contenido y texto ya extraído, o None.
+    """
+    if not hash_contenido:
+        return None
+    return (
+        db.query(CVDocumento)
+        .filter(CVDocumento.hash_contenido == hash_contenido, CVDocumento.texto_extraido.isnot(None))
+        .order_by(CVDocumento.id.desc())
+        .first()
+    )
+
+
+def _consulta_embeddings_fragmentados(db, modelo):
+    # Solo embeddings calculados por fragmentos: los antiguos (texto completo truncado) se recalculan
+    return (
+        db.query(CVEmbedding)
+        .options(selectinload(CVEmbedding.fragmentos))
+        .filter(
+            CVEmbedding.modelo == modelo,
+            CVEmbedding.embedding.isnot(None),
+            CVEmbedding.fragmentos.any()
+        )
+    )
+
+
+def buscar_embedding_por_hash(db, hash_contenido, modelo):
+    """
+    Retorna (vector, fragmentos) de un embedding ya calculado para el mismo contenido y modelo, o None.
+    """
+    if not hash_contenido:
+        return None
+    registro = (
+        _consulta_embeddings_fragmentados(db, modelo)
+        .filter(CVEmbedding.hash_contenido == hash_contenido)
+        .first()
+    )
+    registrar_cache("embeddings_cv", registro is not None)
+    if registro is None:
+        return None
+    return list(registro.embedding), fragmentos_de_registro(registro)
+
+
+def buscar_documentos_por_hashes(db, hashes):
+    """
+    Versión por lote de buscar_documento_por_hash: retorna dict hash -> documento (una sola consulta).
+    """
+    if not hashes:
+        return {}
+    documentos = (
+        db.query(CVDocumento)
+        .filter(CVDocumento.hash_contenido.in_(set(hashes)), CVDocumento.texto_extraido.isnot(None))
+        .order_by(CVDocumento.id)
+        .all()
+    )
+    return {documento.hash_contenido: documento for documento in documentos}
+
+
+def buscar_embeddings_por_hashes(db, hashes, modelo):
+    """
+    Versión por lote de buscar_embedding_por_hash: retorna dict hash -> (vector, fragmentos).
+    """
+    if not hashes:
+        return {}
+    registros = (
+        _consulta_embeddings_fragmentados(db, modelo)
+        .filter(CVEmbedding.hash_contenido.in_(set(hashes)))
+        .all()
+    )
+    encontrados = {registro.hash_contenido for registro in registros}
+    for hash_contenido in set(hashes):
+        registrar_cache("embeddings_cv", hash_contenido in encontrados)
+    return {
+        registro.hash_contenido: (list(registro.embedding), fragmentos_de_registro(registro))
+        for registro in registros
+    }
+
@@ -0,0 +1,154 @@
+import logging
+import threading
+from abc import ABC, abstractmethod
+from os import getenv
+
+from utils.metricas_utils import medir_etapa
+
+logger = logging.getLogger(__name__)
+
+# Motor de embeddings: "ollama" (HTTP) o "sentence-transformers" (local, en el mismo proceso)
+embedding_backend_name = getenv("EMBEDDING_BACKEND", "ollama").lower()
+sentence_transformers_model_name = getenv("SENTENCE_TRANSFORMERS_MODEL", "paraphrase-multilingual-mpnet-base-v2")
+sentence_transformers_device = getenv("SENTENCE_TRANSFORMERS_DEVICE", "cpu")
+sentence_transformers_batch = int(getenv("SENTENCE_TRANSFORMERS_BATCH", "32"))
+
+
+class EmbeddingBackend(ABC):
+    """
+    Interfaz de un motor de embeddings.
+    - nombre: prefijo con el que se identifica el motor en el nombre del modelo ("<nombre>:<modelo>").
+    - embeber(textos, modelo): lista de vectores en el mismo orden. Lanza excepción si falla.
+    """
+    nombre = None
+
+    def identificador(self, modelo):
+        """
+        Nombre del modelo tal como se guarda en cache y en CVEmbedding.modelo.
+        """
+        return f"{self.nombre}:{modelo}"
+
+    @abstractmethod
+    def embeber(self, textos, modelo):
+        ...
+
+    def precargar(self, modelo):
+        pass
+
+
+class OllamaEmbeddingBackend(EmbeddingBackend):
+    """
+    Embeddings vía HTTP contra Ollama (/api/embed con entrada múltiple).
+    """
+    nombre = "ollama"
+
+    def identificador(self, modelo):
+        # Sin prefijo: mantiene compatibles los embeddings ya guardados con el nombre del modelo
+        return modelo
+
+    def embeber(self, textos, modelo):
+        from utils import ollama_utils
+        return ollama_utils._post_embed_lote(textos, modelo)
+
+
+class SentenceTransformersBackend(EmbeddingBackend):
+    """
+    Embeddings locales con sentence-transformers. Cada modelo se carga una sola vez por
+    proceso (worker) y se codifica por lotes, sin el salto HTTP ni la serialización JSON.
+    """
+    nombre = "sentence-transformers"
+
+    def __init__(self, dispositivo, batch_size):
+        self.dispositivo = dispositivo
+        self.batch_size = batch_size
+        self._modelos = {}  # nombre -> (SentenceTransformer, Lock)
+        self._lock = threading.Lock()
+
+    def _modelo(self, modelo):
+        with self._lock:
+            if modelo not in self._modelos:
+                from sentence_transformers import SentenceTransformer
+
+                instancia = SentenceTransformer(modelo, device=self.dispositivo)
+                dimension = instancia.get_sentence_embedding_dimension()
+                esperada = int(getenv("EMBEDDING_DIM", "768"))
+                if dimension != esperada:
+                    logger.warning(
+                        f"El modelo {modelo} genera vectores de {dimension} dimensiones, "
+                        f"pero EMBEDDING_DIM={esperada}"
+                    )
+                logger.info(f"Modelo de embeddings local cargado: {modelo} ({self.dispositivo})")
+                self._modelos[modelo] = (instancia, threading.Lock())
+            return self._modelos[modelo]
+
+    def embeber(self, textos, modelo):
+        instancia, lock = self._modelo(modelo)
+        # Una codificación a la vez por modelo: torch ya paraleliza internamente en CPU
+        with lock:
+            vectores = instancia.encode(
+                list(textos),
+                batch_size=self.batch_size,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            )
+        return vectores.tolist()
+
+    def precargar(self, modelo):
+        self._modelo(modelo)
+
+
+_backends = {
+    OllamaEmbeddingBackend.nombre: OllamaEmbeddingBackend(),
+    SentenceTransformersBackend.nombre: SentenceTransformersBackend(
+        sentence_transformers_device, sentence_transformers_batch
+    ),
+}
+
+
+def registrar_backend(backend):
+    """
+    Registra un motor adicional; sus modelos se identifican como "<backend.nombre>:<modelo>".
+    """
+    _backends[backend.nombre] = backend
+
+
+def resolver_backend(modelo):
+    """
+    Retorna (backend, nombre del modelo para ese backend) a partir del identificador guardado.
+    Los identificadores sin prefijo de un backend registrado corresponden a Ollama.
+    """
+    for nombre, backend in _backends.items():
+        if nombre != OllamaEmbeddingBackend.nombre and modelo.startswith(f"{nombre}:"):
+            return backend, modelo[len(nombre) + 1:]
+    return _backends[OllamaEmbeddingBackend.nombre], modelo
+
+
+def embeber(textos, modelo):
+    """
+    Calcula los embeddings de varios textos con el backend que corresponde al modelo.
+    """
+    backend, nombre_modelo = resolver_backend(modelo)
+    with medir_etapa("embedding", modelo, backend=backend.nombre, textos=len(textos)):
+        return backend.embeber(textos, nombre_modelo)
+
+
+def modelo_embedding_configurado(modelo_ollama):
+    """
+    Identificador del modelo de embeddings activo según EMBEDDING_BACKEND.
+    """
+    if embedding_backend_name == OllamaEmbeddingBackend.nombre:
+        return modelo_ollama
+    if embedding_backend_name == SentenceTransformersBackend.nombre:
+        return _backends[embedding_backend_name].identificador(sentence_transformers_model_name)
+    raise ValueError(f"EMBEDDING_BACKEND no soportado: {embedding_backend_name}")
+
+
+def precargar_backend(modelo):
+    """
+    Carga el modelo al iniciar el servidor para no pagar la carga en la primera petición.
+    """
+    backend, nombre_modelo = resolver_backend(modelo)
+    try:
+        backend.precargar(nombre_modelo)
+    except Exception as e:
+        logger.error(f"No se pudo precargar el modelo de embeddings {modelo}: {e}")
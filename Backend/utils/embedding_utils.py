@@ -0,0 +1,190 @@
+import hashlib
+from datetime import datetime
+
+from db.models import CVEmbedding, CVEmbeddingFragmento
+from utils import ollama_utils
+from utils.texto_utils import dividir_en_fragmentos
+
+
+def texto_oferta(oferta):
+    """
+    Construye el texto de la oferta que se usa para el embedding (descripción + requisitos).
+    """
+    partes = []
+    if oferta.descripcion:
+        partes.append(oferta.descripcion.strip())
+    if oferta.requisitos:
+        partes.append(f"Requisitos:\n{oferta.requisitos.strip()}")
+    return "\n\n".join(partes)
+
+
+def version_embedding_oferta(oferta):
+    """
+    Hash del texto embebido; cambia cuando cambia la descripción o los requisitos.
+    """
+    return hashlib.sha256(texto_oferta(oferta).encode("utf-8")).hexdigest()
+
+
+def embedding_oferta_vigente(oferta, modelo=ollama_utils.embedding_model_name):
+    """
+    Indica si el embedding almacenado corresponde al texto y modelo actuales de la oferta.
+    """
+    return (
+        oferta.embedding is not None
+        and oferta.embedding_modelo == modelo
+        and oferta.embedding_hash == version_embedding_oferta(oferta)
+    )
+
+
+def actualizar_embedding_oferta(oferta, modelo=ollama_utils.embedding_model_name):
+    """
+    Recalcula el embedding de la oferta si está desactualizado. No hace commit.
+    Retorna True si el embedding quedó vigente.
+    """
+    if embedding_oferta_vigente(oferta, modelo):
+        return True
+
+    texto = texto_oferta(oferta)
+    if not texto:
+        return False
+
+    embedding_res = ollama_utils.call_ollama_embeddings_api(texto, model=modelo)
+    return _asignar_embedding_oferta(oferta, embedding_res, modelo)
+
+
+def _asignar_embedding_oferta(oferta, embedding_res, modelo):
+    if not embedding_res or not embedding_res.get("embedding"):
+        return False
+
+    oferta.embedding = embedding_res["embedding"]
+    oferta.embedding_modelo = modelo
+    oferta.embedding_hash = version_embedding_oferta(oferta)
+    oferta.embedding_fecha = datetime.utcnow()
+    return True
+
+
+def obtener_embedding_oferta(oferta, db, modelo=ollama_utils.embedding_model_name):
+    """
+    Retorna el vector almacenado de la oferta; lo calcula y persiste si falta o está desactualizado.
+    Retorna None si no se pudo obtener (p. ej. sin conexión con Ollama).
+    """
+    if not embedding_oferta_vigente(oferta, modelo):
+        if not actualizar_embedding_oferta(oferta, modelo):
+            return None
+        db.commit()
+
+    return list(oferta.embedding)
+
+
+async def obtener_embedding_oferta_async(oferta, db, modelo=ollama_utils.embedding_model_name):
+    """
+    Variante de obtener_embedding_oferta para AsyncSession: espera a Ollama y a la BD
+    sin bloquear el event loop.
+    """
+    if not embedding_oferta_vigente(oferta, modelo):
+        texto = texto_oferta(oferta)
+        if not texto:
+            return None
+        embedding_res = await ollama_utils.call_ollama_embeddings_api_async(texto, model=modelo)
+        if not _asignar_embedding_oferta(oferta, embedding_res, modelo):
+            return None
+        await db.commit()
+
+    return list(oferta.embedding)
+
+
+def promediar_vectores(vectores):
+    """
+    Promedio de los vectores normalizados (L2), normalizado a su vez: cada fragmento pesa lo mismo
+    sin importar su norma y el vector del documento queda unitario.
+    """
+    import numpy as np
+
+    matriz = np.asarray(vectores, dtype=np.float32)
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    normas[normas == 0] = 1.0
+    promedio = (matriz / normas).mean(axis=0)
+    norma = np.linalg.norm(promedio)
+    return (promedio / norma if norma > 0 else promedio).tolist()
+
+
+def indices_top_k(similitudes, k):
+    """
+    Índices de las k similitudes más altas, de mayor a menor. argpartition selecciona en O(n)
+    y solo se ordenan los k elegidos.
+    """
+    import numpy as np
+
+    n = len(similitudes)
+    if k >= n:
+        return np.argsort(-similitudes)
+    elegidos = np.argpartition(-similitudes, k - 1)[:k]
+    return elegidos[np.argsort(-similitudes[elegidos])]
+
+
+def embeddings_cv_por_fragmentos(textos, modelo=ollama_utils.embedding_model_name):
+    """
+    Embeddings de CVs completos: cada texto se divide en fragmentos solapados, todos los
+    fragmentos (de todos los textos) se embeben en un solo lote y se promedian por CV.
+    Retorna una lista de (vector_documento, fragmentos) en el mismo orden; fragmentos es una
+    lista de dicts {"indice", "inicio", "fin", "embedding"}. (None, []) si no se pudo obtener.
+    """
+    divisiones = [dividir_en_fragmentos(texto) for texto in textos]
+    todos = [fragmento for division in divisiones for _, _, fragmento in division]
+    vectores = iter(ollama_utils.call_ollama_embeddings_lote(todos, model=modelo) if todos else [])
+
+    resultados = []
+    for division in divisiones:
+        fragmentos = [
+            {"indice": indice, "inicio": inicio, "fin": fin, "embedding": next(vectores)}
+            for indice, (inicio, fin, _) in enumerate(division)
+        ]
+        # Un fragmento fallido invalida el CV: el promedio parcial no sería comparable
+        if not fragmentos or any(f["embedding"] is None for f in fragmentos):
+            resultados.append((None, []))
+            continue
+        resultados.append((promediar_vectores([f["embedding"] for f in fragmentos]), fragmentos))
+    return resultados
+
+
+def embedding_cv_por_fragmentos(texto, modelo=ollama_utils.embedding_model_name):
+    """
+    Versión de embeddings_cv_por_fragmentos para un solo CV: retorna (vector_documento, fragmentos).
+    """
+    return embeddings_cv_por_fragmentos([texto], modelo)[0]
+
+
+def fragmentos_de_registro(registro):
+    """
+    Convierte los fragmentos almacenados de un CVEmbedding al formato de embeddings_cv_por_fragmentos.
+    """
+    return [
+        {"indice": f.indice, "inicio": f.inicio, "fin": f.fin, "embedding": list(f.embedding)}
+        for f in registro.fragmentos
+    ]
+
+
+def nuevos_fragmentos(fragmentos):
+    return [
+        CVEmbeddingFragmento(indice=f["indice"], inicio=f["inicio"], fin=f["fin"], embedding=f["embedding"])
+        for f in fragmentos or []
+    ]
+
+
+def guardar_embedding_cv(db, candidato_id, vector, modelo=ollama_utils.embedding_model_name, hash_contenido=None,
+                         fragmentos=None):
+    """
+    Crea o actualiza el embedding del candidato (uno por candidato) junto con sus
+    vectores por fragmento. No hace commit.
+    """
+    registro = db.query(CVEmbedding).filter(CVEmbedding.candidato_id == candidato_id).first()
+    if registro is None:
+        registro = CVEmbedding(candidato_id=candidato_id)
+        db.add(registro)
+
+    registro.embedding = vector
+    registro.modelo = modelo
+    registro.hash_contenido = hash_contenido
+    registro.fecha_generacion = datetime.utcnow()
+    registro.fragmentos = nuevos_fragmentos(fragmentos)
+    return registro
@@ -0,0 +1,61 @@
+import hashlib
+import json
+from datetime import datetime
+
+from sqlalchemy.dialects.postgresql import insert
+
+from db.models import ExtraccionCV
+from utils.metricas_utils import registrar_cache
+from utils.texto_utils import normalizar_texto
+
+
+def version_prompt(*plantillas):
+    """
+    Versión de una plantilla de prompt: hash de su texto. Cambia automáticamente al editarla.
+    """
+    return hashlib.sha256("\x00".join(plantillas).encode("utf-8")).hexdigest()[:16]
+
+
+def hash_texto(texto):
+    """
+    SHA-256 del texto normalizado (el mismo CV con distinto espaciado comparte clave).
+    """
+    return hashlib.sha256(normalizar_texto(texto).encode("utf-8")).hexdigest()
+
+
+def buscar_extraccion(db, texto, modelo, version):
+    """
+    Retorna los datos ya extraídos (dict) para el texto, modelo y versión del prompt, o None.
+    """
+    datos = (
+        db.query(ExtraccionCV.datos)
+        .filter(
+            ExtraccionCV.modelo == modelo,
+            ExtraccionCV.version_prompt == version,
+            ExtraccionCV.hash_texto == hash_texto(texto)
+        )
+        .scalar()
+    )
+    registrar_cache("extracciones", datos is not None)
+    return json.loads(datos) if datos else None
+
+
+def guardar_extraccion(db, texto, datos, modelo, version):
+    """
+    Guarda (o reemplaza) el resultado parseado de la extracción. No hace commit.
+    """
+    valores = {
+        "modelo": modelo,
+        "version_prompt": version,
+        "hash_texto": hash_texto(texto),
+        "datos": json.dumps(datos, ensure_ascii=False),
+        "creado_en": datetime.utcnow(),
+    }
+    db.execute(
+        insert(ExtraccionCV)
+        .values(**valores)
+        .on_conflict_do_update(
+            constraint="uq_cv_extraccion_clave",
+            set_={"datos": valores["datos"], "creado_en": valores["creado_en"]}
+        )
+    )
@@ -0,0 +1,56 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+
+# Palabras sin valor para comparar un CV con los requisitos de una oferta
+PALABRAS_VACIAS = {
+    "a", "al", "con", "como", "de", "del", "e", "el", "en", "es", "la", "las", "lo", "los", "o", "para", "por",
+    "que", "se", "su", "sus", "un", "una", "y", "and", "for", "in", "of", "on", "or", "the", "to", "with",
+    "experiencia", "conocimiento", "conocimientos", "manejo", "deseable", "requisito", "requisitos", "anos",
+}
+
+# Tokens con +, # o . internos para no partir "c++", "c#" o "node.js"
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+
+def tokenizar(texto):
+    """
+    Minúsculas sin tildes, tokens alfanuméricos sin palabras vacías ni tokens de una letra.
+    """
+    texto = unicodedata.normalize("NFKD", texto or "").encode("ascii", "ignore").decode("ascii").lower()
+    tokens = (token.rstrip(".") for token in _TOKEN.findall(texto))
+    return [token for token in tokens if len(token) > 1 and token not in PALABRAS_VACIAS]
+
+
+def puntajes_bm25(documentos, consulta, k1=1.5, b=0.75):
+    """
+    Puntaje BM25 (Okapi) de cada documento para la consulta. Solo se calculan las frecuencias de los
+    términos de la consulta, así el costo es una pasada de tokenización por documento.
+    Retorna (puntajes, terminos): una lista en el orden de `documentos` y los términos buscados.
+    """
+    terminos = list(dict.fromkeys(tokenizar(consulta)))
+    if not documentos or not terminos:
+        return [0.0] * len(documentos), terminos
+
+    buscados = set(terminos)
+    frecuencias, longitudes = [], []
+    for documento in documentos:
+        tokens = tokenizar(documento)
+        longitudes.append(len(tokens))
+        frecuencias.append(Counter(token for token in tokens if token in buscados))
+
+    n = len(documentos)
+    promedio = (sum(longitudes) / n) or 1.0
+    idf = {}
+    for termino in terminos:
+        df = sum(1 for frecuencia in frecuencias if termino in frecuencia)
+        idf[termino] = math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    puntajes = []
+    for frecuencia, longitud in zip(frecuencias, longitudes):
+        normalizador = k1 * (1 - b + b * longitud / promedio)
+        puntajes.append(sum(
+            idf[termino] * tf * (k1 + 1) / (tf + normalizador) for termino, tf in frecuencia.items()
+        ))
+    return puntajes, terminos
@@ -0,0 +1,167 @@
+import logging
+import time
+from contextlib import contextmanager
+from os import getenv
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+
+logger = logging.getLogger(__name__)
+
+# Buckets en segundos: desde una consulta a la BD hasta una generación larga del LLM
+_BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+etapa_duracion = Histogram(
+    "procesamiento_etapa_duracion_segundos",
+    "Duración de cada etapa del procesamiento de CVs (pdf, embedding, chat, db_commit, etapas del análisis)",
+    ["etapa", "modelo"],
+    buckets=_BUCKETS_SEGUNDOS
+)
+ollama_tokens = Counter(
+    "ollama_tokens_total",
+    "Tokens procesados por Ollama (tipo: prompt o generados)",
+    ["modelo", "tipo"]
+)
+ollama_tokens_por_segundo = Histogram(
+    "ollama_tokens_por_segundo",
+    "Velocidad de generación reportada por Ollama (eval_count / eval_duration)",
+    ["modelo"],
+    buckets=(1, 2, 5, 10, 20, 40, 80, 160, 320)
+)
+cache_consultas = Counter(
+    "cache_consultas_total",
+    "Consultas a los caches (embeddings en memoria/disco, embeddings de CV en BD, extracciones)",
+    ["cache", "resultado"]
+)
+fallback_simulado = Counter(
+    "procesamiento_fallback_simulado_total",
+    "Respuestas que usaron datos simulados porque la IA falló o no terminó a tiempo",
+    ["operacion"]
+)
+prompt_tokens = Histogram(
+    "prompt_cv_tokens",
+    "Tokens estimados del texto del CV en un prompt, antes y después de la compactación (fase)",
+    ["tarea", "fase"],
+    buckets=(100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+)
+campos_extraidos = Counter(
+    "extraccion_campos_total",
+    "Campos de CV extraídos según su origen (heuristica: patrones sin IA, ia)",
+    ["campo", "origen"]
+)
+circuito_estado = Gauge(
+    "ollama_circuito_estado",
+    "Estado del circuit breaker por host de Ollama (0 cerrado, 1 semiabierto, 2 abierto)",
+    ["host"],
+    multiprocess_mode="max"
+)
+circuito_rechazos = Counter(
+    "ollama_circuito_rechazos_total",
+    "Llamadas a Ollama rechazadas al instante por el circuito abierto",
+    ["host"]
+)
+host_en_vuelo = Gauge(
+    "ollama_host_en_vuelo",
+    "Peticiones en curso (incluidas las que esperan cupo) por host de Ollama",
+    ["host"],
+    multiprocess_mode="livesum"
+)
+host_peticiones = Counter(
+    "ollama_host_peticiones_total",
+    "Peticiones enrutadas a cada host de Ollama (tipo: chat o embedding)",
+    ["host", "tipo", "modelo"]
+)
+host_sano = Gauge(
+    "ollama_host_sano",
+    "Resultado de la última verificación de salud de cada host de Ollama (1 sano, 0 caído)",
+    ["host"],
+    multiprocess_mode="min"
+)
+
+
+@contextmanager
+def medir_etapa(etapa, modelo="", **contexto):
+    """
+    Mide la duración de un bloque: la registra en el histograma por etapa y emite un log
+    estructurado (clave=valor) con la etapa, los segundos, el estado y el contexto adicional.
+    Las excepciones marcadas con `sin_llamada` (rechazos sin llamar al servicio) solo se registran en el log.
+    """
+    inicio = time.perf_counter()
+    estado = "ok"
+    try:
+        yield
+    except BaseException as e:
+        estado = "omitido" if getattr(e, "sin_llamada", False) else "error"
+        raise
+    finally:
+        segundos = time.perf_counter() - inicio
+        if estado != "omitido":
+            etapa_duracion.labels(etapa, modelo).observe(segundos)
+        registrar_tiempo(etapa, segundos, estado, modelo=modelo, **contexto)
+
+
+def registrar_tiempo(etapa, segundos, estado="ok", **contexto):
+    """
+    Log estructurado de una medición de tiempo, p. ej.:
+    tiempo etapa=chat segundos=3.214 estado=ok modelo=deepseek-r1:8b
+    """
+    campos = " ".join(f"{clave}={valor}" for clave, valor in contexto.items() if valor not in (None, ""))
+    logger.info(f"tiempo etapa={etapa} segundos={segundos:.3f} estado={estado} {campos}".rstrip())
+
+
+def observar_etapa(etapa, segundos, estado="ok", modelo="", **contexto):
+    """
+    Registra una duración ya medida (p. ej. las etapas de ejecutar_etapas).
+    """
+    etapa_duracion.labels(etapa, modelo).observe(segundos)
+    registrar_tiempo(etapa, segundos, estado, modelo=modelo, **contexto)
+
+
+def registrar_uso_ollama(modelo, respuesta):
+    """
+    Contabiliza los tokens y la velocidad de generación a partir de los campos que Ollama
+    incluye en la respuesta final (prompt_eval_count, eval_count, eval_duration en ns).
+    """
+    if not respuesta:
+        return
+    prompt = respuesta.get("prompt_eval_count") or 0
+    generados = respuesta.get("eval_count") or 0
+    if prompt:
+        ollama_tokens.labels(modelo, "prompt").inc(prompt)
+    if generados:
+        ollama_tokens.labels(modelo, "generados").inc(generados)
+        duracion = (respuesta.get("eval_duration") or 0) / 1e9
+        if duracion > 0:
+            ollama_tokens_por_segundo.labels(modelo).observe(generados / duracion)
+
+
+def registrar_cache(cache, acierto):
+    cache_consultas.labels(cache, "hit" if acierto else "miss").inc()
+
+
+def registrar_fallback(operacion):
+    fallback_simulado.labels(operacion).inc()
+
+
+def registrar_tokens_prompt(tarea, antes, despues):
+    prompt_tokens.labels(tarea, "original").observe(antes)
+    prompt_tokens.labels(tarea, "compactado").observe(despues)
+
+
+def registrar_campos_extraidos(origen_campos):
+    for campo, origen in origen_campos.items():
+        campos_extraidos.labels(campo, origen).inc()
+
+
+def exportar_metricas():
+    """
+    Métricas en formato de texto de Prometheus: (contenido, content-type).
+    Con varios workers (PROMETHEUS_MULTIPROC_DIR) se agregan las de todos los procesos.
+    """
+    if getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+    else:
+        registro = REGISTRY
+    return generate_latest(registro), CONTENT_TYPE_LATEST
@@ -1,15 +1,369 @@
+import asyncio
+import queue
 import requests
 import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import aclosing, nullcontext
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturoTimeoutError
+from os import getenv
+from urllib.parse import urlsplit
 
-ollama_base_url = "http://localhost:11434"
-deepseek_model_name = "deepseek-r1:8b" # O deepseek-v2, etc., según el que tengas descargado
+import httpx
+from requests.adapters import HTTPAdapter
 
-# --- Helper function para hacer las peticiones de chat ---
-def call_ollama_chat_api(messages, model=deepseek_model_name, format=None, stream=False):
+from utils import embedding_backends_utils
+from utils.balanceo_utils import CHAT, EMBEDDING, pool_desde_entorno
+from utils.cache_utils import embedding_cache
+from utils.metricas_utils import medir_etapa, observar_etapa, registrar_uso_ollama
+from utils.resiliencia_utils import (
+    CircuitBreaker, DeadlineExcedidoError, OllamaNoDisponibleError, SinCupoError, circuito_espera_segundos,
+    circuito_lento_segundos, circuito_max_fallos, circuito_sondeos, con_deadline, deadline_actual, tiempo_restante,
+    timeout_con_deadline
+)
+
+deepseek_model_name = getenv("DEEPSEEK_MODEL", "deepseek-r1:8b") # O deepseek-v2, etc., según el que tengas descargado
+# Con EMBEDDING_BACKEND=sentence-transformers el identificador queda como "sentence-transformers:<modelo>"
+embedding_model_name = embedding_backends_utils.modelo_embedding_configurado(getenv("EMBEDDING_MODEL", "nomic-embed-text"))
+
+# Timeouts (segundos) y máximo de peticiones simultáneas por host de Ollama
+ollama_connect_timeout = float(getenv("OLLAMA_CONNECT_TIMEOUT", "5"))
+ollama_read_timeout = float(getenv("OLLAMA_READ_TIMEOUT", "180"))
+ollama_max_concurrencia = int(getenv("OLLAMA_MAX_CONCURRENCIA", "4"))
+
+# Hosts de Ollama (OLLAMA_HOSTS, OLLAMA_HOSTS_CHAT, OLLAMA_HOSTS_EMBEDDING): ver utils/balanceo_utils.py
+
+# Micro-batching de embeddings: agrupa peticiones que llegan dentro de la ventana en un solo /api/embed
+embedding_lote_habilitado = getenv("EMBEDDING_LOTE_HABILITADO", "true").lower() in ("1", "true", "si")
+embedding_lote_ventana_ms = float(getenv("EMBEDDING_LOTE_VENTANA_MS", "10"))
+embedding_lote_max = int(getenv("EMBEDDING_LOTE_MAX", "32"))
+
+
+class OllamaClient:
     """
-    Realiza una petición a la API de chat de Ollama.
+    Cliente HTTP compartido para Ollama:
+    - Conexiones keep-alive reutilizadas (requests.Session / httpx.AsyncClient).
+    - Timeouts de conexión y lectura en todas las peticiones.
+    - Límite de peticiones en vuelo por host, común a las variantes síncrona y asíncrona.
+    - Timeouts recortados al presupuesto de la petición en curso (con_deadline).
+    - Circuit breaker por host: con Ollama caído o lento las llamadas fallan al instante
+      (CircuitoAbiertoError) y el llamador usa su resultado simulado.
+    - Varios hosts (`hosts`): cada petición se enruta con hosts.reservar(tipo, modelo), que evita
+      los hosts caídos o con el circuito abierto.
+    """
+
+    def __init__(self, connect_timeout, read_timeout, max_concurrencia):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_concurrencia = max_concurrencia
+
+        self._semaforos = {}  # host -> BoundedSemaphore
+        self._circuitos = {}  # host -> CircuitBreaker
+        self._lock = threading.Lock()
+        self.hosts = pool_desde_entorno(disponible=lambda url: self.circuito(url).disponible())
+
+        self._session = requests.Session()
+        # Un pool de conexiones keep-alive por host de Ollama
+        adapter = HTTPAdapter(pool_connections=max(4, len(self.hosts.urls)), pool_maxsize=max_concurrencia)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+        self._cliente_async = None
+
+    def _semaforo(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._semaforos:
+                self._semaforos[host] = threading.BoundedSemaphore(self.max_concurrencia)
+            return self._semaforos[host]
+
+    def circuito(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._circuitos:
+                self._circuitos[host] = CircuitBreaker(
+                    host, circuito_max_fallos, circuito_lento_segundos, circuito_espera_segundos, circuito_sondeos
+                )
+            return self._circuitos[host]
+
+    def estadisticas_circuitos(self):
+        with self._lock:
+            circuitos = dict(self._circuitos)
+        return {host: circuito.estadisticas() for host, circuito in circuitos.items()}
+
+    def estadisticas_hosts(self):
+        """
+        Por host: tipos de tráfico, salud, peticiones en curso, modelos instalados y circuito.
+        """
+        hosts = self.hosts.estadisticas()
+        for host, circuito in self.estadisticas_circuitos().items():
+            hosts.setdefault(host, {})["circuito"] = circuito
+        return hosts
+
+    def _timeouts(self, timeout):
+        """
+        (connect, read) recortados a lo que queda del presupuesto; lanza DeadlineExcedidoError si ya venció.
+        """
+        read_timeout = timeout_con_deadline(timeout or self.read_timeout)
+        return min(self.connect_timeout, read_timeout), read_timeout
+
+    @staticmethod
+    def _sin_cupo(url, espera):
+        # La espera es por el límite de concurrencia de la app, no por el host: no cuenta para su circuito
+        restante = tiempo_restante()
+        if restante is not None and restante <= espera:
+            return DeadlineExcedidoError(f"Se agotó el presupuesto esperando cupo para {url}")
+        return SinCupoError(f"Sin cupo libre para {url} tras {espera}s")
+
+    def post(self, url, payload, timeout=None):
+        """
+        POST síncrono. Espera un cupo libre del host como máximo el timeout de lectura.
+        """
+        connect_timeout, read_timeout = self._timeouts(timeout)
+        with self.circuito(url).llamada(_es_fallo_del_host) as cronometro:
+            semaforo = self._semaforo(url)
+            if not semaforo.acquire(timeout=read_timeout):
+                raise self._sin_cupo(url, read_timeout)
+            cronometro.iniciar()  # La espera del cupo no cuenta como lentitud del host
+            try:
+                response = self._session.post(url, json=payload, timeout=(connect_timeout, read_timeout))
+                response.raise_for_status() # Lanza una excepción para errores HTTP
+                return response
+            finally:
+                semaforo.release()
+
+    def _obtener_cliente_async(self):
+        if self._cliente_async is None:
+            self._cliente_async = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(max_connections=None, max_keepalive_connections=self.max_concurrencia),
+            )
+        return self._cliente_async
+
+    async def _adquirir_async(self, semaforo, espera_maxima):
+        # Sondeo sin bloquear el event loop, compartiendo el mismo cupo que las llamadas síncronas
+        loop = asyncio.get_running_loop()
+        limite = loop.time() + espera_maxima
+        while not semaforo.acquire(blocking=False):
+            if loop.time() >= limite:
+                return False
+            await asyncio.sleep(0.01)
+        return True
+
+    async def apost(self, url, payload, timeout=None):
+        """
+        POST asíncrono para endpoints async; no bloquea el event loop.
+        """
+        connect_timeout, read_timeout = self._timeouts(timeout)
+        with self.circuito(url).llamada(_es_fallo_del_host) as cronometro:
+            semaforo = self._semaforo(url)
+            if not await self._adquirir_async(semaforo, read_timeout):
+                raise self._sin_cupo(url, read_timeout)
+            cronometro.iniciar()
+            try:
+                cliente = self._obtener_cliente_async()
+                response = await cliente.post(
+                    url, json=payload, timeout=httpx.Timeout(read_timeout, connect=connect_timeout)
+                )
+                response.raise_for_status()
+                return response
+            finally:
+                semaforo.release()
+
+    async def astream(self, url, payload, timeout=None):
+        """
+        POST asíncrono con respuesta en streaming: genera las líneas (NDJSON) a medida que llegan.
+        El cupo del host se mantiene hasta terminar de leer la respuesta. Para el circuit breaker
+        cuenta el tiempo hasta recibir las cabeceras, no la duración de toda la generación.
+        """
+        connect_timeout, read_timeout = self._timeouts(timeout)
+        circuito = self.circuito(url)
+        semaforo = self._semaforo(url)
+        response = None
+        with circuito.llamada(_es_fallo_del_host) as cronometro:
+            if not await self._adquirir_async(semaforo, read_timeout):
+                raise self._sin_cupo(url, read_timeout)
+            cronometro.iniciar()
+            try:
+                cliente = self._obtener_cliente_async()
+                response = await cliente.send(
+                    cliente.build_request(
+                        "POST", url, json=payload, timeout=httpx.Timeout(read_timeout, connect=connect_timeout)
+                    ),
+                    stream=True
+                )
+                response.raise_for_status()
+            except BaseException:
+                if response is not None:
+                    await response.aclose()
+                semaforo.release()
+                raise
+        try:
+            async for linea in response.aiter_lines():
+                if linea:
+                    yield linea
+        finally:
+            await response.aclose()
+            semaforo.release()
+
+    async def cerrar(self):
+        self.hosts.detener()
+        self._session.close()
+        if self._cliente_async is not None:
+            await self._cliente_async.aclose()
+            self._cliente_async = None
+
+
+def _es_fallo_del_host(error):
+    """
+    Errores que cuentan para el circuit breaker: conexión, timeouts y respuestas 5xx.
+    Un 4xx (p. ej. modelo inexistente) es un error de la petición, no del host, y tampoco lo es
+    un timeout recortado por el presupuesto de la petición que ya se agotó.
+    """
+    if isinstance(error, (requests.exceptions.HTTPError, httpx.HTTPStatusError)):
+        return error.response is not None and error.response.status_code >= 500
+    if isinstance(error, (requests.exceptions.Timeout, httpx.TimeoutException)):
+        restante = tiempo_restante()
+        if restante is not None and restante <= 0:
+            return False
+    return isinstance(error, (
+        requests.exceptions.ConnectionError, requests.exceptions.Timeout, httpx.TransportError
+    ))
+
+
+cliente_ollama = OllamaClient(ollama_connect_timeout, ollama_read_timeout, ollama_max_concurrencia)
+# Host principal (el primero de chat); se mantiene para los reportes y la compatibilidad con OLLAMA_BASE_URL
+ollama_base_url = cliente_ollama.hosts.principal
+
+
+def _post_embed_lote(textos, model):
     """
-    headers = {'Content-Type': 'application/json'}
+    Envía varios textos en una sola petición a /api/embed. Lanza excepción si falla.
+    """
+    payload = {
+        "model": model,
+        "input": textos
+    }
+    with cliente_ollama.hosts.reservar(EMBEDDING, model) as host:
+        response = cliente_ollama.post(f"{host}/api/embed", payload)
+    embeddings = response.json().get("embeddings") or []
+    if len(embeddings) != len(textos):
+        raise ValueError(f"Ollama devolvió {len(embeddings)} embeddings para {len(textos)} textos")
+    return embeddings
+
+
+class DespachadorEmbeddings:
+    """
+    Agrupa las peticiones de embeddings que llegan dentro de una ventana corta (o hasta
+    max_lote) y las envía como una sola llamada a /api/embed; luego reparte cada vector
+    a su llamador mediante un Future.
+    """
+
+    def __init__(self, ventana_segundos, max_lote, enviar_lote, max_lotes_en_vuelo):
+        self.ventana_segundos = ventana_segundos
+        self.max_lote = max_lote
+        self._enviar_lote = enviar_lote
+        self._cola = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max_lotes_en_vuelo, thread_name_prefix="embed-lote")
+        self._hilo = None
+        self._lock = threading.Lock()
+        self.lotes_enviados = 0
+        self.textos_enviados = 0
+        self.lotes_fallidos = 0
+
+    def _iniciar(self):
+        with self._lock:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._bucle, name="despachador-embeddings", daemon=True)
+                self._hilo.start()
+
+    def enviar(self, modelo, texto):
+        """
+        Encola un texto y retorna un Future con su vector (None si la petición falla). El
+        deadline del llamador viaja con el texto, porque el lote se envía desde otro hilo.
+        """
+        self._iniciar()
+        futuro = Future()
+        self._cola.put((modelo, texto, futuro, deadline_actual()))
+        return futuro
+
+    def _bucle(self):
+        while True:
+            lote = [self._cola.get()]
+            limite = time.monotonic() + self.ventana_segundos
+            while len(lote) < self.max_lote:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(self._cola.get(timeout=restante))
+                except queue.Empty:
+                    break
+
+            por_modelo = defaultdict(list)
+            for modelo, texto, futuro, deadline in lote:
+                por_modelo[modelo].append((texto, futuro, deadline))
+            for modelo, items in por_modelo.items():
+                self._executor.submit(self._despachar, modelo, items)
+
+    def _despachar(self, modelo, items):
+        # Los llamadores cuyo presupuesto ya venció no esperan el vector: no se envían
+        ahora = time.monotonic()
+        vigentes = []
+        for texto, futuro, deadline in items:
+            if deadline is not None and deadline <= ahora:
+                futuro.set_exception(DeadlineExcedidoError("Presupuesto de tiempo agotado antes de enviar el lote"))
+            else:
+                vigentes.append((texto, futuro, deadline))
+        if not vigentes:
+            return
+
+        # El lote sirve mientras quede algún llamador esperando: se acota por el deadline más
+        # lejano, y no se acota si alguno no tiene deadline
+        deadlines = [deadline for _, _, deadline in vigentes]
+        presupuesto = nullcontext() if None in deadlines else con_deadline(max(deadlines) - ahora)
+
+        # Textos repetidos dentro del lote se envían una sola vez
+        textos = list(dict.fromkeys(texto for texto, _, _ in vigentes))
+        try:
+            with presupuesto:
+                embeddings = self._enviar_lote(textos, modelo)
+            vectores = dict(zip(textos, embeddings))
+        except Exception as e:
+            print(f"Error al enviar lote de embeddings a Ollama: {e}")
+            vectores = {}
+            with self._lock:
+                self.lotes_fallidos += 1
+
+        with self._lock:
+            self.lotes_enviados += 1
+            self.textos_enviados += len(textos)
+        for texto, futuro, _ in vigentes:
+            futuro.set_result(vectores.get(texto))
+
+    def estadisticas(self):
+        with self._lock:
+            lotes = self.lotes_enviados
+            return {
+                "habilitado": embedding_lote_habilitado,
+                "ventana_ms": self.ventana_segundos * 1000,
+                "max_lote": self.max_lote,
+                "lotes_enviados": lotes,
+                "lotes_fallidos": self.lotes_fallidos,
+                "textos_enviados": self.textos_enviados,
+                "promedio_por_lote": self.textos_enviados / lotes if lotes else 0.0,
+                "tasa_llenado": self.textos_enviados / (lotes * self.max_lote) if lotes else 0.0,
+                "en_cola": self._cola.qsize(),
+            }
+
+
+despachador_embeddings = DespachadorEmbeddings(
+    embedding_lote_ventana_ms / 1000, embedding_lote_max, embedding_backends_utils.embeber, ollama_max_concurrencia
+)
+
+
+def _payload_chat(messages, model, format, stream):
     payload = {
         "model": model,
         "messages": messages,
@@ -17,11 +371,25 @@ def call_ollama_chat_api(messages, model=deepseek_model_name, format=None, strea
     }
     if format:
         payload["format"] = format
+    return payload
+
+# --- Helper function para hacer las peticiones de chat ---
+def call_ollama_chat_api(messages, model=deepseek_model_name, format=None, stream=False):
+    """
+    Realiza una petición a la API de chat de Ollama.
+    """
+    payload = _payload_chat(messages, model, format, stream)
 
     try:
-        response = requests.post(f"{ollama_base_url}/api/chat", headers=headers, json=payload)
-        response.raise_for_status() # Lanza una excepción para errores HTTP
-        return response.json()
+        with medir_etapa("chat", model):
+            with cliente_ollama.hosts.reservar(CHAT, model) as host:
+                response = cliente_ollama.post(f"{host}/api/chat", payload)
+            data = response.json()
+        registrar_uso_ollama(model, data)
+        return data
+    except OllamaNoDisponibleError as e:
+        print(f"Ollama no disponible, se usa el resultado simulado: {e}")
+        return None
     except requests.exceptions.RequestException as e:
         print(f"Error al conectar con Ollama o en la petición: {e}")
         if hasattr(e, 'response') and e.response is not None:
@@ -32,42 +400,313 @@ def call_ollama_chat_api(messages, model=deepseek_model_name, format=None, strea
         print(f"Respuesta cruda: {response.text}") # Imprimir la respuesta cruda para depuración
         return None
 
+async def call_ollama_chat_api_async(messages, model=deepseek_model_name, format=None, stream=False):
+    """
+    Variante asíncrona de call_ollama_chat_api para endpoints async.
+    """
+    payload = _payload_chat(messages, model, format, stream)
+
+    try:
+        with medir_etapa("chat", model):
+            with cliente_ollama.hosts.reservar(CHAT, model) as host:
+                response = await cliente_ollama.apost(f"{host}/api/chat", payload)
+            data = response.json()
+        registrar_uso_ollama(model, data)
+        return data
+    except OllamaNoDisponibleError as e:
+        print(f"Ollama no disponible, se usa el resultado simulado: {e}")
+        return None
+    except httpx.HTTPStatusError as e:
+        print(f"Error en la petición a Ollama: {e}")
+        print(f"Detalles del error: {e.response.text}")
+        return None
+    except httpx.HTTPError as e:
+        print(f"Error al conectar con Ollama o en la petición: {e}")
+        return None
+    except json.JSONDecodeError as e:
+        print(f"Error al parsear el JSON de la respuesta de Ollama: {e}")
+        print(f"Respuesta cruda: {response.text}")
+        return None
+
+class FiltroThink:
+    """
+    Elimina los bloques <think>...</think> (razonamiento de deepseek-r1) de un texto que llega
+    por partes. Retiene el final de cada parte si podría ser el inicio de una etiqueta partida.
+    """
+    APERTURA = "<think>"
+    CIERRE = "</think>"
+
+    def __init__(self):
+        self._buffer = ""
+        self._dentro = False
+
+    @staticmethod
+    def _prefijo_pendiente(texto, etiqueta):
+        for largo in range(min(len(texto), len(etiqueta) - 1), 0, -1):
+            if texto.endswith(etiqueta[:largo]):
+                return largo
+        return 0
+
+    def procesar(self, texto):
+        """
+        Agrega una parte del texto y retorna lo que ya se puede mostrar.
+        """
+        self._buffer += texto
+        visible = []
+        while True:
+            etiqueta = self.CIERRE if self._dentro else self.APERTURA
+            posicion = self._buffer.find(etiqueta)
+            if posicion != -1:
+                if not self._dentro:
+                    visible.append(self._buffer[:posicion])
+                self._buffer = self._buffer[posicion + len(etiqueta):]
+                self._dentro = not self._dentro
+                continue
+
+            corte = len(self._buffer) - self._prefijo_pendiente(self._buffer, etiqueta)
+            if not self._dentro:
+                visible.append(self._buffer[:corte])
+            self._buffer = self._buffer[corte:]
+            return "".join(visible)
+
+    def finalizar(self):
+        """
+        Retorna el texto retenido al terminar el stream (nada si quedó un <think> sin cerrar).
+        """
+        resto = "" if self._dentro else self._buffer
+        self._buffer = ""
+        return resto
+
+
+async def call_ollama_chat_stream_async(messages, model=deepseek_model_name, format=None):
+    """
+    Chat en streaming: genera el contenido a medida que Ollama lo produce, sin los bloques <think>.
+    Lanza httpx.HTTPError si falla la conexión y ValueError si Ollama reporta un error.
+    """
+    payload = _payload_chat(messages, model, format, True)
+    filtro = FiltroThink()
+    inicio = time.perf_counter()
+    primer_texto = True
+    with medir_etapa("chat_stream", model), cliente_ollama.hosts.reservar(CHAT, model) as host:
+        # aclosing: al salir del bucle (break o excepción) el cupo del host y la conexión se liberan
+        # en ese momento, no cuando el recolector finalice el generador
+        async with aclosing(cliente_ollama.astream(f"{host}/api/chat", payload)) as lineas:
+            async for linea in lineas:
+                parte = json.loads(linea)
+                if parte.get("error"):
+                    raise ValueError(f"Error de Ollama: {parte['error']}")
+                texto = filtro.procesar((parte.get("message") or {}).get("content", ""))
+                if texto:
+                    if primer_texto:
+                        # Tiempo hasta el primer texto visible (incluye el razonamiento <think> descartado)
+                        observar_etapa("chat_primer_texto", time.perf_counter() - inicio, modelo=model)
+                        primer_texto = False
+                    yield texto
+                if parte.get("done"):
+                    registrar_uso_ollama(model, parte)
+                    break
+    resto = filtro.finalizar()
+    if resto:
+        yield resto
+
 # --- Helper function para hacer las peticiones de embeddings ---
-def call_ollama_embeddings_api(prompt_text, model="nomic-embed-text"):
+def _embeber_local(prompt_text, model):
     """
-    Realiza una petición a la API de embeddings de Ollama.
+    Embedding de un texto con un backend distinto de Ollama (sin micro-batching).
     """
-    headers = {'Content-Type': 'application/json'}
+    try:
+        return {"embedding": embedding_backends_utils.embeber([prompt_text], model)[0]}
+    except Exception as e:
+        print(f"Error al generar el embedding con el modelo {model}: {e}")
+        return None
+
+def _es_modelo_ollama(model):
+    backend, _ = embedding_backends_utils.resolver_backend(model)
+    return backend.nombre == embedding_backends_utils.OllamaEmbeddingBackend.nombre
+
+def call_ollama_embeddings_api(prompt_text, model=embedding_model_name):
+    """
+    Realiza una petición a la API de embeddings de Ollama (o al backend configurado para el modelo).
+    Las respuestas se guardan en cache por (modelo, hash del texto).
+    """
+    cached = embedding_cache.obtener(model, prompt_text)
+    if cached is not None:
+        return cached
+
+    if embedding_lote_habilitado:
+        # Se agrupa con otras peticiones concurrentes en una sola llamada a /api/embed
+        try:
+            vector = despachador_embeddings.enviar(model, prompt_text).result(timeout=tiempo_restante())
+        except (FuturoTimeoutError, DeadlineExcedidoError):
+            print("Se agotó el presupuesto de tiempo esperando el embedding")
+            return None
+        if vector is None:
+            return None
+        data = {"embedding": vector}
+        embedding_cache.guardar(model, prompt_text, data)
+        return data
+
+    if not _es_modelo_ollama(model):
+        data = _embeber_local(prompt_text, model)
+        if data is not None:
+            embedding_cache.guardar(model, prompt_text, data)
+        return data
+
     payload = {
         "model": model,
         "prompt": prompt_text
     }
     try:
-        response = requests.post(f"{ollama_base_url}/api/embeddings", headers=headers, json=payload)
-        response.raise_for_status()
-        return response.json()
+        with medir_etapa("embedding", model, backend="ollama", textos=1):
+            with cliente_ollama.hosts.reservar(EMBEDDING, model) as host:
+                response = cliente_ollama.post(f"{host}/api/embeddings", payload)
+            data = response.json()
+        if data.get("embedding"):
+            embedding_cache.guardar(model, prompt_text, data)
+        return data
+    except OllamaNoDisponibleError as e:
+        print(f"Ollama no disponible para embeddings: {e}")
+        return None
     except requests.exceptions.RequestException as e:
         print(f"Error al conectar con Ollama o en la petición de embeddings: {e}")
         if hasattr(e, 'response') and e.response is not None:
             print(f"Detalles del error: {e.response.text}")
         return None
 
-def call_ollama_comparation(cv_resumen, job_description, embedding_model="nomic-embed-text"):
+async def call_ollama_embeddings_api_async(prompt_text, model=embedding_model_name):
+    """
+    Variante asíncrona de call_ollama_embeddings_api (comparte el mismo cache).
+    """
+    cached = embedding_cache.obtener(model, prompt_text)
+    if cached is not None:
+        return cached
+
+    if embedding_lote_habilitado:
+        try:
+            vector = await asyncio.wait_for(
+                asyncio.wrap_future(despachador_embeddings.enviar(model, prompt_text)), tiempo_restante()
+            )
+        except (asyncio.TimeoutError, DeadlineExcedidoError):
+            print("Se agotó el presupuesto de tiempo esperando el embedding")
+            return None
+        if vector is None:
+            return None
+        data = {"embedding": vector}
+        embedding_cache.guardar(model, prompt_text, data)
+        return data
+
+    if not _es_modelo_ollama(model):
+        data = await asyncio.to_thread(_embeber_local, prompt_text, model)
+        if data is not None:
+            embedding_cache.guardar(model, prompt_text, data)
+        return data
+
+    payload = {
+        "model": model,
+        "prompt": prompt_text
+    }
+    try:
+        with medir_etapa("embedding", model, backend="ollama", textos=1):
+            with cliente_ollama.hosts.reservar(EMBEDDING, model) as host:
+                response = await cliente_ollama.apost(f"{host}/api/embeddings", payload)
+            data = response.json()
+        if data.get("embedding"):
+            embedding_cache.guardar(model, prompt_text, data)
+        return data
+    except OllamaNoDisponibleError as e:
+        print(f"Ollama no disponible para embeddings: {e}")
+        return None
+    except httpx.HTTPError as e:
+        print(f"Error al conectar con Ollama o en la petición de embeddings: {e}")
+        if isinstance(e, httpx.HTTPStatusError):
+            print(f"Detalles del error: {e.response.text}")
+        return None
+
+def call_ollama_embeddings_lote(textos, model=embedding_model_name):
+    """
+    Obtiene los embeddings de varios textos. Los que no están en cache se envían
+    en una sola petición a /api/embed (entrada múltiple) o al backend local del modelo.
+    Retorna una lista de vectores en el mismo orden; None si no se pudo obtener.
+    """
+    vectores = [None] * len(textos)
+    pendientes = []
+    for i, texto in enumerate(textos):
+        cached = embedding_cache.obtener(model, texto)
+        if cached is not None:
+            vectores[i] = cached["embedding"]
+        else:
+            pendientes.append(i)
+
+    if not pendientes:
+        return vectores
+
+    try:
+        embeddings = embedding_backends_utils.embeber([textos[i] for i in pendientes], model)
+    except Exception as e:
+        print(f"Error al conectar con Ollama o en la petición de embeddings por lote: {e}")
+        if hasattr(e, 'response') and e.response is not None:
+            print(f"Detalles del error: {e.response.text}")
+        return vectores
+
+    for i, embedding in zip(pendientes, embeddings):
+        vectores[i] = embedding
+        embedding_cache.guardar(model, textos[i], {"embedding": embedding})
+    return vectores
+
+def calcular_similitud_coseno(vec_a, vec_b):
+    """
+    Calcula la similitud coseno entre dos vectores.
+    """
+    from sklearn.metrics.pairwise import cosine_similarity
+    import numpy as np
+
+    vec_a = np.array(vec_a).reshape(1, -1)
+    vec_b = np.array(vec_b).reshape(1, -1)
+    return cosine_similarity(vec_a, vec_b)[0][0]
+
+def calcular_similitudes_coseno(vectores, vec_ref):
+    """
+    Similitud coseno de cada fila de `vectores` contra `vec_ref` en una sola operación matricial.
+    """
+    import numpy as np
+
+    matriz = np.asarray(vectores, dtype=np.float32)
+    ref = np.asarray(vec_ref, dtype=np.float32)
+    normas = np.linalg.norm(matriz, axis=1) * np.linalg.norm(ref)
+    normas[normas == 0] = 1.0
+    return (matriz @ ref) / normas
+
+def call_ollama_comparation(cv_resumen, job_description=None, embedding_model=embedding_model_name, job_vector=None):
     """
     Genera embeddings para el CV y la descripción del puesto y calcula la similitud coseno.
+    Si se pasa job_vector (embedding ya almacenado de la oferta), no se vuelve a calcular.
     """
-    cv_embedding = call_ollama_embeddings_api(cv_resumen, model=embedding_model)
-    job_embedding = call_ollama_embeddings_api(job_description, model=embedding_model)
+    if job_vector is None and job_description is not None:
+        # CV y puesto en una sola llamada al backend
+        cv_vector, job_vector = call_ollama_embeddings_lote([cv_resumen, job_description], model=embedding_model)
+    else:
+        cv_embedding = call_ollama_embeddings_api(cv_resumen, model=embedding_model)
+        cv_vector = cv_embedding['embedding'] if cv_embedding else None
+
+    if cv_vector is not None and job_vector is not None:
+        return calcular_similitud_coseno(cv_vector, job_vector)
+    else:
+        return None
 
-    if cv_embedding and job_embedding:
-        from sklearn.metrics.pairwise import cosine_similarity
-        import numpy as np
+async def call_ollama_comparation_async(cv_resumen, job_description=None, embedding_model=embedding_model_name, job_vector=None):
+    """
+    Variante asíncrona de call_ollama_comparation: los embeddings del CV y del puesto se piden en paralelo.
+    """
+    tareas = [call_ollama_embeddings_api_async(cv_resumen, model=embedding_model)]
+    if job_vector is None and job_description is not None:
+        tareas.append(call_ollama_embeddings_api_async(job_description, model=embedding_model))
+    cv_embedding, *job_embedding = await asyncio.gather(*tareas)
 
-        vec_cv = np.array(cv_embedding['embedding']).reshape(1, -1)
-        vec_job = np.array(job_embedding['embedding']).reshape(1, -1)
+    if job_embedding:
+        job_vector = job_embedding[0]['embedding'] if job_embedding[0] else None
 
-        similarity = cosine_similarity(vec_cv, vec_job)
-        return similarity[0][0]
+    if cv_embedding and job_vector is not None:
+        return calcular_similitud_coseno(cv_embedding['embedding'], job_vector)
     else:
         return None
 
@@ -0,0 +1,63 @@
+from os import getenv
+from typing import Optional
+
+from fastapi import HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import load_only
+
+PAGINA_TAMANO_DEFECTO = int(getenv("PAGINA_TAMANO_DEFECTO", "100"))
+PAGINA_TAMANO_MAXIMO = int(getenv("PAGINA_TAMANO_MAXIMO", "500"))
+
+# Cabecera con el cursor de la página siguiente (ausente en la última página)
+CABECERA_CURSOR = "X-Siguiente-Cursor"
+
+
+class Paginacion:
+    """
+    Dependencia con los parámetros de paginación por cursor (keyset) de los listados.
+    """
+
+    def __init__(
+        self,
+        cursor: Optional[int] = Query(None, ge=0, description="Id del último elemento de la página anterior"),
+        limite: int = Query(PAGINA_TAMANO_DEFECTO, ge=1, le=PAGINA_TAMANO_MAXIMO),
+        campos: Optional[str] = Query(None, description="Campos a retornar separados por coma, p. ej. id,nombre")
+    ):
+        self.cursor = cursor
+        self.limite = limite
+        self.campos = [campo.strip() for campo in campos.split(",") if campo.strip()] if campos else None
+
+
+def paginar(consulta, modelo, paginacion, response, esquema):
+    """
+    Aplica keyset pagination por id (WHERE id > cursor ORDER BY id LIMIT n): el costo no crece
+    con el número de página, a diferencia de OFFSET. El cursor siguiente va en la cabecera
+    X-Siguiente-Cursor, así la respuesta sigue siendo una lista.
+
+    Con `campos` solo se cargan esas columnas (load_only) y se retorna una lista de dicts con
+    esos campos; los campos deben existir en el esquema de respuesta.
+    """
+    if paginacion.campos:
+        invalidos = [campo for campo in paginacion.campos if campo not in esquema.model_fields]
+        if invalidos:
+            raise HTTPException(status_code=400, detail=f"Campos no válidos: {', '.join(invalidos)}")
+        columnas = {"id", *paginacion.campos}
+        consulta = consulta.options(load_only(*[getattr(modelo, campo) for campo in columnas]))
+
+    if paginacion.cursor is not None:
+        consulta = consulta.filter(modelo.id > paginacion.cursor)
+
+    # Se pide un elemento extra para saber si hay una página siguiente
+    filas = consulta.order_by(modelo.id).limit(paginacion.limite + 1).all()
+    cabeceras = {}
+    if len(filas) > paginacion.limite:
+        filas = filas[:paginacion.limite]
+        cabeceras[CABECERA_CURSOR] = str(filas[-1].id)
+
+    if paginacion.campos:
+        contenido = [{campo: getattr(fila, campo) for campo in paginacion.campos} for fila in filas]
+        return JSONResponse(content=jsonable_encoder(contenido), headers=cabeceras)
+
+    response.headers.update(cabeceras)
+    return filas
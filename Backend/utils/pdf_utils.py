@@ -1,5 +1,12 @@
 import fitz
+import multiprocessing
 import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Pool de procesos para extraer PDFs en paralelo (se crea al primer uso)
+_pool_procesos = None
+_lock_pool = threading.Lock()
 
 def extraer_texto_desde_pdf(pdf_path):
     """
@@ -9,13 +16,15 @@ def extraer_texto_desde_pdf(pdf_path):
         # Abrir el archivo PDF
         pdf_document = fitz.open(pdf_path)
         
-        # Variable para almacenar el texto extraído
-        text = ""
+        # Texto de cada página; se unen con un salto de página ("\f") para que la compactación
+        # de prompts reconozca los encabezados y pies repetidos
+        paginas = []
         
         # Iterar a través de todas las páginas y extraer el texto
         for page_num in range(pdf_document.page_count):
             page = pdf_document.load_page(page_num)  # Cargar página
-            text += page.get_text("text")  # Extraer texto de la página
+            paginas.append(page.get_text("text"))  # Extraer texto de la página
+        text = "\f".join(paginas)
         
         # Cerrar el documento
         pdf_document.close()
@@ -26,6 +35,39 @@ def extraer_texto_desde_pdf(pdf_path):
         print(f"Error al extraer el texto del PDF: {e}")
         return None
 
+def _obtener_pool_procesos():
+    global _pool_procesos
+    # Peticiones /lote simultáneas: el lock evita crear dos pools
+    with _lock_pool:
+        if _pool_procesos is None:
+            # "spawn" evita heredar hilos y conexiones abiertas del proceso de la API
+            _pool_procesos = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool_procesos
+
+def extraer_textos_en_paralelo(pdf_paths):
+    """
+    Extrae el texto de varios PDFs en un pool de procesos (uno por núcleo).
+    Retorna una lista en el mismo orden; None para los archivos que fallaron.
+    """
+    if not pdf_paths:
+        return []
+    if len(pdf_paths) == 1:
+        return [extraer_texto_desde_pdf(pdf_paths[0])]
+
+    pool = _obtener_pool_procesos()
+    chunksize = max(1, len(pdf_paths) // ((os.cpu_count() or 1) * 4))
+    return list(pool.map(extraer_texto_desde_pdf, pdf_paths, chunksize=chunksize))
+
+def cerrar_pool_procesos():
+    global _pool_procesos
+    with _lock_pool:
+        if _pool_procesos is not None:
+            _pool_procesos.shutdown(wait=False, cancel_futures=True)
+            _pool_procesos = None
+
 def save_text_to_txt(text, pdf_path):
     """
     Guarda el texto extraído de un archivo PDF en un archivo .txt en la misma carpeta.
@@ -0,0 +1,129 @@
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from db.models import Candidato, CVDocumento, CVEmbedding, CVEmbeddingFragmento, Postulacion, RankingPostulacion
+from utils import ollama_utils
+from utils.embedding_utils import guardar_embedding_cv
+
+
+def registrar_postulacion(db, candidato_id, oferta_id, nombre_archivo, ruta_archivo, texto_extraido,
+                          hash_contenido, score, score_semantico, observaciones,
+                          embedding_vector=None, fragmentos=None, modelo=ollama_utils.embedding_model_name):
+    """
+    Unidad de trabajo de una postulación procesada: construye juntos el CVDocumento, la
+    Postulacion con su RankingPostulacion y el CVEmbedding, y hace un solo flush para obtener
+    los ids. No hace commit: el llamador confirma todo en una transacción (o hace rollback
+    y no queda una postulación a medio guardar).
+    Retorna (documento, postulacion).
+    """
+    ahora = datetime.utcnow()
+
+    # Primero el embedding: su búsqueda por candidato no debe disparar un autoflush intermedio
+    if embedding_vector:
+        guardar_embedding_cv(db, candidato_id, embedding_vector, modelo, hash_contenido, fragmentos)
+
+    documento = CVDocumento(
+        candidato_id=candidato_id,
+        nombre_archivo=nombre_archivo,
+        ruta_archivo=ruta_archivo,
+        texto_extraido=texto_extraido,
+        hash_contenido=hash_contenido,
+        creado_en=ahora
+    )
+    postulacion = Postulacion(
+        candidato_id=candidato_id,
+        oferta_id=oferta_id,
+        fecha_postulacion=ahora,
+        ranking=RankingPostulacion(
+            score=score,
+            score_semantico=score_semantico,
+            observaciones=observaciones
+        )
+    )
+    db.add_all([documento, postulacion])
+    db.flush()
+    return documento, postulacion
+
+
+def _insertar_con_ids(db, modelo, filas):
+    """
+    INSERT multi-fila con RETURNING id en el mismo orden de `filas`.
+    """
+    if not filas:
+        return []
+    resultado = db.execute(insert(modelo).returning(modelo.id, sort_by_parameter_order=True), filas)
+    return list(resultado.scalars())
+
+
+def insertar_lote_postulaciones(db, oferta_id, filas, modelo=ollama_utils.embedding_model_name):
+    """
+    Inserta en bloque (INSERT multi-fila, una sentencia por tabla) los candidatos, documentos,
+    postulaciones, rankings y embeddings de una carga masiva. Cada fila es un dict con:
+    nombre_completo, nombre_archivo, ruta_archivo, texto, hash_contenido, score (0-1 o None),
+    observaciones, embedding (vector o None) y fragmentos.
+    No hace commit. Retorna [(candidato_id, postulacion_id)] en el orden de `filas`.
+    """
+    # insert() con una lista vacía de parámetros ejecuta INSERT ... DEFAULT VALUES: una fila vacía
+    if not filas:
+        return []
+    ahora = datetime.utcnow()
+
+    candidato_ids = _insertar_con_ids(db, Candidato, [
+        {"nombre_completo": fila["nombre_completo"], "creado_en": ahora} for fila in filas
+    ])
+
+    db.execute(insert(CVDocumento), [
+        {
+            "candidato_id": candidato_id,
+            "nombre_archivo": fila["nombre_archivo"],
+            "ruta_archivo": fila["ruta_archivo"],
+            "texto_extraido": fila["texto"],
+            "hash_contenido": fila["hash_contenido"],
+            "creado_en": ahora
+        }
+        for candidato_id, fila in zip(candidato_ids, filas)
+    ])
+
+    postulacion_ids = _insertar_con_ids(db, Postulacion, [
+        {"candidato_id": candidato_id, "oferta_id": oferta_id, "fecha_postulacion": ahora}
+        for candidato_id in candidato_ids
+    ])
+
+    db.execute(insert(RankingPostulacion), [
+        {
+            "postulacion_id": postulacion_id,
+            "score": fila["score"] * 100 if fila["score"] is not None else None,
+            "score_semantico": fila["score"],
+            "observaciones": fila["observaciones"]
+        }
+        for postulacion_id, fila in zip(postulacion_ids, filas)
+    ])
+
+    con_embedding = [(candidato_id, fila) for candidato_id, fila in zip(candidato_ids, filas) if fila["embedding"]]
+    embedding_ids = _insertar_con_ids(db, CVEmbedding, [
+        {
+            "candidato_id": candidato_id,
+            "embedding": fila["embedding"],
+            "modelo": modelo,
+            "hash_contenido": fila["hash_contenido"],
+            "fecha_generacion": ahora
+        }
+        for candidato_id, fila in con_embedding
+    ])
+
+    fragmentos = [
+        {
+            "cv_embedding_id": embedding_id,
+            "indice": fragmento["indice"],
+            "inicio": fragmento["inicio"],
+            "fin": fragmento["fin"],
+            "embedding": fragmento["embedding"]
+        }
+        for embedding_id, (_, fila) in zip(embedding_ids, con_embedding)
+        for fragmento in fila["fragmentos"] or []
+    ]
+    if fragmentos:
+        db.execute(insert(CVEmbeddingFragmento), fragmentos)
+
+    return list(zip(candidato_ids, postulacion_ids))
@@ -0,0 +1,49 @@
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+def _cronometrar(funcion):
+    inicio = time.perf_counter()
+    try:
+        return funcion(), None, time.perf_counter() - inicio
+    except Exception as e:
+        return None, e, time.perf_counter() - inicio
+
+
+def ejecutar_etapas(etapas, deadline_segundos):
+    """
+    Ejecuta en paralelo etapas independientes (dict nombre -> función sin argumentos)
+    con un deadline común para toda la petición.
+
+    Retorna un dict nombre -> {"estado", "segundos", "resultado", "error"}, donde estado es
+    "ok", "error" o "timeout". Las etapas que no terminan a tiempo quedan con resultado None;
+    el llamador decide el fallback.
+    Cada etapa corre con una copia del contexto actual (contextvars), así hereda el deadline
+    de las llamadas a Ollama (con_deadline) del hilo que la lanza.
+    """
+    executor = ThreadPoolExecutor(max_workers=max(1, len(etapas)), thread_name_prefix="etapa")
+    inicio = time.perf_counter()
+    futuros = {
+        nombre: executor.submit(contextvars.copy_context().run, _cronometrar, funcion)
+        for nombre, funcion in etapas.items()
+    }
+
+    wait(futuros.values(), timeout=deadline_segundos)
+    transcurrido = time.perf_counter() - inicio
+
+    resultados = {}
+    for nombre, futuro in futuros.items():
+        if not futuro.done():
+            futuro.cancel()
+            resultados[nombre] = {"estado": "timeout", "segundos": transcurrido, "resultado": None, "error": None}
+            continue
+        resultado, error, segundos = futuro.result()
+        if error is not None:
+            resultados[nombre] = {"estado": "error", "segundos": segundos, "resultado": None, "error": str(error)}
+        else:
+            resultados[nombre] = {"estado": "ok", "segundos": segundos, "resultado": resultado, "error": None}
+
+    # No esperar a las etapas vencidas: sus llamadas HTTP terminan por su propio timeout
+    executor.shutdown(wait=False, cancel_futures=True)
+    return resultados
@@ -0,0 +1,233 @@
+import re
+import unicodedata
+
+# Cambia al modificar las reglas: forma parte de la versión del cache de extracciones
+VERSION_PREEXTRACCION = "1"
+
+ENCABEZADO = "encabezado"  # Texto antes de la primera sección reconocida (nombre y contacto)
+
+# Títulos de sección (normalizados: minúsculas y sin tildes) -> campo de la extracción
+TITULOS_SECCION = {
+    "resumen": (
+        "resumen", "perfil", "perfil profesional", "resumen profesional", "sobre mi", "acerca de mi",
+        "objetivo", "objetivo profesional", "extracto", "summary", "profile", "professional summary", "about me",
+    ),
+    "experiencia_laboral": (
+        "experiencia", "experiencia laboral", "experiencia profesional", "historial laboral", "trayectoria profesional",
+        "experience", "work experience", "professional experience", "employment history",
+    ),
+    "educacion": (
+        "educacion", "formacion", "formacion academica", "estudios", "estudios realizados", "education",
+        "academic background",
+    ),
+    "habilidades": (
+        "habilidades", "habilidades tecnicas", "competencias", "competencias tecnicas", "conocimientos",
+        "conocimientos tecnicos", "aptitudes", "herramientas", "tecnologias", "skills", "technical skills",
+    ),
+    # Secciones que no se extraen, pero cierran la anterior
+    "otros": (
+        "idiomas", "certificaciones", "certificados", "cursos", "referencias", "proyectos", "logros", "intereses",
+        "publicaciones", "voluntariado", "datos personales", "informacion personal", "contacto", "languages",
+        "certifications", "courses", "projects", "references", "achievements", "interests",
+    ),
+}
+_CAMPO_POR_TITULO = {titulo: campo for campo, titulos in TITULOS_SECCION.items() for titulo in titulos}
+# Primera palabra de títulos compuestos ("EXPERIENCIA ACADÉMICA", "SKILLS ADICIONALES"); solo se
+# aceptan en títulos en mayúsculas o terminados en ":" para no confundirlos con una frase del cuerpo
+_CAMPO_POR_PRIMERA_PALABRA = {
+    "perfil": "resumen", "resumen": "resumen",
+    "experiencia": "experiencia_laboral", "experiencias": "experiencia_laboral",
+    "educacion": "educacion", "formacion": "educacion", "estudios": "educacion",
+    "habilidades": "habilidades", "competencias": "habilidades", "conocimientos": "habilidades", "skills": "habilidades",
+}
+
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)*\.[a-zA-Z]{2,}")
+# Secuencia de dígitos con separadores habituales y prefijo internacional opcional
+_TELEFONO = re.compile(r"(?<![\w+])\+?\(?\d[\d\s().-]{5,18}\d(?!\w)")
+_ETIQUETA_TELEFONO = re.compile(r"\b(tel[eé]fono|tel|telf|cel|celular|m[oó]vil|whatsapp|phone|mobile)\b", re.IGNORECASE)
+_ANIO = re.compile(r"^(19|20)\d{2}$")
+_PALABRA_NOMBRE = re.compile(r"^[^\W\d_][^\W\d_'.-]*(?:['.-][^\W\d_]+)*\.?$")
+_PARTICULAS_NOMBRE = {"de", "del", "la", "las", "los", "y", "da", "do", "dos", "van", "von"}
+_NO_NOMBRE = {"curriculum", "curriculum vitae", "cv", "hoja de vida", "resume", "resumen curricular"}
+_SEPARADORES_HABILIDADES = re.compile(r"[,;|•·▪●\n]")
+
+
+def _normalizar_titulo(linea):
+    texto = unicodedata.normalize("NFKD", linea).encode("ascii", "ignore").decode("ascii")
+    texto = re.sub(r"^[\s\d.)*•·▪●-]+", "", texto)  # viñetas y numeración
+    return re.sub(r"\s+", " ", texto.strip().rstrip(":").strip()).lower()
+
+
+def _campo_de_titulo(linea):
+    linea = linea.strip()
+    if len(linea) > 40:
+        return None
+    titulo = _normalizar_titulo(linea)
+    if titulo in _CAMPO_POR_TITULO:
+        return _CAMPO_POR_TITULO[titulo]
+    palabras = titulo.split()
+    if palabras and len(palabras) <= 4 and (linea.isupper() or linea.endswith(":")):
+        return _CAMPO_POR_PRIMERA_PALABRA.get(palabras[0])
+    return None
+
+
+def dividir_por_titulos(texto_cv):
+    """
+    Bloques del CV en orden: [(campo, titulo, texto)], donde campo es el de TITULOS_SECCION
+    ("otros" para secciones no extraídas, ENCABEZADO para lo anterior al primer título), titulo es
+    el título normalizado y texto incluye la línea de título.
+    """
+    bloques = []
+    campo, titulo, lineas = ENCABEZADO, "", []
+    for linea in (texto_cv or "").splitlines():
+        nuevo = _campo_de_titulo(linea) if linea.strip() else None
+        if nuevo is None:
+            lineas.append(linea)
+            continue
+        if "\n".join(lineas).strip():
+            bloques.append((campo, titulo, "\n".join(lineas).strip()))
+        campo, titulo, lineas = nuevo, _normalizar_titulo(linea), [linea]
+    if "\n".join(lineas).strip():
+        bloques.append((campo, titulo, "\n".join(lineas).strip()))
+    return bloques
+
+
+def segmentar_secciones(texto_cv):
+    """
+    Divide el CV por sus títulos de sección. Retorna {campo: texto} con el encabezado (lo anterior
+    a la primera sección) y las secciones resumen, experiencia_laboral, educacion y habilidades que
+    aparezcan, cada una con su línea de título. Una sección repetida acumula su texto.
+    """
+    secciones = {}
+    for campo, _, texto in dividir_por_titulos(texto_cv):
+        if campo != "otros":
+            secciones[campo] = (secciones.get(campo, "") + "\n" + texto).strip()
+    return secciones
+
+
+def _cuerpo(seccion):
+    # Texto de la sección sin su línea de título
+    return seccion.split("\n", 1)[1].strip() if "\n" in seccion else ""
+
+
+def extraer_email(texto):
+    coincidencia = _EMAIL.search(texto or "")
+    return coincidencia.group(0).lower() if coincidencia else None
+
+
+def _es_telefono(candidato):
+    digitos = re.sub(r"\D", "", candidato)
+    if not 7 <= len(digitos) <= 15:
+        return False
+    # Rangos de fechas ("2018 - 2020") no son teléfonos
+    partes = re.findall(r"\d+", candidato)
+    return not all(_ANIO.match(parte) for parte in partes)
+
+
+def extraer_telefono(texto, encabezado):
+    """
+    Primer teléfono del encabezado o de una línea etiquetada (Teléfono:, Cel., Phone...).
+    No se busca en el resto del CV para no confundirlo con fechas o cifras.
+    """
+    lineas = [linea for linea in (texto or "").splitlines() if _ETIQUETA_TELEFONO.search(linea)]
+    for fuente in [encabezado or ""] + lineas:
+        for coincidencia in _TELEFONO.finditer(fuente):
+            candidato = coincidencia.group(0).strip(" .-")
+            if _es_telefono(candidato):
+                return re.sub(r"\s+", " ", candidato)
+    return None
+
+
+def extraer_nombre(encabezado):
+    """
+    Nombre del candidato: una de las primeras líneas del encabezado con 2 a 5 palabras solo de letras,
+    en mayúscula inicial (salvo partículas como "de" o "del").
+    """
+    revisadas = 0
+    for linea in (encabezado or "").splitlines():
+        linea = re.sub(r"^\s*(nombres?(\s+completo)?|name)\s*:\s*", "", linea.strip(), flags=re.IGNORECASE)
+        if not linea:
+            continue
+        revisadas += 1
+        if revisadas > 5:
+            break
+        palabras = linea.split()
+        if (
+            2 <= len(palabras) <= 5
+            and _normalizar_titulo(linea) not in _NO_NOMBRE
+            and all(_PALABRA_NOMBRE.match(palabra) for palabra in palabras)
+            and palabras[0][0].isupper()
+            and all(palabra[0].isupper() or palabra.lower() in _PARTICULAS_NOMBRE for palabra in palabras)
+        ):
+            return linea.title() if linea.isupper() else linea
+    return None
+
+
+def extraer_habilidades(seccion):
+    """
+    Lista de habilidades de la sección (separadas por comas, viñetas o líneas). "Lenguajes: Python, Go"
+    aporta Python y Go. Descarta frases largas, que no son una habilidad puntual.
+    """
+    habilidades, vistas = [], set()
+    for linea in _cuerpo(seccion).splitlines():
+        linea = linea.split(":", 1)[1] if ":" in linea else linea
+        for parte in _SEPARADORES_HABILIDADES.split(linea):
+            # Viñetas (incluidos los glifos de uso privado que deja el PDF), sin perder ".NET" o "C#"
+            habilidad = re.sub(r"^[^\w.#+]+", "", parte).rstrip(" .")
+            if habilidad and len(habilidad) <= 40 and len(habilidad.split()) <= 5 and habilidad.lower() not in vistas:
+                vistas.add(habilidad.lower())
+                habilidades.append(habilidad)
+    return habilidades
+
+
+def _resumen(seccion, maximo=600):
+    texto = re.sub(r"\s+", " ", _cuerpo(seccion))
+    if len(texto) <= maximo:
+        return texto or None
+    return texto[:maximo].rsplit(" ", 1)[0]
+
+
+def preextraer_cv(texto_cv):
+    """
+    Extracción determinista (sin IA) de los campos que se reconocen por patrones.
+    Retorna {"campos": {campo: valor} solo con lo encontrado, "secciones": segmentar_secciones(...)}.
+    experiencia_laboral y educacion (listas de objetos) quedan para el LLM.
+    """
+    secciones = segmentar_secciones(texto_cv)
+    encabezado = secciones.get(ENCABEZADO, "")
+    candidatos = {
+        "nombre_completo": extraer_nombre(encabezado),
+        "email": extraer_email(encabezado) or extraer_email(texto_cv),
+        "telefono": extraer_telefono(texto_cv, encabezado),
+        "resumen": _resumen(secciones["resumen"]) if "resumen" in secciones else None,
+        "habilidades": extraer_habilidades(secciones["habilidades"]) if "habilidades" in secciones else None,
+    }
+    return {"campos": {campo: valor for campo, valor in candidatos.items() if valor}, "secciones": secciones}
+
+
+# Secciones del CV que bastan para cada campo pendiente, en orden de preferencia (sin sección de
+# perfil, el resumen suele estar en el encabezado)
+SECCIONES_POR_CAMPO = {
+    "nombre_completo": (ENCABEZADO,),
+    "email": (ENCABEZADO,),
+    "telefono": (ENCABEZADO,),
+    "resumen": ("resumen", ENCABEZADO),
+    "experiencia_laboral": ("experiencia_laboral",),
+    "educacion": ("educacion",),
+    "habilidades": ("habilidades",),
+}
+
+
+def texto_para_campos(texto_cv, secciones, campos):
+    """
+    Texto a enviar al LLM para extraer `campos`: solo sus secciones, en el orden del CV. Si a algún
+    campo no le corresponde ninguna sección encontrada (p. ej. un CV sin títulos reconocibles) se
+    envía el CV completo.
+    """
+    necesarias = set()
+    for campo in campos:
+        seccion = next((seccion for seccion in SECCIONES_POR_CAMPO[campo] if secciones.get(seccion)), None)
+        if seccion is None:
+            return texto_cv
+        necesarias.add(seccion)
+    return "\n\n".join(texto for seccion, texto in secciones.items() if seccion in necesarias)
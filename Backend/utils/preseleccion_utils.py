@@ -0,0 +1,75 @@
+import json
+import logging
+import math
+from os import getenv
+
+from utils import ollama_utils
+from utils.compactacion_utils import compactar_para_prompt
+from utils.metricas_utils import registrar_fallback
+
+logger = logging.getLogger(__name__)
+
+# Cortes por defecto de cada etapa de la preselección (se pueden cambiar por petición)
+preseleccion_max_lexico = int(getenv("PRESELECCION_MAX_LEXICO", "200"))  # Pasan del filtro BM25
+preseleccion_min_lexico = float(getenv("PRESELECCION_MIN_LEXICO", "0"))  # Puntaje BM25 mínimo para pasar
+preseleccion_max_embedding = int(getenv("PRESELECCION_MAX_EMBEDDING", "50"))  # Pasan del rerank por embeddings
+preseleccion_top_k_ia = int(getenv("PRESELECCION_TOP_K_IA", "10"))  # Evaluados por el LLM
+preseleccion_deadline_segundos = float(getenv("PRESELECCION_DEADLINE_SEGUNDOS", "300"))
+
+PROMPT_PRESELECCION_SISTEMA = "Eres un reclutador técnico que evalúa CVs frente a los requisitos de una oferta laboral. Responde solo con el objeto JSON."
+PROMPT_PRESELECCION_USUARIO = """
+Evalúa qué tan adecuado es el candidato para la oferta y devuelve un JSON con:
+- "puntaje": número de 0 a 100 (100 = cumple todos los requisitos con experiencia sólida).
+- "justificacion": una o dos oraciones con los requisitos que cumple y los que le faltan.
+
+Oferta: {titulo}
+Requisitos: {requisitos}
+Descripción: {descripcion}
+
+CV:
+{texto_cv}
+"""
+
+
+def consulta_oferta(oferta):
+    """
+    Texto contra el que se filtra por palabras clave: los requisitos de la oferta (o su título y
+    descripción si no tiene requisitos).
+    """
+    return oferta.requisitos or f"{oferta.titulo or ''} {oferta.descripcion or ''}"
+
+
+def evaluar_con_ia(oferta, texto_cv):
+    """
+    Puntaje (0-100) y justificación del LLM para un CV frente a la oferta.
+    Retorna (None, None) si la IA no responde o su respuesta no es válida.
+    """
+    mensajes = [
+        {"role": "system", "content": PROMPT_PRESELECCION_SISTEMA},
+        {"role": "user", "content": PROMPT_PRESELECCION_USUARIO.format(
+            titulo=oferta.titulo or "",
+            requisitos=oferta.requisitos or "",
+            descripcion=oferta.descripcion or "",
+            texto_cv=compactar_para_prompt(texto_cv, "preseleccion")
+        )}
+    ]
+    response_data = ollama_utils.call_ollama_chat_api(mensajes, format="json")
+    if not response_data:
+        registrar_fallback("preseleccion")
+        return None, None
+    try:
+        evaluacion = json.loads(response_data["message"]["content"])
+        puntaje = evaluacion["puntaje"]
+        # El JSON viene del LLM: true, "alto" o NaN no son un puntaje
+        if isinstance(puntaje, bool):
+            raise ValueError(f"puntaje no numérico: {puntaje!r}")
+        puntaje = float(puntaje)
+        if not math.isfinite(puntaje):
+            raise ValueError(f"puntaje no finito: {puntaje!r}")
+        puntaje = min(100.0, max(0.0, puntaje))
+    except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+        logger.error(f"Respuesta de preselección inválida: {e}")
+        registrar_fallback("preseleccion")
+        return None, None
+    justificacion = evaluacion.get("justificacion")
+    return puntaje, None if justificacion is None else str(justificacion)
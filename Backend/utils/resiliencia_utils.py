@@ -0,0 +1,228 @@
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from os import getenv
+
+from utils.metricas_utils import circuito_estado, circuito_rechazos
+
+logger = logging.getLogger(__name__)
+
+# Circuit breaker por host de Ollama
+circuito_max_fallos = int(getenv("OLLAMA_CIRCUITO_MAX_FALLOS", "5"))  # Fallos (o llamadas lentas) consecutivos para abrir
+circuito_lento_segundos = float(getenv("OLLAMA_CIRCUITO_LENTO_SEGUNDOS", "120"))  # Una llamada más lenta cuenta como fallo
+circuito_espera_segundos = float(getenv("OLLAMA_CIRCUITO_ESPERA_SEGUNDOS", "30"))  # Tiempo abierto antes de sondear
+circuito_sondeos = int(getenv("OLLAMA_CIRCUITO_SONDEOS", "1"))  # Llamadas de prueba simultáneas en semiabierto
+
+CERRADO = "cerrado"
+ABIERTO = "abierto"
+SEMIABIERTO = "semiabierto"
+_VALOR_ESTADO = {CERRADO: 0, SEMIABIERTO: 1, ABIERTO: 2}
+
+# Instante (time.monotonic) en que vence el presupuesto de la petición en curso
+_deadline = contextvars.ContextVar("deadline_ollama", default=None)
+
+
+class OllamaNoDisponibleError(Exception):
+    """
+    No se llamó a Ollama: el llamador debe pasar directo a su resultado simulado.
+    """
+    sin_llamada = True  # medir_etapa no cuenta estos rechazos como latencia de la etapa
+
+
+class CircuitoAbiertoError(OllamaNoDisponibleError):
+    pass
+
+
+class DeadlineExcedidoError(OllamaNoDisponibleError):
+    pass
+
+
+class SinCupoError(OllamaNoDisponibleError):
+    """
+    No hubo un cupo libre del host a tiempo (límite de concurrencia de la propia app): no es un fallo del host.
+    """
+
+
+@contextmanager
+def con_deadline(segundos):
+    """
+    Fija el presupuesto de tiempo de las llamadas a Ollama dentro del bloque. Si ya hay un
+    deadline más cercano (bloque anidado), se conserva ese. Los hilos que se lancen dentro deben
+    copiar el contexto (contextvars.copy_context) para heredarlo.
+    """
+    nuevo = time.monotonic() + segundos
+    actual = _deadline.get()
+    token = _deadline.set(nuevo if actual is None else min(actual, nuevo))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def tiempo_restante():
+    """
+    Segundos que quedan del presupuesto actual (puede ser negativo), o None si no hay deadline.
+    """
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def deadline_actual():
+    """
+    Instante (time.monotonic) en que vence el presupuesto actual, o None si no hay deadline.
+    Sirve para trasladar el deadline a otro hilo, que no hereda las contextvars.
+    """
+    return _deadline.get()
+
+
+def timeout_con_deadline(timeout):
+    """
+    Timeout de una llamada: el menor entre el propio y lo que queda del presupuesto.
+    Lanza DeadlineExcedidoError si el presupuesto ya se agotó.
+    """
+    restante = tiempo_restante()
+    if restante is None:
+        return timeout
+    if restante <= 0:
+        raise DeadlineExcedidoError("Se agotó el presupuesto de tiempo de la petición")
+    return min(timeout, restante)
+
+
+class _Cronometro:
+    def __init__(self):
+        self.iniciar()
+
+    def iniciar(self):
+        self.inicio = time.perf_counter()
+
+    def segundos(self):
+        return time.perf_counter() - self.inicio
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker de un host:
+    - cerrado: las llamadas pasan; max_fallos fallos o llamadas lentas seguidos lo abren.
+    - abierto: las llamadas fallan al instante (CircuitoAbiertoError) durante espera_segundos.
+    - semiabierto: deja pasar hasta `sondeos` llamadas de prueba; un éxito lo cierra y un fallo lo
+      vuelve a abrir.
+    """
+
+    def __init__(self, nombre, max_fallos, lento_segundos, espera_segundos, sondeos):
+        self.nombre = nombre
+        self.max_fallos = max_fallos
+        self.lento_segundos = lento_segundos
+        self.espera_segundos = espera_segundos
+        self.sondeos = sondeos
+        self.estado = CERRADO
+        self.fallos_consecutivos = 0
+        self.rechazos = 0
+        self.aperturas = 0
+        self._abierto_hasta = 0.0
+        self._sondeos_en_vuelo = 0
+        self._lock = threading.Lock()
+        circuito_estado.labels(nombre).set(_VALOR_ESTADO[CERRADO])
+
+    def _cambiar(self, estado):
+        if estado != self.estado:
+            logger.warning(f"Circuito de Ollama {self.nombre}: {self.estado} -> {estado}")
+            self.estado = estado
+            circuito_estado.labels(self.nombre).set(_VALOR_ESTADO[estado])
+
+    def _abrir(self):
+        self._abierto_hasta = time.monotonic() + self.espera_segundos
+        self.aperturas += 1
+        self._cambiar(ABIERTO)
+
+    def permitir(self):
+        """
+        Reserva el paso de una llamada; lanza CircuitoAbiertoError si no corresponde llamar.
+        Retorna True si la llamada es un sondeo (semiabierto).
+        """
+        with self._lock:
+            if self.estado == ABIERTO and time.monotonic() >= self._abierto_hasta:
+                self._cambiar(SEMIABIERTO)
+            if self.estado == CERRADO:
+                return False
+            if self.estado == SEMIABIERTO and self._sondeos_en_vuelo < self.sondeos:
+                self._sondeos_en_vuelo += 1
+                return True
+            self.rechazos += 1
+        circuito_rechazos.labels(self.nombre).inc()
+        raise CircuitoAbiertoError(f"Circuito abierto para {self.nombre}")
+
+    def disponible(self):
+        """
+        Si una llamada pasaría ahora (sin reservarla): lo usa el balanceo para evitar hosts con el
+        circuito abierto.
+        """
+        with self._lock:
+            if self.estado == CERRADO:
+                return True
+            if self.estado == ABIERTO:
+                return time.monotonic() >= self._abierto_hasta
+            return self._sondeos_en_vuelo < self.sondeos
+
+    def registrar(self, exito, segundos, sondeo):
+        """
+        Resultado de una llamada permitida. Una llamada exitosa pero más lenta que lento_segundos
+        cuenta como fallo.
+        """
+        with self._lock:
+            if sondeo:
+                self._sondeos_en_vuelo -= 1
+            if exito and segundos <= self.lento_segundos:
+                self.fallos_consecutivos = 0
+                if self.estado == SEMIABIERTO:
+                    self._cambiar(CERRADO)
+                return
+
+            self.fallos_consecutivos += 1
+            if self.estado == SEMIABIERTO or (
+                self.estado == CERRADO and self.fallos_consecutivos >= self.max_fallos
+            ):
+                self._abrir()
+
+    def liberar_sondeo(self):
+        """
+        El sondeo terminó sin resultado atribuible al host (p. ej. se agotó el deadline antes de llamar).
+        """
+        with self._lock:
+            self._sondeos_en_vuelo -= 1
+
+    @contextmanager
+    def llamada(self, es_fallo):
+        """
+        Envuelve una llamada: la rechaza si el circuito está abierto y registra su resultado.
+        `es_fallo(excepcion)` decide si una excepción es atribuible al host.
+        Retorna un cronómetro: si antes de llamar al host hay una espera propia de la app (cupo
+        del semáforo), el llamador invoca `iniciar()` al terminarla para que no cuente como lentitud.
+        """
+        sondeo = self.permitir()
+        cronometro = _Cronometro()
+        try:
+            yield cronometro
+        except (DeadlineExcedidoError, SinCupoError):
+            if sondeo:
+                self.liberar_sondeo()
+            raise
+        except BaseException as e:
+            if es_fallo(e):
+                self.registrar(False, cronometro.segundos(), sondeo)
+            elif sondeo:
+                self.liberar_sondeo()
+            raise
+        else:
+            self.registrar(True, cronometro.segundos(), sondeo)
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "estado": self.estado,
+                "fallos_consecutivos": self.fallos_consecutivos,
+                "aperturas": self.aperturas,
+                "rechazos": self.rechazos,
+                "reintento_en_segundos": max(0.0, self._abierto_hasta - time.monotonic()) if self.estado == ABIERTO else None,
+            }
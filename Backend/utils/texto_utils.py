@@ -0,0 +1,51 @@
+import re
+import unicodedata
+from os import getenv
+
+# Fragmentación de CVs para embeddings (caracteres; ~4 caracteres por token)
+fragmento_caracteres = int(getenv("EMBEDDING_FRAGMENTO_CARACTERES", "1200"))
+fragmento_solapamiento = int(getenv("EMBEDDING_FRAGMENTO_SOLAPAMIENTO", "200"))
+max_fragmentos = int(getenv("EMBEDDING_MAX_FRAGMENTOS", "24"))
+
+
+def dividir_en_fragmentos(texto, tamano=fragmento_caracteres, solapamiento=fragmento_solapamiento,
+                          maximo=max_fragmentos):
+    """
+    Divide el texto en ventanas solapadas de hasta `tamano` caracteres, cortando de preferencia
+    en un salto de línea (o espacio) para no partir secciones ni palabras.
+    Retorna una lista de (inicio, fin, fragmento) con como máximo `maximo` elementos.
+    Los saltos de página ("\f", ver pdf_utils) se tratan como saltos de línea: mismo largo, así
+    inicio/fin siguen siendo posiciones del texto guardado.
+    """
+    texto = (texto or "").replace("\f", "\n")
+    n = len(texto)
+    fragmentos = []
+    inicio = 0
+    while inicio < n and len(fragmentos) < maximo:
+        fin = min(inicio + tamano, n)
+        if fin < n:
+            # Solo se busca el corte en la segunda mitad de la ventana
+            corte = texto.rfind("\n", inicio + tamano // 2, fin)
+            if corte == -1:
+                corte = texto.rfind(" ", inicio + tamano // 2, fin)
+            if corte > inicio:
+                fin = corte
+
+        fragmento = texto[inicio:fin].strip()
+        if fragmento:
+            fragmentos.append((inicio, fin, fragmento))
+        if fin >= n:
+            break
+
+        siguiente = max(fin - solapamiento, inicio + 1)
+        espacio = texto.find(" ", siguiente, fin)
+        inicio = espacio + 1 if espacio != -1 else siguiente
+    return fragmentos
+
+
+def normalizar_texto(texto):
+    """
+    Normalización para comparar textos de CV: Unicode NFC y espacios en blanco colapsados.
+    """
+    texto = unicodedata.normalize("NFC", texto or "")
+    return re.sub(r"\s+", " ", texto).strip()
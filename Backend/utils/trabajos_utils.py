@@ -0,0 +1,295 @@
+import json
+import logging
+import os
+import socket
+import threading
+import traceback
+import uuid
+from datetime import datetime, timedelta
+from os import getenv
+
+from fastapi import HTTPException
+from sqlalchemy import func
+
+from db.conexion_db import SesionLocal
+from db.models import TrabajoProcesamiento
+from utils.metricas_utils import medir_etapa
+
+logger = logging.getLogger(__name__)
+
+# Configuración de la cola (respaldada en Postgres, sin broker externo)
+JOBS_WORKERS = int(getenv("JOBS_WORKERS", "2"))
+JOBS_MAX_PENDIENTES = int(getenv("JOBS_MAX_PENDIENTES", "500"))
+JOBS_INTERVALO_SONDEO = float(getenv("JOBS_INTERVALO_SONDEO", "2"))
+JOBS_MAX_INTENTOS = int(getenv("JOBS_MAX_INTENTOS", "3"))
+# Cada proceso renueva el latido de sus trabajos en curso cada JOBS_INTERVALO_LATIDO segundos y, con
+# la misma frecuencia, devuelve a la cola los trabajos "en_proceso" sin latido en JOBS_TIMEOUT_EN_PROCESO
+# (worker caído o reiniciado). Un trabajo largo de un worker vivo nunca se reencola.
+JOBS_INTERVALO_LATIDO = float(getenv("JOBS_INTERVALO_LATIDO", "30"))
+JOBS_TIMEOUT_EN_PROCESO = float(getenv("JOBS_TIMEOUT_EN_PROCESO", "180"))
+
+# Dueño de los trabajos que reclama este proceso
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+_handlers = {}
+
+
+class ColaLlenaError(Exception):
+    pass
+
+
+def registrar_handler(tipo):
+    """
+    Decorador: registra la función que procesa los trabajos de un tipo.
+    La función recibe (db, **parametros) y retorna un dict serializable a JSON. No debe hacer
+    commit: la cola confirma sus escrituras junto con el resultado, y solo si el trabajo sigue
+    siendo de este worker (si se reencoló y lo tomó otro, se descartan y no quedan duplicadas).
+    """
+    def decorador(funcion):
+        _handlers[tipo] = funcion
+        return funcion
+    return decorador
+
+
+def encolar(db, tipo, parametros):
+    """
+    Inserta un trabajo pendiente y despierta a los workers. Lanza ColaLlenaError si la cola está llena.
+    """
+    if tipo not in _handlers:
+        raise ValueError(f"Tipo de trabajo no registrado: {tipo}")
+
+    pendientes = db.query(func.count(TrabajoProcesamiento.id)).filter(
+        TrabajoProcesamiento.estado == "pendiente"
+    ).scalar()
+    if pendientes >= JOBS_MAX_PENDIENTES:
+        raise ColaLlenaError(f"La cola tiene {pendientes} trabajos pendientes")
+
+    trabajo = TrabajoProcesamiento(
+        id=str(uuid.uuid4()),
+        tipo=tipo,
+        estado="pendiente",
+        parametros=json.dumps(parametros),
+        creado_en=datetime.utcnow()
+    )
+    db.add(trabajo)
+    db.commit()
+    db.refresh(trabajo)
+
+    cola_trabajos.notificar()
+    return trabajo
+
+
+def _reclamar_trabajo(db):
+    """
+    Toma el trabajo pendiente más antiguo. FOR UPDATE SKIP LOCKED permite varios
+    workers (y varios procesos) sin que dos tomen el mismo trabajo.
+    """
+    trabajo = (
+        db.query(TrabajoProcesamiento)
+        .filter(TrabajoProcesamiento.estado == "pendiente")
+        .order_by(TrabajoProcesamiento.creado_en)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if trabajo is None:
+        db.rollback()
+        return None
+
+    trabajo.estado = "en_proceso"
+    trabajo.iniciado_en = trabajo.latido_en = datetime.utcnow()
+    trabajo.worker = WORKER_ID
+    trabajo.intentos += 1
+    db.commit()
+    return trabajo
+
+
+def _renovar_latidos(db, trabajo_ids):
+    """
+    Marca como vivos los trabajos que este proceso está ejecutando.
+    """
+    if not trabajo_ids:
+        return
+    db.query(TrabajoProcesamiento).filter(
+        TrabajoProcesamiento.id.in_(trabajo_ids),
+        TrabajoProcesamiento.worker == WORKER_ID,
+        TrabajoProcesamiento.estado == "en_proceso"
+    ).update({TrabajoProcesamiento.latido_en: datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+
+
+def _recuperar_abandonados(db):
+    """
+    Devuelve a la cola los trabajos "en_proceso" cuyo worker dejó de renovar el latido (caída o
+    reinicio de cualquier proceso). SKIP LOCKED evita que dos procesos recuperen el mismo trabajo.
+    """
+    limite = datetime.utcnow() - timedelta(seconds=JOBS_TIMEOUT_EN_PROCESO)
+    abandonados = (
+        db.query(TrabajoProcesamiento)
+        .filter(
+            TrabajoProcesamiento.estado == "en_proceso",
+            func.coalesce(TrabajoProcesamiento.latido_en, TrabajoProcesamiento.iniciado_en) < limite
+        )
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    for trabajo in abandonados:
+        if trabajo.intentos >= JOBS_MAX_INTENTOS:
+            trabajo.estado = "error"
+            trabajo.error = "Trabajo abandonado: se alcanzó el máximo de intentos"
+            trabajo.finalizado_en = datetime.utcnow()
+        else:
+            trabajo.estado = "pendiente"
+        trabajo.worker = None
+    db.commit()
+    if abandonados:
+        logger.warning(f"Se recuperaron {len(abandonados)} trabajos abandonados")
+    return len(abandonados)
+
+
+def _trabajo_propio(db, trabajo_id):
+    """
+    El trabajo bloqueado para escribir su resultado, o None si ya no existe o dejó de pertenecer a
+    este proceso (se reencoló por falta de latido y lo tomó otro worker).
+    """
+    trabajo = (
+        db.query(TrabajoProcesamiento)
+        .filter(TrabajoProcesamiento.id == trabajo_id)
+        .with_for_update()
+        .populate_existing()  # El objeto puede estar en la sesión desde antes del reclamo: se relee
+        .first()
+    )
+    if trabajo is None or trabajo.estado != "en_proceso" or trabajo.worker != WORKER_ID:
+        logger.warning(f"El trabajo {trabajo_id} ya no pertenece a este worker; se descarta el resultado")
+        db.rollback()
+        return None
+    return trabajo
+
+
+def _ejecutar(trabajo_id):
+    db = SesionLocal()
+    try:
+        trabajo = db.query(TrabajoProcesamiento).get(trabajo_id)
+        if trabajo is None:
+            logger.warning(f"El trabajo {trabajo_id} ya no existe")
+            return
+        tipo = trabajo.tipo
+        handler = _handlers.get(tipo)
+        parametros = json.loads(trabajo.parametros or "{}")
+
+        try:
+            if handler is None:
+                raise ValueError(f"Tipo de trabajo no registrado: {tipo}")
+            resultado = handler(db, **parametros)
+            # Misma transacción que las escrituras del handler: si el trabajo ya no es de este
+            # worker, _trabajo_propio hace rollback y no se guarda nada
+            trabajo = _trabajo_propio(db, trabajo_id)
+            if trabajo is None:
+                return
+            trabajo.estado = "completado"
+            trabajo.resultado = json.dumps(resultado, ensure_ascii=False, default=str)
+        except Exception as e:
+            db.rollback()
+            detalle = e.detail if isinstance(e, HTTPException) else str(e)
+            logger.error(f"Error en trabajo {trabajo_id}: {detalle}\n{traceback.format_exc()}")
+            trabajo = _trabajo_propio(db, trabajo_id)
+            if trabajo is None:
+                return
+            trabajo.estado = "error"
+            trabajo.error = detalle
+
+        trabajo.finalizado_en = datetime.utcnow()
+        with medir_etapa("db_commit", operacion=tipo):
+            db.commit()
+    finally:
+        db.close()
+
+
+class ColaTrabajos:
+    """
+    Pool acotado de workers (hilos) que consumen la tabla trabajo_procesamiento.
+    """
+
+    def __init__(self, num_workers, intervalo_sondeo):
+        self.num_workers = num_workers
+        self.intervalo_sondeo = intervalo_sondeo
+        self._hilos = []
+        self._evento = threading.Event()
+        self._detener = threading.Event()
+        self._en_curso = set()  # Trabajos que ejecutan los workers de este proceso
+        self._lock = threading.Lock()
+
+    def notificar(self):
+        self._evento.set()
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            db = SesionLocal()
+            try:
+                trabajo = _reclamar_trabajo(db)
+                trabajo_id = trabajo.id if trabajo else None
+            except Exception as e:
+                logger.error(f"Error al reclamar trabajo de la cola: {e}")
+                trabajo_id = None
+            finally:
+                db.close()
+
+            if trabajo_id is None:
+                # Sin trabajo: esperar notificación o siguiente sondeo
+                self._evento.wait(self.intervalo_sondeo)
+                self._evento.clear()
+                continue
+
+            with self._lock:
+                self._en_curso.add(trabajo_id)
+            try:
+                _ejecutar(trabajo_id)
+            finally:
+                with self._lock:
+                    self._en_curso.discard(trabajo_id)
+
+    def _mantenimiento(self):
+        """
+        Renueva el latido de los trabajos en curso y recupera los abandonados por otros procesos.
+        """
+        db = SesionLocal()
+        try:
+            with self._lock:
+                en_curso = list(self._en_curso)
+            _renovar_latidos(db, en_curso)
+            if _recuperar_abandonados(db):
+                self.notificar()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error en el mantenimiento de la cola de trabajos: {e}")
+        finally:
+            db.close()
+
+    def _bucle_mantenimiento(self):
+        while True:
+            self._mantenimiento()
+            if self._detener.wait(JOBS_INTERVALO_LATIDO):
+                return
+
+    def iniciar(self):
+        if self._hilos:
+            return
+        self._detener.clear()
+        hilos = [threading.Thread(target=self._bucle_mantenimiento, name="cola-trabajos-latido", daemon=True)]
+        hilos += [
+            threading.Thread(target=self._bucle, name=f"cola-trabajos-{i}", daemon=True)
+            for i in range(self.num_workers)
+        ]
+        for hilo in hilos:
+            hilo.start()
+            self._hilos.append(hilo)
+        logger.info(f"Cola de trabajos iniciada con {self.num_workers} workers")
+
+    def detener(self, timeout=5):
+        self._detener.set()
+        self._evento.set()
+        for hilo in self._hilos:
+            hilo.join(timeout)
+        self._hilos = []
+
+
+cola_trabajos = ColaTrabajos(JOBS_WORKERS, JOBS_INTERVALO_SONDEO)
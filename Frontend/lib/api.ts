@@ -23,8 +23,38 @@ async function fetchAPI<T>(endpoint: string, options: RequestInit = {}): Promise
   return response.json()
 }
 
+// Los listados del backend están paginados por cursor: cada página trae como máximo `limite`
+// elementos y, si hay más, el cursor de la siguiente en la cabecera X-Siguiente-Cursor
+const PAGE_SIZE = 500 // PAGINA_TAMANO_MAXIMO del backend
+const NEXT_CURSOR_HEADER = "X-Siguiente-Cursor"
+
+async function fetchAllPages<T>(endpoint: string): Promise<T[]> {
+  const items: T[] = []
+  let cursor: string | null = null
+  do {
+    const params = new URLSearchParams({ limite: String(PAGE_SIZE) })
+    if (cursor) params.set("cursor", cursor)
+    const url = `${API_BASE_URL}${endpoint}?${params}`
+    const response = await fetch(url, {
+      headers: { "Content-Type": "application/json" },
+      next: { revalidate: 0 },
+    })
+
+    if (!response.ok) {
+      console.error(`API error: ${response.status} ${response.statusText}`)
+      const errorBody = await response.text()
+      console.error("Error body:", errorBody)
+      throw new Error(`Failed to fetch ${endpoint}: ${response.status}`)
+    }
+
+    items.push(...((await response.json()) as T[]))
+    cursor = response.headers.get(NEXT_CURSOR_HEADER)
+  } while (cursor)
+  return items
+}
+
 // Empresas
-export const getCompanies = () => fetchAPI<Company[]>("/empresas")
+export const getCompanies = () => fetchAllPages<Company>("/empresas")
 export const getCompanyById = (id: number) => fetchAPI<Company>(`/empresas/${id}`)
 export const createCompany = (data: Omit<Company, "id">) =>
   fetchAPI<Company>("/empresas", {
@@ -33,7 +63,7 @@ export const createCompany = (data: Omit<Company, "id">) =>
   })
 
 // Ofertas
-export const getOffers = () => fetchAPI<Offer[]>("/ofertas")
+export const getOffers = () => fetchAllPages<Offer>("/ofertas")
 export const createOffer = (data: Omit<Offer, "id" | "company">) =>
   fetchAPI<Offer>("/ofertas", {
     method: "POST",
@@ -41,7 +71,7 @@ export const createOffer = (data: Omit<Offer, "id" | "company">) =>
   })
 
 // Candidatos
-export const getCandidates = () => fetchAPI<Candidate[]>("/candidatos")
+export const getCandidates = () => fetchAllPages<Candidate>("/candidatos")
 export const createCandidate = (data: CandidateCreateData) =>
   fetchAPI<Candidate>("/candidatos", {
     method: "POST",
@@ -1,7 +1,10 @@
 -- Eliminación en orden correcto
+DROP TABLE IF EXISTS cv_extraccion CASCADE;
+DROP TABLE IF EXISTS trabajo_procesamiento CASCADE;
 DROP TABLE IF EXISTS preentrevista_pregunta CASCADE;
 DROP TABLE IF EXISTS preentrevista CASCADE;
 DROP TABLE IF EXISTS ranking_postulacion CASCADE;
+DROP TABLE IF EXISTS cv_embedding_fragmento CASCADE;
 DROP TABLE IF EXISTS cv_embedding CASCADE;
 DROP TABLE IF EXISTS postulacion CASCADE;
 DROP TABLE IF EXISTS cv_documento CASCADE;
@@ -9,6 +12,9 @@ DROP TABLE IF EXISTS candidato CASCADE;
 DROP TABLE IF EXISTS oferta_laboral CASCADE;
 DROP TABLE IF EXISTS empresa CASCADE;
 
+-- Extensión pgvector (columnas vector e índices ANN)
+CREATE EXTENSION IF NOT EXISTS vector;
+
 -- Tabla: empresa
 CREATE TABLE empresa (
     id SERIAL PRIMARY KEY,
@@ -27,7 +33,11 @@ CREATE TABLE oferta_laboral (
     requisitos TEXT,
     ubicacion VARCHAR(255),
     fecha_publicacion TIMESTAMP DEFAULT NOW(),
-    estado VARCHAR(50) DEFAULT 'activa'
+    estado VARCHAR(50) DEFAULT 'activa',
+    embedding vector(768),             -- Embedding de descripción + requisitos
+    embedding_modelo VARCHAR(100),
+    embedding_hash VARCHAR(64),        -- SHA-256 del texto embebido (versión del embedding)
+    embedding_fecha TIMESTAMP
 );
 
 -- Tabla: candidato
@@ -47,9 +57,12 @@ CREATE TABLE cv_documento (
     nombre_archivo VARCHAR(255),
     ruta_archivo TEXT,
     texto_extraido TEXT,
+    hash_contenido VARCHAR(64),        -- SHA-256 del archivo (deduplicación de CVs)
     creado_en TIMESTAMP DEFAULT NOW()
 );
 
+CREATE INDEX ix_cv_documento_hash_contenido ON cv_documento (hash_contenido);
+
 -- Tabla: postulacion
 CREATE TABLE postulacion (
     id SERIAL PRIMARY KEY,
@@ -61,12 +74,31 @@ CREATE TABLE postulacion (
 -- Tabla: cv_embedding (considerando el uso de IA para embedding)
 CREATE TABLE cv_embedding (
     id SERIAL PRIMARY KEY,
-    candidato_id INTEGER REFERENCES candidato(id),
-    embedding TEXT,  -- Almacena el embedding del CV como JSON
+    candidato_id INTEGER UNIQUE REFERENCES candidato(id),
+    embedding vector(768),  -- Embedding del CV (pgvector, nomic-embed-text = 768 dimensiones)
     modelo VARCHAR(100),
+    hash_contenido VARCHAR(64),  -- SHA-256 del PDF del que se generó el embedding
     fecha_generacion TIMESTAMP DEFAULT NOW()
 );
 
+CREATE INDEX ix_cv_embedding_hash_contenido ON cv_embedding (hash_contenido);
+
+-- Índice ANN (HNSW) por distancia coseno para búsqueda de candidatos similares
+CREATE INDEX ix_cv_embedding_embedding_hnsw ON cv_embedding
+    USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+
+-- Tabla: cv_embedding_fragmento (un vector por fragmento del CV; cv_embedding.embedding es su promedio)
+CREATE TABLE cv_embedding_fragmento (
+    id SERIAL PRIMARY KEY,
+    cv_embedding_id INTEGER REFERENCES cv_embedding(id) ON DELETE CASCADE,
+    indice INTEGER NOT NULL,
+    inicio INTEGER NOT NULL,  -- posición del fragmento en cv_documento.texto_extraido
+    fin INTEGER NOT NULL,
+    embedding vector(768)
+);
+
+CREATE INDEX ix_cv_embedding_fragmento_cv_embedding_id ON cv_embedding_fragmento (cv_embedding_id);
+
 -- Tabla: ranking_postulacion
 CREATE TABLE ranking_postulacion (
     id SERIAL PRIMARY KEY,
@@ -93,3 +125,33 @@ CREATE TABLE preentrevista_pregunta (
     respuesta TEXT,
     feedback TEXT
 );
+
+-- Tabla: trabajo_procesamiento (cola de trabajos asíncronos de /procesamiento)
+CREATE TABLE trabajo_procesamiento (
+    id VARCHAR(36) PRIMARY KEY,
+    tipo VARCHAR(50) NOT NULL,
+    estado VARCHAR(20) NOT NULL DEFAULT 'pendiente',
+    parametros TEXT,
+    resultado TEXT,
+    error TEXT,
+    intentos INTEGER NOT NULL DEFAULT 0,
+    creado_en TIMESTAMP DEFAULT NOW(),
+    iniciado_en TIMESTAMP,
+    finalizado_en TIMESTAMP,
+    worker VARCHAR(100),      -- Proceso que lo ejecuta (host:pid)
+    latido_en TIMESTAMP       -- Último latido del worker mientras está en_proceso
+);
+
+CREATE INDEX ix_trabajo_procesamiento_estado ON trabajo_procesamiento (estado);
+
+-- Tabla: cv_extraccion (cache de la extracción estructurada con IA)
+-- La clave incluye la versión (hash) de la plantilla del prompt: al cambiarla, las entradas antiguas dejan de usarse
+CREATE TABLE cv_extraccion (
+    id SERIAL PRIMARY KEY,
+    modelo VARCHAR(100) NOT NULL,
+    version_prompt VARCHAR(64) NOT NULL,
+    hash_texto VARCHAR(64) NOT NULL,   -- SHA-256 del texto del CV normalizado
+    datos TEXT NOT NULL,               -- JSON con los datos extraídos
+    creado_en TIMESTAMP DEFAULT NOW(),
+    CONSTRAINT uq_cv_extraccion_clave UNIQUE (modelo, version_prompt, hash_texto)
+);
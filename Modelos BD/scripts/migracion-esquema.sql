@@ -0,0 +1,102 @@
+-- Migración de una base creada con la versión original de crea-tablas.sql al esquema actual.
+-- Se puede ejecutar más de una vez: cada paso comprueba si ya está aplicado.
+-- Requiere la extensión pgvector instalada en el servidor (>= 0.5.0 para HNSW).
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+BEGIN;
+
+-- oferta_laboral: embedding versionado de descripción + requisitos.
+-- Se recalcula al primer uso, así que un embedding guardado como texto se descarta.
+ALTER TABLE oferta_laboral
+    ADD COLUMN IF NOT EXISTS embedding vector(768),
+    ADD COLUMN IF NOT EXISTS embedding_modelo VARCHAR(100),
+    ADD COLUMN IF NOT EXISTS embedding_hash VARCHAR(64),
+    ADD COLUMN IF NOT EXISTS embedding_fecha TIMESTAMP;
+
+DO $$
+BEGIN
+    IF (SELECT data_type FROM information_schema.columns
+        WHERE table_name = 'oferta_laboral' AND column_name = 'embedding') = 'text' THEN
+        UPDATE oferta_laboral SET embedding = NULL, embedding_hash = NULL;
+        ALTER TABLE oferta_laboral ALTER COLUMN embedding TYPE vector(768) USING NULL;
+    END IF;
+END $$;
+
+-- cv_documento: hash del archivo para deduplicar CVs
+ALTER TABLE cv_documento ADD COLUMN IF NOT EXISTS hash_contenido VARCHAR(64);
+CREATE INDEX IF NOT EXISTS ix_cv_documento_hash_contenido ON cv_documento (hash_contenido);
+
+-- cv_embedding: JSON (TEXT) -> vector(768). El formato "[0.1, 0.2, ...]" es compatible con el de vector.
+-- Los embeddings con otra dimensión se descartan (se regeneran al volver a procesar el CV).
+DO $$
+BEGIN
+    IF (SELECT data_type FROM information_schema.columns
+        WHERE table_name = 'cv_embedding' AND column_name = 'embedding') = 'text' THEN
+        DELETE FROM cv_embedding
+        WHERE embedding IS NULL
+           OR json_array_length(embedding::json) <> 768;
+        ALTER TABLE cv_embedding ALTER COLUMN embedding TYPE vector(768) USING embedding::vector(768);
+    END IF;
+END $$;
+
+-- cv_embedding: un embedding por candidato (se conserva el más reciente)
+DELETE FROM cv_embedding anterior
+USING cv_embedding reciente
+WHERE anterior.candidato_id = reciente.candidato_id
+  AND anterior.id < reciente.id;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'cv_embedding_candidato_id_key') THEN
+        ALTER TABLE cv_embedding ADD CONSTRAINT cv_embedding_candidato_id_key UNIQUE (candidato_id);
+    END IF;
+END $$;
+
+ALTER TABLE cv_embedding ADD COLUMN IF NOT EXISTS hash_contenido VARCHAR(64);
+CREATE INDEX IF NOT EXISTS ix_cv_embedding_hash_contenido ON cv_embedding (hash_contenido);
+
+-- Tablas nuevas (mismas definiciones que crea-tablas.sql)
+CREATE TABLE IF NOT EXISTS cv_embedding_fragmento (
+    id SERIAL PRIMARY KEY,
+    cv_embedding_id INTEGER REFERENCES cv_embedding(id) ON DELETE CASCADE,
+    indice INTEGER NOT NULL,
+    inicio INTEGER NOT NULL,  -- posición del fragmento en cv_documento.texto_extraido
+    fin INTEGER NOT NULL,
+    embedding vector(768)
+);
+
+CREATE INDEX IF NOT EXISTS ix_cv_embedding_fragmento_cv_embedding_id ON cv_embedding_fragmento (cv_embedding_id);
+
+CREATE TABLE IF NOT EXISTS trabajo_procesamiento (
+    id VARCHAR(36) PRIMARY KEY,
+    tipo VARCHAR(50) NOT NULL,
+    estado VARCHAR(20) NOT NULL DEFAULT 'pendiente',
+    parametros TEXT,
+    resultado TEXT,
+    error TEXT,
+    intentos INTEGER NOT NULL DEFAULT 0,
+    creado_en TIMESTAMP DEFAULT NOW(),
+    iniciado_en TIMESTAMP,
+    finalizado_en TIMESTAMP,
+    worker VARCHAR(100),      -- Proceso que lo ejecuta (host:pid)
+    latido_en TIMESTAMP       -- Último latido del worker mientras está en_proceso
+);
+
+CREATE INDEX IF NOT EXISTS ix_trabajo_procesamiento_estado ON trabajo_procesamiento (estado);
+
+CREATE TABLE IF NOT EXISTS cv_extraccion (
+    id SERIAL PRIMARY KEY,
+    modelo VARCHAR(100) NOT NULL,
+    version_prompt VARCHAR(64) NOT NULL,
+    hash_texto VARCHAR(64) NOT NULL,   -- SHA-256 del texto del CV normalizado
+    datos TEXT NOT NULL,               -- JSON con los datos extraídos
+    creado_en TIMESTAMP DEFAULT NOW(),
+    CONSTRAINT uq_cv_extraccion_clave UNIQUE (modelo, version_prompt, hash_texto)
+);
+
+COMMIT;
+
+-- Índice ANN (HNSW) por distancia coseno, fuera de la transacción: en tablas grandes tarda
+CREATE INDEX IF NOT EXISTS ix_cv_embedding_embedding_hnsw ON cv_embedding
+    USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);